@@ -9,10 +9,13 @@ from flask_caching import Cache
 import logging
 
 from app.config import Config
-from app.models import init_db
+from app.cache import cache_manager
+from app.catalog import seed_catalog_if_empty
 from app.database import init_connection_pool, close_connection_pool
 from app.logging_config import setup_logging, get_logger
 from app.migrations import run_migrations
+from app.monitoring import init_request_monitoring
+from app.schema import refresh_schema
 
 def create_app(config=None):
     """Application factory pattern for better testing and configuration"""
@@ -66,23 +69,32 @@ def create_app(config=None):
                  strict_transport_security=True,
                  content_security_policy=csp)
     
-    # Configure caching
-    cache = Cache(app, config={'CACHE_TYPE': 'simple'})
+    # Configure caching; a shared backend lets every worker reuse the same entries
+    cache_backend = cache_manager.configure_backend(config)
+    if cache_backend == 'redis':
+        cache = Cache(app, config={'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': config.get('CACHE_REDIS_URL')})
+    else:
+        cache = Cache(app, config={'CACHE_TYPE': 'simple'})
     
     # Set up enhanced logging
     log_level = 'DEBUG' if config.get('DEBUG', False) else 'INFO'
     setup_logging(level=log_level)
     logger = get_logger(__name__)
     
-    # Initialize database and connection pool
+    # Initialize connection pool and bring the schema up to date
     try:
-        init_db()
         init_connection_pool()
-        logger.info("Database and connection pool initialized")
+        logger.info("Connection pool initialized")
         
-        # Run database migrations
+        # A single version check unless migrations are pending
         run_migrations()
         logger.info("Database migrations completed")
+        
+        # A fresh database gets the bundled catalog; one query otherwise
+        seed_catalog_if_empty()
+        
+        # Column checks in request handlers read this instead of information_schema
+        refresh_schema()
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
     
@@ -97,6 +109,9 @@ def create_app(config=None):
     app.register_blueprint(admin_bp)
     app.register_blueprint(ministry_admin_bp)
     
+    # Time every request for /api/metrics
+    init_request_monitoring(app)
+    
     # Register error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -3,15 +3,15 @@
 # Unauthorized use, distribution, or modification is prohibited.
 
 from flask import Blueprint, render_template, jsonify, request, Response
-import json
 import logging
-import psycopg2.extras
-import io
-import csv
 
+import app.database as database
 from app.database import get_db_connection
 from app.auth import require_admin_auth_enhanced as require_admin_auth, require_csrf_token
-from app.error_handlers import create_error_response, DatabaseError
+from app.cache import invalidate_submission_cache
+from app.error_handlers import create_error_response, DatabaseError, ValidationError
+from app.rollups import DIMENSIONS, clear_rollups, get_rollup_report, parse_rollup_range
+from app.submissions import STATS_FILTERS, fetch_submissions_page, get_submission_stats
 
 admin_bp = Blueprint('admin', __name__)
 logger = logging.getLogger(__name__)
@@ -26,52 +26,74 @@ def admin_dashboard():
 @admin_bp.route('/admin/api/submissions')  # Fixed route to match JavaScript call
 @require_admin_auth
 def get_submissions():
-    """Get all submissions for admin view"""
+    """
+    Get one page of submissions for the admin view
+    
+    Query parameters: limit, cursor (from the previous page's next_cursor),
+    from/to (YYYY-MM-DD), age_group, gender, ministry and fields (comma
+    separated) to return only some columns.
+    """
     try:
-        with get_db_connection(cursor_factory=psycopg2.extras.RealDictCursor) as (conn, cur):
-            cur.execute('''
-                SELECT id, name, age_group, gender, state_in_life, interest,
-                       situation, recommended_ministries, submitted_at, ip_address,
-                       client_id_hash, session_id
-                FROM ministry_submissions
-                ORDER BY submitted_at DESC
-            ''')
-            
-            submissions = []
-            for row in cur.fetchall():
-                submission = dict(row)
-                
-                # Process JSON fields
-                for field in ['situation', 'state_in_life', 'interest', 'recommended_ministries']:
-                    try:
-                        if submission[field]:
-                            if isinstance(submission[field], str):
-                                try:
-                                    submission[field] = json.loads(submission[field])
-                                except json.JSONDecodeError:
-                                    if field == 'interest':
-                                        submission[field] = [submission[field]] if submission[field] else []
-                                    else:
-                                        submission[field] = []
-                            elif not isinstance(submission[field], list):
-                                submission[field] = []
-                        else:
-                            submission[field] = []
-                    except Exception:
-                        submission[field] = []
-                
-                if submission['submitted_at']:
-                    submission['submitted_at'] = submission['submitted_at'].isoformat()
-                
-                submissions.append(submission)
+        return jsonify(fetch_submissions_page(request.args))
         
-        return jsonify(submissions)
+    except ValidationError as e:
+        error_response, status_code = create_error_response(e)
+        return jsonify(error_response), status_code
         
     except Exception as e:
         logger.error(f"Error getting submissions: {e}")
         error_response, status_code = create_error_response(DatabaseError("Failed to retrieve submissions", e))
         return jsonify(error_response), status_code
 
+@admin_bp.route('/admin/api/stats')
+@require_admin_auth
+def get_stats():
+    """Aggregated dashboard statistics; takes the same filters as /admin/api/submissions"""
+    try:
+        filters = {name: request.args[name] for name in STATS_FILTERS if request.args.get(name)}
+        response = jsonify(get_submission_stats(**filters))
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+        
+    except ValidationError as e:
+        error_response, status_code = create_error_response(e)
+        return jsonify(error_response), status_code
+        
+    except Exception as e:
+        logger.error(f"Error getting submission stats: {e}")
+        error_response, status_code = create_error_response(DatabaseError("Failed to retrieve statistics", e))
+        return jsonify(error_response), status_code
+
+@admin_bp.route('/admin/api/rollups')
+@require_admin_auth
+def get_rollups():
+    """
+    Submission counts over time from the hourly/daily rollups
+    
+    Query parameters: granularity (day or hour), from/to (YYYY-MM-DD) and
+    dimensions (comma separated; defaults to all).
+    """
+    try:
+        granularity, date_from, date_to = parse_rollup_range(
+            request.args.get('granularity'), request.args.get('from'), request.args.get('to')
+        )
+        dimensions = DIMENSIONS
+        if request.args.get('dimensions'):
+            dimensions = tuple(d.strip() for d in request.args['dimensions'].split(',') if d.strip() in DIMENSIONS)
+        
+        response = jsonify(get_rollup_report(granularity, date_from, date_to, dimensions))
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+        
+    except ValidationError as e:
+        error_response, status_code = create_error_response(e)
+        return jsonify(error_response), status_code
+        
+    except Exception as e:
+        logger.error(f"Error getting submission rollups: {e}")
+        error_response, status_code = create_error_response(DatabaseError("Failed to retrieve rollups", e))
+        return jsonify(error_response), status_code
+
 @admin_bp.route('/admin/api/clear-all-data', methods=['POST'])
 @require_admin_auth
 def clear_all_data():
@@ -83,7 +105,9 @@ def clear_all_data():
             
             cur.execute('DELETE FROM ministry_submissions')
             cur.execute('ALTER SEQUENCE ministry_submissions_id_seq RESTART WITH 1')
+            clear_rollups(cur)
         
+        invalidate_submission_cache()
         logger.info(f"Admin cleared all data: {count_before} records deleted")
         
         return jsonify({
@@ -102,46 +126,32 @@ def clear_all_data():
 @admin_bp.route('/admin/api/submissions/export')
 @require_admin_auth
 def export_submissions():
-    """Export submissions with optional date filtering"""
+    """Export submissions with optional date filtering, streamed as CSV"""
     try:
         date_from = request.args.get('from')
         date_to = request.args.get('to')
+        # mode=copy lets Postgres render the CSV itself (fastest for large exports)
+        use_copy = request.args.get('mode') == 'copy'
         
-        with get_db_connection(cursor_factory=psycopg2.extras.RealDictCursor) as (conn, cur):
-            query = '''
-                SELECT id, name, age_group, gender, state_in_life, interest, 
-                       situation, recommended_ministries, submitted_at
-                FROM ministry_submissions
-                WHERE 1=1
-            '''
-            params = []
-            
-            if date_from:
-                query += ' AND submitted_at >= %s'
-                params.append(date_from)
-            
-            if date_to:
-                query += ' AND submitted_at <= %s'
-                params.append(f"{date_to} 23:59:59")
-            
-            query += ' ORDER BY submitted_at DESC'
-            
-            cur.execute(query, params)
-            submissions = cur.fetchall()
-        
-        # Convert to CSV
-        output = io.StringIO()
-        if submissions:
-            writer = csv.DictWriter(output, fieldnames=submissions[0].keys())
-            writer.writeheader()
-            writer.writerows(submissions)
+        chunks = database.stream_submissions_csv(
+            date_from=date_from,
+            date_to=f"{date_to} 23:59:59" if date_to else None,
+            use_copy=use_copy
+        )
+        # Pull the header now so database errors still get a JSON error response
+        first_chunk = next(chunks, '')
         
-        output.seek(0)
+        def generate():
+            yield first_chunk
+            yield from chunks
         
         return Response(
-            output.read(),
+            generate(),
             mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=ministry_submissions.csv'}
+            headers={
+                'Content-Disposition': 'attachment; filename=ministry_submissions.csv',
+                'Cache-Control': 'no-store'
+            }
         )
         
     except Exception as e:
@@ -10,12 +10,17 @@ import psycopg2.extras
 from datetime import datetime
 
 import app.database as database
+import app.metrics as metrics
 import app.utils as utils
 from app.monitoring import app_monitor
+from app.system_stats import system_sampler
+from app.recommendations import recommend_ministries
+from app.submission_queue import (
+    SUBMIT_QUEUE_ENABLED, build_submission_row, insert_submissions, new_submission_ref, submission_queue
+)
 from app.utils import get_rate_limit_info, hash_ip
 from app.validators import validate_and_respond
 from app.error_handlers import create_error_response, RateLimitError, DatabaseError, ValidationError
-from psycopg2.extras import Json
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 logger = logging.getLogger(__name__)
@@ -71,6 +76,9 @@ def submit_ministry_interest():
                 logger.warning(f"Failed to hash client_id: {e}")
                 client_id_hash = None
         
+        # Recommendations are computed here; the client's own list is not trusted
+        recommended_names = [ministry['name'] for ministry in recommend_ministries(validated_data)]
+        
         # Log only hashed identifiers
         logger.info(
             "Received submission: ip_hash=%s, client_id_hash=%s, session_id=%s",
@@ -79,36 +87,24 @@ def submit_ministry_interest():
             session_id,
         )
 
-        with database.get_db_connection() as (conn, cur):
-            name = "Anonymous User"
-            email = ""
-            
-            cur.execute('''
-                INSERT INTO ministry_submissions 
-                (name, email, age_group, gender, state_in_life, interest, situation, recommended_ministries, ip_address, client_id_hash, session_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            ''', (
-                name, email,
-                validated_data.get('age_group', ''),
-                validated_data.get('gender', ''),
-                Json(validated_data.get('states', [])),
-                Json(validated_data.get('interests', [])),
-                Json(validated_data.get('situation', [])),
-                Json(validated_data.get('ministries', [])),
-                (ip_hash[:45] if ip_hash else None),
-                client_id_hash,
-                session_id
-            ))
-            
-            submission_id = cur.fetchone()[0]
+        submission_ref = new_submission_ref(data.get('submission_ref'))
+        row = build_submission_row(validated_data, recommended_names, ip_hash,
+                                   client_id_hash, session_id, submission_ref)
         
-        logger.info("Successfully saved anonymous submission %s (ip_hash=%s)", submission_id, ip_hash)
+        # Queued rows are written in batches; a full queue (or the queue being
+        # disabled) falls back to writing this one row now
+        if SUBMIT_QUEUE_ENABLED and submission_queue.enqueue(row):
+            logger.info("Queued anonymous submission %s (ip_hash=%s)", submission_ref, ip_hash)
+            metrics.inc('quiz_submissions_total', path='queued')
+        else:
+            insert_submissions([row])
+            logger.info("Successfully saved anonymous submission %s (ip_hash=%s)", submission_ref, ip_hash)
+            metrics.inc('quiz_submissions_total', path='direct')
         
         return jsonify({
             'success': True,
             'message': 'Thank you for exploring St. Edward ministries!',
-            'submission_id': submission_id
+            'submission_id': submission_ref
         })
         
     except psycopg2.Error as e:
@@ -121,6 +117,33 @@ def submit_ministry_interest():
 
 
 
+@api_bp.route('/recommend', methods=['POST'])
+def recommend():
+    """Recommend ministries for a set of quiz answers"""
+    try:
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({
+                'success': False,
+                'message': 'No data provided'
+            }), 400
+        
+        validated_data, error_response = validate_and_respond(data)
+        if error_response:
+            return error_response
+        
+        ministries = recommend_ministries(validated_data)
+        
+        return jsonify({
+            'success': True,
+            'ministries': ministries,
+            'count': len(ministries)
+        })
+        
+    except Exception as e:
+        error_response, status_code = create_error_response(e)
+        return jsonify(error_response), status_code
+
 @api_bp.route('/health')
 def health_check():
     try:
@@ -133,16 +156,10 @@ def health_check():
         cache_stats = get_cache_stats()
         
         # Get memory status if available
-        memory_status = {}
-        try:
-            import psutil
-            process = psutil.Process()
-            memory_info = process.memory_info()
-            memory_status = {
-                'rss_mb': round(memory_info.rss / (1024 * 1024), 2),
-                'percent': round(process.memory_percent(), 2)
-            }
-        except ImportError:
+        process_memory = system_sampler.process_memory()
+        if process_memory:
+            memory_status = {'rss_mb': process_memory['rss_mb'], 'percent': process_memory['percent']}
+        else:
             memory_status = {'error': 'psutil not available'}
         
         # Get monitoring metrics
@@ -167,6 +184,8 @@ def health_check():
             'status': health_status,
             'database': 'connected',
             'cache': cache_stats,
+            'submission_queue': submission_queue.get_stats(),
+            'database_pool': database.get_pool_stats(),
             'memory': memory_status,
             'monitoring': {
                 'uptime': monitoring_metrics.get('system', {}).get('uptime_human', 'N/A'),
@@ -265,8 +284,8 @@ def debug_submissions():
             """)
             recent = cur.fetchall()
             
-            # Count total submissions
-            cur.execute("SELECT COUNT(*) as total FROM ministry_submissions")
+            # Count total submissions from the rollups rather than scanning the table
+            cur.execute("SELECT COALESCE(SUM(count), 0) as total FROM submission_rollups_daily WHERE dimension = 'total'")
             total = cur.fetchone()
             
         return jsonify({
@@ -283,15 +302,14 @@ def debug_submissions():
 def memory_status():
     """Get current memory status for monitoring"""
     try:
-        import psutil
-        
-        # Get process memory info
-        process = psutil.Process()
-        memory_info = process.memory_info()
-        memory_percent = process.memory_percent()
-        
-        # Get system memory info
-        system_memory = psutil.virtual_memory()
+        # This worker's memory, and the host's from the shared snapshot
+        process_memory = system_sampler.process_memory()
+        if process_memory is None:
+            return jsonify({
+                'error': 'psutil not available',
+                'timestamp': datetime.now().isoformat()
+            }), 500
+        system_memory = system_sampler.host_memory()
         
         # Get cache stats
         from app.cache import get_cache_stats
@@ -303,25 +321,16 @@ def memory_status():
         
         return jsonify({
             'timestamp': datetime.now().isoformat(),
-            'process': {
-                'rss_mb': round(memory_info.rss / (1024 * 1024), 2),
-                'vms_mb': round(memory_info.vms / (1024 * 1024), 2),
-                'percent': round(memory_percent, 2)
-            },
+            'process': process_memory,
             'system': {
-                'total_gb': round(system_memory.total / (1024 * 1024 * 1024), 2),
-                'available_gb': round(system_memory.available / (1024 * 1024 * 1024), 2),
-                'percent': round(system_memory.percent, 2)
+                'total_gb': round(system_memory['memory_total_bytes'] / (1024 * 1024 * 1024), 2),
+                'available_gb': round(system_memory['memory_available_bytes'] / (1024 * 1024 * 1024), 2),
+                'percent': round(system_memory['memory_percent'], 2)
             },
             'cache': cache_stats,
             'monitoring': monitoring_metrics.get('application', {}).get('monitoring_data_size', {})
         })
         
-    except ImportError:
-        return jsonify({
-            'error': 'psutil not available',
-            'timestamp': datetime.now().isoformat()
-        }), 500
     except Exception as e:
         logger.error(f"Memory status check failed: {e}")
         return jsonify({
@@ -7,10 +7,14 @@ import json
 import logging
 import psycopg2.extras
 from datetime import datetime
+import codecs
 import csv
 import io
 
 from app.database import get_db_connection
+from app.catalog import bump_catalog_version, normalize_tags
+from app.ministry_import import import_ministries
+from app.schema import has_column
 from app.auth import require_admin_auth_enhanced as require_admin_auth
 from app.error_handlers import create_error_response, DatabaseError, ValidationError
 
@@ -29,13 +33,7 @@ def get_all_ministries():
     """Get all ministries from database"""
     try:
         with get_db_connection(cursor_factory=psycopg2.extras.RealDictCursor) as (conn, cur):
-            # Check if updated_at column exists
-            cur.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'ministries' AND column_name = 'updated_at'
-            """)
-            has_updated_at = cur.fetchone() is not None
+            has_updated_at = has_column('ministries', 'updated_at')
             
             # Build query based on available columns
             if has_updated_at:
@@ -137,6 +135,7 @@ def create_ministry():
             
             ministry_id = cur.fetchone()[0]
         
+        bump_catalog_version()
         logger.info(f"Created new ministry: {data.get('name')} (ID: {ministry_id})")
         
         return jsonify({
@@ -173,12 +172,7 @@ def update_ministry(ministry_id):
             if not cur.fetchone():
                 return jsonify({'success': False, 'error': 'Ministry not found'}), 404
             
-            # Check if updated_at column exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name = 'ministries' AND column_name = 'updated_at'
-            """)
-            has_updated_at = cur.fetchone() is not None
+            has_updated_at = has_column('ministries', 'updated_at')
             
             # Update ministry
             if has_updated_at:
@@ -222,6 +216,7 @@ def update_ministry(ministry_id):
                     ministry_id
                 ))
         
+        bump_catalog_version()
         logger.info(f"Updated ministry {ministry_id}: {data.get('name')}")
         
         return jsonify({
@@ -247,12 +242,7 @@ def delete_ministry(ministry_id):
     """Delete ministry (soft delete by setting active=false)"""
     try:
         with get_db_connection() as (conn, cur):
-            # Check if updated_at exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name = 'ministries' AND column_name = 'updated_at'
-            """)
-            has_updated_at = cur.fetchone() is not None
+            has_updated_at = has_column('ministries', 'updated_at')
             
             # Soft delete by setting active to false
             if has_updated_at:
@@ -276,6 +266,7 @@ def delete_ministry(ministry_id):
             
             ministry_name = result[0]
         
+        bump_catalog_version()
         logger.info(f"Soft deleted ministry {ministry_id}: {ministry_name}")
         
         return jsonify({
@@ -293,12 +284,7 @@ def toggle_ministry_active(ministry_id):
     """Toggle ministry active status"""
     try:
         with get_db_connection() as (conn, cur):
-            # Check if updated_at exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name = 'ministries' AND column_name = 'updated_at'
-            """)
-            has_updated_at = cur.fetchone() is not None
+            has_updated_at = has_column('ministries', 'updated_at')
             
             if has_updated_at:
                 cur.execute('''
@@ -321,6 +307,7 @@ def toggle_ministry_active(ministry_id):
             
             ministry_name, is_active = result
         
+        bump_catalog_version()
         logger.info(f"Toggled ministry {ministry_id} active status to {is_active}")
         
         return jsonify({
@@ -333,10 +320,40 @@ def toggle_ministry_active(ministry_id):
         logger.error(f"Error toggling ministry {ministry_id}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Columns bulk-update may change, with the type each VALUES column is cast to
+BULK_TAG_FIELDS = ('age_groups', 'genders', 'states', 'interests', 'situations')
+BULK_SET_FIELDS = {
+    'name': 'text',
+    'description': 'text',
+    'details': 'text',
+    'active': 'boolean',
+    **{field: 'text' for field in BULK_TAG_FIELDS}
+}
+
+def _merge_bulk_updates(ministry, updates):
+    """New values for one ministry: tags added, then removed, then fields set"""
+    updated_data = {}
+    
+    for field, values in updates.get('add', {}).items():
+        current = normalize_tags(ministry[field])
+        updated_data[field] = current + [value for value in values if value not in current]
+    
+    for field, values in updates.get('remove', {}).items():
+        current = updated_data.get(field, normalize_tags(ministry[field]))
+        updated_data[field] = [item for item in current if item not in values]
+    
+    updated_data.update(updates.get('set', {}))
+    return updated_data
+
 @ministry_admin_bp.route('/api/ministries/bulk-update', methods=['POST'])
 @require_admin_auth
 def bulk_update_ministries():
-    """Update multiple ministries at once"""
+    """
+    Update multiple ministries at once
+    
+    Targets are read in one query and written back in one UPDATE ... FROM
+    (VALUES ...), however many ministries are selected.
+    """
     try:
         data = request.json
         ministry_ids = data.get('ministry_ids', [])
@@ -345,65 +362,63 @@ def bulk_update_ministries():
         if not ministry_ids:
             return jsonify({'success': False, 'error': 'No ministries selected'}), 400
         
-        updated_count = 0
+        try:
+            ministry_ids = [int(ministry_id) for ministry_id in ministry_ids]
+        except (TypeError, ValueError):
+            error_response, status_code = create_error_response(ValidationError("ministry_ids must be numbers", "ministry_ids"))
+            return jsonify(error_response), status_code
+        
+        tag_fields = set(updates.get('add', {})) | set(updates.get('remove', {}))
+        fields = tag_fields | set(updates.get('set', {}))
+        unknown = (tag_fields - set(BULK_TAG_FIELDS)) | (fields - set(BULK_SET_FIELDS))
+        if unknown:
+            error_response, status_code = create_error_response(
+                ValidationError(f"Cannot bulk update: {', '.join(sorted(unknown))}", "updates"))
+            return jsonify(error_response), status_code
+        # Same column order for every row of the VALUES list
+        fields = [field for field in BULK_SET_FIELDS if field in fields]
+        
         errors = []
+        rows = []
         
         with get_db_connection(cursor_factory=psycopg2.extras.RealDictCursor) as (conn, cur):
-            # Check if updated_at exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name = 'ministries' AND column_name = 'updated_at'
-            """)
-            has_updated_at = cur.fetchone() is not None
+            has_updated_at = has_column('ministries', 'updated_at')
             
-            for ministry_id in ministry_ids:
-                try:
-                    # Get current ministry data
-                    cur.execute('SELECT * FROM ministries WHERE id = %s', (ministry_id,))
-                    ministry = cur.fetchone()
-                    
-                    if not ministry:
-                        errors.append(f"Ministry {ministry_id} not found")
-                        continue
-                    
-                    # Apply updates
-                    updated_data = {}
-                    
-                    # Handle adding categories
-                    if 'add' in updates:
-                        for field, values in updates['add'].items():
-                            current = ministry.get(field, [])
-                            updated_data[field] = list(set(current + values))
-                    
-                    # Handle removing categories
-                    if 'remove' in updates:
-                        for field, values in updates['remove'].items():
-                            current = ministry.get(field, [])
-                            updated_data[field] = [item for item in current if item not in values]
-                    
-                    # Handle direct updates
-                    if 'set' in updates:
-                        updated_data.update(updates['set'])
-                    
-                    # Update the ministry
-                    if updated_data:
-                        set_clause = ', '.join([f"{k} = %s" for k in updated_data.keys()])
-                        if has_updated_at:
-                            set_clause += ', updated_at = CURRENT_TIMESTAMP'
-                        
-                        values = [json.dumps(v) if isinstance(v, list) else v for v in updated_data.values()]
-                        values.append(ministry_id)
-                        
-                        cur.execute(f'''
-                            UPDATE ministries 
-                            SET {set_clause}
-                            WHERE id = %s
-                        ''', values)
-                        
-                        updated_count += 1
-                        
-                except Exception as e:
-                    errors.append(f"Ministry {ministry_id}: {str(e)}")
+            cur.execute(f'''
+                SELECT id, {', '.join(BULK_TAG_FIELDS)}
+                FROM ministries
+                WHERE id = ANY(%s)
+            ''', (ministry_ids,))
+            ministries = {row['id']: row for row in cur.fetchall()}
+            
+            for ministry_id in dict.fromkeys(ministry_ids):
+                ministry = ministries.get(ministry_id)
+                if not ministry:
+                    errors.append(f"Ministry {ministry_id} not found")
+                    continue
+                
+                updated_data = _merge_bulk_updates(ministry, updates)
+                rows.append((ministry_id, *[
+                    json.dumps(updated_data[field]) if isinstance(updated_data[field], list) else updated_data[field]
+                    for field in fields
+                ]))
+            
+            if rows and fields:
+                set_clause = ', '.join(f"{field} = v.{field}" for field in fields)
+                if has_updated_at:
+                    set_clause += ', updated_at = CURRENT_TIMESTAMP'
+                template = '(%s::integer, ' + ', '.join(f"%s::{BULK_SET_FIELDS[field]}" for field in fields) + ')'
+                
+                psycopg2.extras.execute_values(cur, f'''
+                    UPDATE ministries AS m
+                    SET {set_clause}
+                    FROM (VALUES %s) AS v(id, {', '.join(fields)})
+                    WHERE m.id = v.id
+                ''', rows, template=template, page_size=len(rows))
+        
+        updated_count = len(rows) if fields else 0
+        if updated_count:
+            bump_catalog_version()
         
         return jsonify({
             'success': True,
@@ -419,7 +434,7 @@ def bulk_update_ministries():
 @ministry_admin_bp.route('/api/ministries/bulk-import', methods=['POST'])
 @require_admin_auth
 def bulk_import_ministries():
-    """Import multiple ministries from JSON"""
+    """Import multiple ministries from JSON, merged in one upsert"""
     try:
         data = request.json
         ministries_data = data.get('ministries', [])
@@ -427,85 +442,20 @@ def bulk_import_ministries():
         if not ministries_data:
             return jsonify({'success': False, 'error': 'No ministries provided'}), 400
         
-        imported_count = 0
-        errors = []
+        result = import_ministries(
+            (ministry.get('name', 'Unknown') if isinstance(ministry, dict) else 'Unknown', ministry)
+            for ministry in ministries_data
+        )
+        imported_count = result['created'] + result['updated']
         
-        with get_db_connection() as (conn, cur):
-            # Check if updated_at exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name = 'ministries' AND column_name = 'updated_at'
-            """)
-            has_updated_at = cur.fetchone() is not None
-            
-            for ministry in ministries_data:
-                try:
-                    if has_updated_at:
-                        cur.execute('''
-                            INSERT INTO ministries 
-                            (ministry_key, name, description, details, age_groups, 
-                             genders, states, interests, situations, active)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (ministry_key) DO UPDATE SET
-                                name = EXCLUDED.name,
-                                description = EXCLUDED.description,
-                                details = EXCLUDED.details,
-                                age_groups = EXCLUDED.age_groups,
-                                genders = EXCLUDED.genders,
-                                states = EXCLUDED.states,
-                                interests = EXCLUDED.interests,
-                                situations = EXCLUDED.situations,
-                                active = EXCLUDED.active,
-                                updated_at = CURRENT_TIMESTAMP
-                        ''', (
-                            ministry.get('ministry_key'),
-                            ministry.get('name'),
-                            ministry.get('description', ''),
-                            ministry.get('details', ''),
-                            json.dumps(ministry.get('age_groups', ministry.get('age', []))),
-                            json.dumps(ministry.get('genders', ministry.get('gender', []))),
-                            json.dumps(ministry.get('states', ministry.get('state', []))),
-                            json.dumps(ministry.get('interests', ministry.get('interest', []))),
-                            json.dumps(ministry.get('situations', ministry.get('situation', []))),
-                            ministry.get('active', True)
-                        ))
-                    else:
-                        cur.execute('''
-                            INSERT INTO ministries 
-                            (ministry_key, name, description, details, age_groups, 
-                             genders, states, interests, situations, active)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (ministry_key) DO UPDATE SET
-                                name = EXCLUDED.name,
-                                description = EXCLUDED.description,
-                                details = EXCLUDED.details,
-                                age_groups = EXCLUDED.age_groups,
-                                genders = EXCLUDED.genders,
-                                states = EXCLUDED.states,
-                                interests = EXCLUDED.interests,
-                                situations = EXCLUDED.situations,
-                                active = EXCLUDED.active
-                        ''', (
-                            ministry.get('ministry_key'),
-                            ministry.get('name'),
-                            ministry.get('description', ''),
-                            ministry.get('details', ''),
-                            json.dumps(ministry.get('age_groups', ministry.get('age', []))),
-                            json.dumps(ministry.get('genders', ministry.get('gender', []))),
-                            json.dumps(ministry.get('states', ministry.get('state', []))),
-                            json.dumps(ministry.get('interests', ministry.get('interest', []))),
-                            json.dumps(ministry.get('situations', ministry.get('situation', []))),
-                            ministry.get('active', True)
-                        ))
-                    imported_count += 1
-                except Exception as e:
-                    errors.append(f"{ministry.get('name', 'Unknown')}: {str(e)}")
+        if imported_count:
+            bump_catalog_version()
         
         return jsonify({
             'success': True,
             'message': f'Imported {imported_count} ministries',
             'imported': imported_count,
-            'errors': errors
+            'errors': result['errors']
         })
         
     except Exception as e:
@@ -646,7 +596,7 @@ def export_ministries_python():
 @ministry_admin_bp.route('/api/ministries/import-csv', methods=['POST'])
 @require_admin_auth
 def import_ministries_csv():
-    """Import ministries from CSV"""
+    """Import ministries from CSV, streamed into a staging table and merged in one upsert"""
     try:
         if 'file' not in request.files:
             return jsonify({'success': False, 'error': 'No file uploaded'}), 400
@@ -658,107 +608,23 @@ def import_ministries_csv():
         if not file.filename.endswith('.csv'):
             return jsonify({'success': False, 'error': 'File must be CSV format'}), 400
         
-        # Read CSV
-        content = file.read().decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(content))
-        
-        imported_count = 0
-        updated_count = 0
-        errors = []
+        # Decode and parse as COPY reads, so the upload is never held in memory whole
+        csv_reader = csv.DictReader(codecs.iterdecode(file.stream, 'utf-8-sig'))
+        result = import_ministries(
+            (f"Row {row_num}", row) for row_num, row in enumerate(csv_reader, start=2)  # Start at 2 to account for header
+        )
+        imported_count = result['created']
+        updated_count = result['updated']
         
-        with get_db_connection() as (conn, cur):
-            # Check if updated_at exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name = 'ministries' AND column_name = 'updated_at'
-            """)
-            has_updated_at = cur.fetchone() is not None
-            
-            for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header
-                try:
-                    # Parse pipe-separated values
-                    age_groups = [x.strip() for x in row.get('age_groups', '').split('|') if x.strip()]
-                    genders = [x.strip() for x in row.get('genders', '').split('|') if x.strip()]
-                    states = [x.strip() for x in row.get('states', '').split('|') if x.strip()]
-                    interests = [x.strip() for x in row.get('interests', '').split('|') if x.strip()]
-                    situations = [x.strip() for x in row.get('situations', '').split('|') if x.strip()]
-                    
-                    # Check if ministry exists
-                    cur.execute('SELECT id FROM ministries WHERE ministry_key = %s', (row['ministry_key'],))
-                    exists = cur.fetchone()
-                    
-                    if has_updated_at:
-                        cur.execute('''
-                            INSERT INTO ministries 
-                            (ministry_key, name, description, details, age_groups, 
-                             genders, states, interests, situations, active)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (ministry_key) DO UPDATE SET
-                                name = EXCLUDED.name,
-                                description = EXCLUDED.description,
-                                details = EXCLUDED.details,
-                                age_groups = EXCLUDED.age_groups,
-                                genders = EXCLUDED.genders,
-                                states = EXCLUDED.states,
-                                interests = EXCLUDED.interests,
-                                situations = EXCLUDED.situations,
-                                active = EXCLUDED.active,
-                                updated_at = CURRENT_TIMESTAMP
-                        ''', (
-                            row['ministry_key'],
-                            row['name'],
-                            row.get('description', ''),
-                            row.get('details', ''),
-                            json.dumps(age_groups),
-                            json.dumps(genders),
-                            json.dumps(states),
-                            json.dumps(interests),
-                            json.dumps(situations),
-                            row.get('active', 'true').lower() == 'true'
-                        ))
-                    else:
-                        cur.execute('''
-                            INSERT INTO ministries 
-                            (ministry_key, name, description, details, age_groups, 
-                             genders, states, interests, situations, active)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (ministry_key) DO UPDATE SET
-                                name = EXCLUDED.name,
-                                description = EXCLUDED.description,
-                                details = EXCLUDED.details,
-                                age_groups = EXCLUDED.age_groups,
-                                genders = EXCLUDED.genders,
-                                states = EXCLUDED.states,
-                                interests = EXCLUDED.interests,
-                                situations = EXCLUDED.situations,
-                                active = EXCLUDED.active
-                        ''', (
-                            row['ministry_key'],
-                            row['name'],
-                            row.get('description', ''),
-                            row.get('details', ''),
-                            json.dumps(age_groups),
-                            json.dumps(genders),
-                            json.dumps(states),
-                            json.dumps(interests),
-                            json.dumps(situations),
-                            row.get('active', 'true').lower() == 'true'
-                        ))
-                    
-                    if exists:
-                        updated_count += 1
-                    else:
-                        imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
+        if imported_count or updated_count:
+            bump_catalog_version()
         
         return jsonify({
             'success': True,
             'message': f'Imported {imported_count} new ministries, updated {updated_count} existing ministries',
             'imported': imported_count,
             'updated': updated_count,
-            'errors': errors
+            'errors': result['errors']
         })
         
     except Exception as e:
@@ -833,6 +699,7 @@ def permanent_delete_ministries():
                 except Exception as e:
                     errors.append(f"Ministry {ministry_id}: {str(e)}")
         
+        bump_catalog_version()
         logger.warning(f"PERMANENTLY DELETED {deleted_count} ministries")
         
         return jsonify({
@@ -2,9 +2,9 @@
 # Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
 # Unauthorized use, distribution, or modification is prohibited.
 
-from flask import Blueprint, render_template, jsonify
-import app.database as database
-import json
+from flask import Blueprint, render_template, request, Response
+import app.catalog as catalog
+import app.metrics as metrics
 import logging
 
 public_bp = Blueprint('public', __name__)
@@ -17,39 +17,18 @@ def index():
 
 @public_bp.route('/api/get-ministries', methods=['POST', 'GET'])
 def get_ministries():
-    """Get active ministries from database"""
-    try:
-        with database.get_db_connection() as (conn, cur):
-            cur.execute('''
-                SELECT ministry_key, name, description, details,
-                       age_groups, genders, states, interests, situations
-                FROM ministries
-                WHERE active = true
-            ''')
-            
-            ministries = {}
-            for row in cur.fetchall():
-                key = row[0]
-                ministries[key] = {
-                    'name': row[1],
-                    'description': row[2],
-                    'details': row[3],
-                    'age': row[4] if row[4] else [],
-                    'gender': row[5] if row[5] else [],
-                    'state': row[6] if row[6] else [],
-                    'interest': row[7] if row[7] else [],
-                    'situation': row[8] if row[8] else []
-                }
-        
-        return jsonify(ministries)
-    except Exception as e:
-        logger.error(f"Error loading ministries from database: {e}")
-        # Fallback to MINISTRY_DATA if database fails
-        try:
-            from app.ministries import MINISTRY_DATA
-            return jsonify(MINISTRY_DATA)
-        except:
-            return jsonify({})
+    """Serve the active ministry catalog from the in-process snapshot"""
+    snapshot = catalog.get_catalog_snapshot()
+
+    if request.method == 'GET' and request.if_none_match.contains(snapshot.etag):
+        response = Response(status=304)
+    else:
+        response = Response(snapshot.body, mimetype='application/json')
+
+    # Clients may keep a copy but must revalidate it against the ETag
+    response.set_etag(snapshot.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @public_bp.route('/pwa-test')
 def pwa_test():
@@ -69,3 +48,10 @@ def service_worker():
         sw_path = os.path.join(current_app.root_path, '..', 'static', 'sw.js')
         
     return send_file(sw_path, mimetype='application/javascript')
+
+@public_bp.route('/metrics')
+def openmetrics():
+    """Prometheus/OpenMetrics scrape target, summed over every worker on the host"""
+    response = Response(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
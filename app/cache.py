@@ -3,66 +3,371 @@
 # Unauthorized use, distribution, or modification is prohibited.
 
 import json
+import fcntl
 import hashlib
+import heapq
+import mmap
+import os
+import pickle
+import struct
+import tempfile
 import time
 import sys
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import wraps
-from typing import Any, Optional, Callable
+from threading import Lock
+from typing import Any, Hashable, Optional, Callable
 import logging
 
 from app.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+class RedisCacheBackend:
+    """Shared cache in Redis, for multi-worker or multi-host deploys"""
+    
+    name = 'redis'
+    key_prefix = 'involvement-quiz:'
+    
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(
+            url,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+            retry_on_timeout=False,
+            health_check_interval=30
+        )
+        self.client.ping()
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.key_prefix + key)
+    
+    def set(self, key: str, data: bytes, ttl: int) -> bool:
+        return bool(self.client.setex(self.key_prefix + key, max(1, int(ttl)), data))
+    
+    def delete(self, key: str):
+        self.client.delete(self.key_prefix + key)
+    
+    def get_counter(self, name: str) -> int:
+        value = self.client.get(self.key_prefix + 'counter:' + name)
+        return int(value) if value is not None else 0
+    
+    def incr(self, name: str) -> int:
+        return int(self.client.incr(self.key_prefix + 'counter:' + name))
+    
+    def clear(self):
+        """Drop cached values (counters are kept so generations stay monotonic)"""
+        counter_prefix = (self.key_prefix + 'counter:').encode()
+        for key in self.client.scan_iter(match=self.key_prefix + '*', count=500):
+            if not key.startswith(counter_prefix):
+                self.client.delete(key)
+    
+    def get_stats(self) -> dict:
+        info = self.client.info()
+        return {
+            'type': 'redis',
+            'connected_clients': info.get('connected_clients', 0),
+            'used_memory_human': info.get('used_memory_human', '0B'),
+            'keyspace_hits': info.get('keyspace_hits', 0),
+            'keyspace_misses': info.get('keyspace_misses', 0)
+        }
+
+class SharedMemoryCacheBackend:
+    """
+    Shared cache in an mmap-ed file (e.g. under /dev/shm) for single-host deploys
+    
+    The file holds a small table of named counters followed by fixed-size,
+    direct-mapped slots addressed by a stable hash of the key; a colliding
+    write simply replaces the older entry. Every process on the host maps the
+    same file, and fcntl locks on it serialize readers against writers.
+    flock does not exclude threads sharing the fd, so a thread lock is held
+    around every locked section as well.
+    """
+    
+    name = 'shared_memory'
+    MAGIC = b'IQC1'
+    HEADER = struct.Struct('<4sII')       # magic, slot_count, slot_size
+    COUNTER = struct.Struct('<Qq')        # name hash, value
+    SLOT_HEADER = struct.Struct('<QdI')   # key hash, expires, data length
+    HEADER_SIZE = 64
+    COUNTER_SLOTS = 128
+    
+    def __init__(self, path: str, slot_count: int = 256, slot_size: int = 128 * 1024):
+        self.path = path
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.slots_offset = self.HEADER_SIZE + self.COUNTER_SLOTS * self.COUNTER.size
+        self.total_size = self.slots_offset + slot_count * slot_size
+        
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._pid = os.getpid()
+        self._thread_lock = Lock()
+        with self._locked(fcntl.LOCK_EX):
+            if os.fstat(self._fd).st_size != self.total_size:
+                os.ftruncate(self._fd, self.total_size)
+            self._mmap = mmap.mmap(self._fd, self.total_size)
+            magic, existing_slots, existing_size = self.HEADER.unpack_from(self._mmap, 0)
+            if (magic, existing_slots, existing_size) != (self.MAGIC, slot_count, slot_size):
+                # New file or different layout: start empty
+                self._mmap[:self.slots_offset] = bytes(self.slots_offset)
+                self.HEADER.pack_into(self._mmap, 0, self.MAGIC, slot_count, slot_size)
+                for slot in range(slot_count):
+                    self.SLOT_HEADER.pack_into(self._mmap, self._slot_offset(slot), 0, 0.0, 0)
+    
+    def _lock_fd(self) -> int:
+        # flock() locks belong to the open file, which forked workers would share
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR)
+            self._pid = os.getpid()
+        return self._fd
+    
+    @contextmanager
+    def _locked(self, operation: int):
+        """Hold the thread lock and an flock of the given kind"""
+        with self._thread_lock:
+            fd = self._lock_fd()
+            fcntl.flock(fd, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _hash(name: str) -> int:
+        # Python's hash() is salted per process, so use a stable digest
+        return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'little') or 1
+    
+    def _slot_offset(self, slot: int) -> int:
+        return self.slots_offset + slot * self.slot_size
+    
+    def get(self, key: str) -> Optional[bytes]:
+        key_hash = self._hash(key)
+        offset = self._slot_offset(key_hash % self.slot_count)
+        with self._locked(fcntl.LOCK_SH):
+            stored_hash, expires, length = self.SLOT_HEADER.unpack_from(self._mmap, offset)
+            if stored_hash != key_hash or time.time() >= expires:
+                return None
+            start = offset + self.SLOT_HEADER.size
+            return bytes(self._mmap[start:start + length])
+    
+    def set(self, key: str, data: bytes, ttl: int) -> bool:
+        if len(data) > self.slot_size - self.SLOT_HEADER.size:
+            return False
+        key_hash = self._hash(key)
+        offset = self._slot_offset(key_hash % self.slot_count)
+        with self._locked(fcntl.LOCK_EX):
+            start = offset + self.SLOT_HEADER.size
+            self._mmap[start:start + len(data)] = data
+            self.SLOT_HEADER.pack_into(self._mmap, offset, key_hash, time.time() + ttl, len(data))
+            return True
+    
+    def delete(self, key: str):
+        key_hash = self._hash(key)
+        offset = self._slot_offset(key_hash % self.slot_count)
+        with self._locked(fcntl.LOCK_EX):
+            if self.SLOT_HEADER.unpack_from(self._mmap, offset)[0] == key_hash:
+                self.SLOT_HEADER.pack_into(self._mmap, offset, 0, 0.0, 0)
+    
+    def _counter_offset(self, name_hash: int, is_creating: bool) -> Optional[int]:
+        """Linear-probe the counter table (caller holds the lock)"""
+        for probe in range(self.COUNTER_SLOTS):
+            offset = self.HEADER_SIZE + ((name_hash + probe) % self.COUNTER_SLOTS) * self.COUNTER.size
+            stored_hash, _ = self.COUNTER.unpack_from(self._mmap, offset)
+            if stored_hash == name_hash:
+                return offset
+            if stored_hash == 0:
+                return offset if is_creating else None
+        return None
+    
+    def get_counter(self, name: str) -> int:
+        with self._locked(fcntl.LOCK_SH):
+            offset = self._counter_offset(self._hash(name), is_creating=False)
+            return self.COUNTER.unpack_from(self._mmap, offset)[1] if offset is not None else 0
+    
+    def incr(self, name: str) -> int:
+        name_hash = self._hash(name)
+        with self._locked(fcntl.LOCK_EX):
+            offset = self._counter_offset(name_hash, is_creating=True)
+            if offset is None:
+                raise RuntimeError("Shared cache counter table is full")
+            value = self.COUNTER.unpack_from(self._mmap, offset)[1] + 1
+            self.COUNTER.pack_into(self._mmap, offset, name_hash, value)
+            return value
+    
+    def clear(self):
+        """Drop cached values (counters are kept so generations stay monotonic)"""
+        with self._locked(fcntl.LOCK_EX):
+            for slot in range(self.slot_count):
+                self.SLOT_HEADER.pack_into(self._mmap, self._slot_offset(slot), 0, 0.0, 0)
+    
+    def get_stats(self) -> dict:
+        now = time.time()
+        used = 0
+        with self._locked(fcntl.LOCK_SH):
+            for slot in range(self.slot_count):
+                key_hash, expires, _ = self.SLOT_HEADER.unpack_from(self._mmap, self._slot_offset(slot))
+                if key_hash and expires > now:
+                    used += 1
+        return {
+            'type': 'shared_memory',
+            'path': self.path,
+            'slots_used': used,
+            'slot_count': self.slot_count,
+            'slot_size_kb': self.slot_size // 1024,
+            'size_mb': round(self.total_size / (1024 * 1024), 2)
+        }
+
+def create_shared_backend(config: dict):
+    """Build the shared backend selected by CACHE_BACKEND, or None for per-worker memory"""
+    backend = (config.get('CACHE_BACKEND') or 'memory').lower()
+    if backend == 'memory':
+        return None
+    if backend == 'redis':
+        return RedisCacheBackend(config.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0')
+    if backend in ('shared', 'shared_memory', 'mmap'):
+        return SharedMemoryCacheBackend(
+            config.get('CACHE_SHARED_PATH') or os.path.join(
+                '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                'involvement-quiz-cache'
+            ),
+            slot_count=int(config.get('CACHE_SHARED_SLOTS') or 256),
+            slot_size=int(config.get('CACHE_SHARED_SLOT_KB') or 128) * 1024
+        )
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
 class CacheManager:
-    """Simple caching manager with fallback to in-memory cache"""
+    """
+    LRU cache with TTLs and a byte budget, optionally backed by a shared store
+
+    Entries live in an OrderedDict in recency order, so hits and evictions
+    are O(1). Each entry's size is estimated once at insert time and summed
+    into a running total. Expiry is lazy: a get() checks only its own key,
+    and a min-heap of expiry times is drained on writes, so no operation
+    ever scans or stringifies the whole cache.
+
+    With a shared backend configured (Redis or a shared-memory file) values
+    and namespace generations live there instead, so every worker sees the
+    same entries; the in-memory LRU then only serves as a fallback while the
+    shared store is unreachable.
+    """
     
     def __init__(self):
         self.redis_client = None
-        self.memory_cache = {}
+        self.shared_backend = None
+        self.memory_cache = OrderedDict()
         self.cache_ttl = 300  # 5 minutes default
         self.max_cache_size = 500  # Reduced from 1000 to 500
         self.max_memory_mb = 50  # Maximum 50MB for cache
-        self.last_cleanup = time.time()
-        self.cleanup_interval = 60  # Cleanup every 60 seconds
+        self.memory_bytes = 0
+        self._expiry_heap = []
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
         
-        # Use in-memory cache only for simplicity
+        # Namespace -> generation; bumping a generation orphans every key in it
+        self.namespace_generations = {}
+        
+        # Per-worker memory until configure_backend() attaches a shared store
         logger.info("Using in-memory cache")
     
+    @property
+    def is_shared(self) -> bool:
+        """True when entries are visible to every worker"""
+        return self.shared_backend is not None
+    
+    def configure_backend(self, config: dict) -> str:
+        """Attach the shared backend selected by config, falling back to memory"""
+        try:
+            self.shared_backend = create_shared_backend(config)
+        except Exception as e:
+            logger.warning(f"Shared cache backend unavailable, using in-memory cache: {e}")
+            self.shared_backend = None
+        
+        self.redis_client = self.shared_backend.client if isinstance(self.shared_backend, RedisCacheBackend) else None
+        backend_name = self.shared_backend.name if self.shared_backend else 'memory'
+        logger.info(f"Using {backend_name} cache")
+        return backend_name
+    
+    def get_generation(self, namespace: str) -> int:
+        """Current generation of a cache namespace"""
+        if self.shared_backend is not None:
+            try:
+                return self.shared_backend.get_counter(f"generation:{namespace}")
+            except Exception as e:
+                logger.warning(f"Shared cache generation error: {e}")
+        return self.namespace_generations.get(namespace, 0)
+    
+    def invalidate_namespace(self, namespace: str) -> int:
+        """
+        Invalidate every key in a namespace in O(1)
+        
+        Keys embed their namespace generation, so after the bump no lookup
+        can reach the old entries; they age out through LRU eviction or TTL.
+        """
+        with self._lock:
+            generation = self.namespace_generations.get(namespace, 0) + 1
+            self.namespace_generations[namespace] = generation
+        
+        if self.shared_backend is not None:
+            try:
+                return self.shared_backend.incr(f"generation:{namespace}")
+            except Exception as e:
+                logger.warning(f"Shared cache invalidation error: {e}")
+        return generation
+    
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
-        """Generate a cache key from prefix and arguments"""
+        """Generate a cache key in the prefix namespace from the arguments"""
         key_data = f"{prefix}:{str(args)}:{str(sorted(kwargs.items()))}"
-        return hashlib.md5(key_data.encode()).hexdigest()
+        digest = hashlib.md5(key_data.encode()).hexdigest()
+        return f"{prefix}:{self.get_generation(prefix)}:{digest}"
+    
+    @staticmethod
+    def _estimate_size(key: str, value: Any) -> int:
+        """Approximate entry footprint in bytes, computed once per insert"""
+        try:
+            value_size = len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            value_size = sys.getsizeof(value)
+        return len(key) + value_size
     
     def _get_memory_usage(self) -> float:
         """Get current memory usage of cache in MB"""
-        try:
-            # Estimate memory usage by serializing cache
-            cache_size = len(str(self.memory_cache))
-            return cache_size / (1024 * 1024)  # Convert to MB
-        except Exception:
-            return 0.0
+        return self.memory_bytes / (1024 * 1024)
     
-    def _should_cleanup(self) -> bool:
-        """Check if cleanup is needed"""
-        current_time = time.time()
-        return (current_time - self.last_cleanup) > self.cleanup_interval
+    def _remove(self, key: str):
+        """Drop one entry and its byte accounting (caller holds the lock)"""
+        entry = self.memory_cache.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry['size']
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
+        if self.shared_backend is not None:
+            try:
+                data = self.shared_backend.get(key)
+                if data is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                return pickle.loads(data)
+            except Exception as e:
+                logger.warning(f"Shared cache get error, using in-memory cache: {e}")
+        
         try:
-            # Periodic cleanup
-            if self._should_cleanup():
-                self._cleanup_expired()
-            
-            # Use memory cache only
-            if key in self.memory_cache:
-                data = self.memory_cache[key]
-                if time.time() < data['expires']:
-                    return data['value']
-                else:
-                    # Expired, remove it
-                    del self.memory_cache[key]
+            with self._lock:
+                entry = self.memory_cache.get(key)
+                if entry is None:
+                    self.misses += 1
+                    return None
+                if time.time() >= entry['expires']:
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+                self.memory_cache.move_to_end(key)
+                self.hits += 1
+                return entry['value']
         except Exception as e:
             logger.warning(f"Cache get error: {e}")
         
@@ -70,34 +375,50 @@ class CacheManager:
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         """Set value in cache with TTL"""
+        ttl_seconds = ttl if ttl is not None else self.cache_ttl
+        
+        if self.shared_backend is not None:
+            try:
+                return self.shared_backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Shared cache set error, using in-memory cache: {e}")
+        
         try:
-            # Use memory cache only
-            ttl_seconds = ttl if ttl is not None else self.cache_ttl
-            
-            # Clean expired entries first
-            self._cleanup_expired()
-            
-            # Check memory usage
-            current_memory = self._get_memory_usage()
-            if current_memory > self.max_memory_mb:
-                logger.warning(f"Cache memory usage {current_memory:.1f}MB exceeds limit {self.max_memory_mb}MB, clearing cache")
-                self.clear()
+            size = self._estimate_size(key, value)
+            max_bytes = self.max_memory_mb * 1024 * 1024
+            if size > max_bytes:
+                logger.warning(f"Cache entry of {size / (1024 * 1024):.1f}MB exceeds limit {self.max_memory_mb}MB, not caching")
                 return False
             
-            # Check cache size limit
-            if len(self.memory_cache) >= self.max_cache_size:
-                # Remove oldest entries (LRU-like behavior)
-                oldest_keys = sorted(self.memory_cache.keys(), 
-                                   key=lambda k: self.memory_cache[k].get('created', 0))[:50]  # Remove 50 at a time
-                for old_key in oldest_keys:
-                    del self.memory_cache[old_key]
-                logger.debug(f"Cache size limit reached, removed {len(oldest_keys)} old entries")
+            now = time.time()
+            expires = now + ttl_seconds
             
-            self.memory_cache[key] = {
-                'value': value,
-                'expires': time.time() + ttl_seconds,
-                'created': time.time()
-            }
+            with self._lock:
+                self._cleanup_expired(now)
+                self._remove(key)
+                
+                self.memory_cache[key] = {
+                    'value': value,
+                    'expires': expires,
+                    'created': now,
+                    'size': size
+                }
+                self.memory_bytes += size
+                heapq.heappush(self._expiry_heap, (expires, key))
+                
+                # Evict least recently used entries until within both limits
+                evicted = 0
+                while len(self.memory_cache) > self.max_cache_size or self.memory_bytes > max_bytes:
+                    old_key, old_entry = self.memory_cache.popitem(last=False)
+                    self.memory_bytes -= old_entry['size']
+                    evicted += 1
+                if evicted:
+                    logger.debug(f"Cache limits reached, evicted {evicted} least recently used entries")
+                
+                # Overwritten and evicted keys leave stale heap items; rebuild if they dominate
+                if len(self._expiry_heap) > 2 * len(self.memory_cache) + 64:
+                    self._expiry_heap = [(entry['expires'], k) for k, entry in self.memory_cache.items()]
+                    heapq.heapify(self._expiry_heap)
             return True
         except Exception as e:
             logger.warning(f"Cache set error: {e}")
@@ -106,8 +427,10 @@ class CacheManager:
     def delete(self, key: str) -> bool:
         """Delete value from cache"""
         try:
-            if key in self.memory_cache:
-                del self.memory_cache[key]
+            if self.shared_backend is not None:
+                self.shared_backend.delete(key)
+            with self._lock:
+                self._remove(key)
             return True
         except Exception as e:
             logger.warning(f"Cache delete error: {e}")
@@ -116,48 +439,123 @@ class CacheManager:
     def clear(self) -> bool:
         """Clear all cache"""
         try:
-            self.memory_cache.clear()
-            self.last_cleanup = time.time()
+            if self.shared_backend is not None:
+                self.shared_backend.clear()
+            with self._lock:
+                self.memory_cache.clear()
+                self.memory_bytes = 0
+                self._expiry_heap = []
             return True
         except Exception as e:
             logger.warning(f"Cache clear error: {e}")
             return False
     
     def exists(self, key: str) -> bool:
-        """Check if key exists in cache"""
+        """Check if key exists in cache (without counting a hit or miss)"""
+        if self.shared_backend is not None:
+            try:
+                return self.shared_backend.get(key) is not None
+            except Exception as e:
+                logger.warning(f"Shared cache exists error, using in-memory cache: {e}")
+        
         try:
-            return key in self.memory_cache and time.time() < self.memory_cache[key]['expires']
+            with self._lock:
+                entry = self.memory_cache.get(key)
+                return entry is not None and time.time() < entry['expires']
         except Exception as e:
             logger.warning(f"Cache exists error: {e}")
             return False
     
-    def _cleanup_expired(self):
-        """Remove expired cache entries"""
-        try:
-            current_time = time.time()
-            expired_keys = [
-                key for key, data in self.memory_cache.items()
-                if current_time >= data['expires']
-            ]
-            for key in expired_keys:
-                del self.memory_cache[key]
-            
-            if expired_keys:
-                logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
-            
-            self.last_cleanup = current_time
-        except Exception as e:
-            logger.warning(f"Cache cleanup error: {e}")
+    def _cleanup_expired(self, now: Optional[float] = None):
+        """Pop entries whose expiry has passed off the heap (caller holds the lock)"""
+        current_time = now if now is not None else time.time()
+        heap = self._expiry_heap
+        expired = 0
+        while heap and heap[0][0] <= current_time:
+            expires, key = heapq.heappop(heap)
+            entry = self.memory_cache.get(key)
+            # Skip heap items left behind by overwritten or evicted keys
+            if entry is not None and entry['expires'] == expires:
+                self._remove(key)
+                expired += 1
+        
+        if expired:
+            logger.debug(f"Cleaned up {expired} expired cache entries")
+
+class VersionedLRUCache:
+    """
+    Bounded LRU memo whose entries all belong to a single data version
+
+    Storing a value for a new version drops every older entry in one step,
+    so readers never see results computed against a stale catalog.
+    """
+    
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self.version = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = Lock()
+    
+    def get(self, version: Hashable, key: Hashable) -> Optional[Any]:
+        """Get a memoized value computed for this version"""
+        with self._lock:
+            if version != self.version or key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+    
+    def set(self, version: Hashable, key: Hashable, value: Any):
+        """Memoize a value, evicting the least recently used entry when full"""
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    self.invalidations += 1
+                self.entries = OrderedDict()
+                self.version = version
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self.entries = OrderedDict()
+            self.version = None
+    
+    def get_stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'invalidations': self.invalidations
+        }
 
 # Global cache instance
 cache_manager = CacheManager()
 
+# Recommendation results keyed by canonical quiz answers, per catalog version
+recommendation_cache = VersionedLRUCache(max_size=2048)
+
+# Cache namespaces that can be invalidated as a whole
+MINISTRY_NAMESPACE = 'ministries'
+SUBMISSION_NAMESPACE = 'submissions'
+
 def cached(prefix: str, ttl: int = 300):
     """
     Decorator to cache function results
     
     Args:
-        prefix: Cache key prefix
+        prefix: Cache namespace; invalidate_namespace(prefix) drops all results
         ttl: Time to live in seconds
     """
     def decorator(func: Callable) -> Callable:
@@ -183,45 +581,53 @@ def cached(prefix: str, ttl: int = 300):
 
 def cache_ministries(func: Callable) -> Callable:
     """Specialized decorator for ministry data caching"""
-    return cached('ministries', ttl=600)(func)  # 10 minutes for ministry data
+    return cached(MINISTRY_NAMESPACE, ttl=600)(func)  # 10 minutes for ministry data
 
 def cache_submissions(func: Callable) -> Callable:
     """Specialized decorator for submission data caching"""
-    return cached('submissions', ttl=300)(func)  # 5 minutes for submission data
+    return cached(SUBMISSION_NAMESPACE, ttl=300)(func)  # 5 minutes for submission data
 
-def invalidate_ministry_cache():
-    """Invalidate all ministry-related cache"""
+def invalidate_ministry_cache() -> int:
+    """Invalidate all ministry-related cache, returning the new generation"""
     try:
-        # Clear memory cache keys starting with 'ministries:'
-        keys_to_delete = [k for k in cache_manager.memory_cache.keys() if k.startswith('ministries:')]
-        for key in keys_to_delete:
-            del cache_manager.memory_cache[key]
-        
-        logger.info("Ministry cache invalidated")
+        generation = cache_manager.invalidate_namespace(MINISTRY_NAMESPACE)
+        logger.info(f"Ministry cache invalidated (generation {generation})")
+        return generation
     except Exception as e:
         logger.warning(f"Failed to invalidate ministry cache: {e}")
+        return cache_manager.get_generation(MINISTRY_NAMESPACE)
+
+def invalidate_submission_cache():
+    """Invalidate all submission-related cache"""
+    try:
+        generation = cache_manager.invalidate_namespace(SUBMISSION_NAMESPACE)
+        logger.info(f"Submission cache invalidated (generation {generation})")
+    except Exception as e:
+        logger.warning(f"Failed to invalidate submission cache: {e}")
 
 def get_cache_stats() -> dict:
     """Get cache statistics"""
     try:
-        if cache_manager.redis_client:
-            info = cache_manager.redis_client.info()
-            return {
-                'type': 'redis',
-                'connected_clients': info.get('connected_clients', 0),
-                'used_memory_human': info.get('used_memory_human', '0B'),
-                'keyspace_hits': info.get('keyspace_hits', 0),
-                'keyspace_misses': info.get('keyspace_misses', 0)
+        if cache_manager.shared_backend is not None:
+            stats = cache_manager.shared_backend.get_stats()
+            stats['namespaces'] = {
+                namespace: cache_manager.get_generation(namespace)
+                for namespace in (MINISTRY_NAMESPACE, SUBMISSION_NAMESPACE)
             }
         else:
             memory_usage = cache_manager._get_memory_usage()
-            return {
+            stats = {
                 'type': 'memory',
                 'cache_size': len(cache_manager.memory_cache),
                 'memory_usage_mb': round(memory_usage, 2),
                 'max_memory_mb': cache_manager.max_memory_mb,
-                'max_cache_size': cache_manager.max_cache_size
+                'max_cache_size': cache_manager.max_cache_size,
+                'namespaces': dict(cache_manager.namespace_generations)
             }
+        stats['hits'] = cache_manager.hits
+        stats['misses'] = cache_manager.misses
+        stats['recommendations'] = recommendation_cache.get_stats()
+        return stats
     except Exception as e:
         logger.warning(f"Failed to get cache stats: {e}")
         return {'type': 'unknown', 'error': str(e)} 
\ No newline at end of file
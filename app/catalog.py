@@ -0,0 +1,296 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import hashlib
+import json
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+import app.database as database
+from app.cache import cache_manager, invalidate_ministry_cache, MINISTRY_NAMESPACE
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Safety net so edits made through a sibling worker become visible here too
+# when each worker has its own memory cache; a shared cache carries them over
+# within CATALOG_VERSION_CHECK_SECONDS
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 300))
+# How long a worker trusts the shared catalog version before asking again
+CATALOG_VERSION_CHECK_SECONDS = float(os.environ.get('CATALOG_VERSION_CHECK_SECONDS', 2))
+
+class CatalogSnapshot(NamedTuple):
+    """Immutable, pre-serialized view of the active ministry catalog"""
+    version: int
+    ministries: Dict[str, Dict[str, Any]]
+    body: bytes
+    etag: str
+    built_at: float
+    is_fallback: bool
+
+_snapshot: Optional[CatalogSnapshot] = None
+_build_lock = Lock()
+# (shared version, this worker's own generation, monotonic time checked)
+_version_check: Optional[Tuple[int, int, float]] = None
+
+def normalize_tags(value: Any) -> list:
+    """Tag columns are stored as JSON text; always hand out real lists"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except json.JSONDecodeError:
+            return []
+        return parsed if isinstance(parsed, list) else []
+    return []
+
+def _make_snapshot(ministries: Dict[str, Dict[str, Any]], version: int, is_fallback: bool = False) -> CatalogSnapshot:
+    """Serialize the catalog once and derive a strong ETag from the bytes"""
+    # Key order is the catalog display order, so it must survive serialization
+    body = json.dumps(ministries, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return CatalogSnapshot(version, ministries, body, etag, time.time(), is_fallback)
+
+ACTIVE_MINISTRIES_SQL = '''
+    SELECT ministry_key, name, description, details,
+           age_groups, genders, states, interests, situations
+    FROM ministries
+    WHERE active = true
+    ORDER BY id
+'''
+database.register_prepared('active_ministries', ACTIVE_MINISTRIES_SQL)
+
+def _load_catalog() -> Dict[str, Dict[str, Any]]:
+    """Read active ministries from the database in the public catalog shape"""
+    with database.get_db_connection() as (conn, cur):
+        database.execute_prepared(cur, 'active_ministries')
+
+        ministries = {}
+        for row in cur.fetchall():
+            ministries[row[0]] = {
+                'name': row[1],
+                'description': row[2],
+                'details': row[3],
+                'age': normalize_tags(row[4]),
+                'gender': normalize_tags(row[5]),
+                'state': normalize_tags(row[6]),
+                'interest': normalize_tags(row[7]),
+                'situation': normalize_tags(row[8])
+            }
+    return ministries
+
+def _load_fallback_catalog() -> Dict[str, Dict[str, Any]]:
+    """Bundled MINISTRY_DATA, used only while the database is unreachable"""
+    try:
+        from app.ministries import MINISTRY_DATA
+        return MINISTRY_DATA
+    except Exception:
+        return {}
+
+def get_catalog_version() -> int:
+    """
+    Current catalog version, shared by every worker when the cache is
+
+    A shared version costs a round trip (to Redis, say), so it is re-read
+    at most every CATALOG_VERSION_CHECK_SECONDS; a bump made by this worker
+    moves its own generation and is seen at once.
+    """
+    global _version_check
+    if not cache_manager.is_shared:
+        return cache_manager.get_generation(MINISTRY_NAMESPACE)
+
+    local_generation = cache_manager.namespace_generations.get(MINISTRY_NAMESPACE, 0)
+    now = time.monotonic()
+    check = _version_check
+    if check is not None and check[1] == local_generation and now - check[2] < CATALOG_VERSION_CHECK_SECONDS:
+        return check[0]
+
+    version = cache_manager.get_generation(MINISTRY_NAMESPACE)
+    _version_check = (version, local_generation, now)
+    return version
+
+def bump_catalog_version() -> int:
+    """Mark the catalog as changed; the next read rebuilds the snapshot"""
+    version = invalidate_ministry_cache()
+    logger.info(f"Ministry catalog version bumped to {version}")
+    return version
+
+def _shared_snapshot_key(version: int) -> str:
+    return f"{MINISTRY_NAMESPACE}:{version}:catalog-snapshot"
+
+def _load_shared_snapshot(version: int) -> Optional[CatalogSnapshot]:
+    """Snapshot built by a sibling worker for this version, if any"""
+    if not cache_manager.is_shared:
+        return None
+    parts = cache_manager.get(_shared_snapshot_key(version))
+    if parts is None:
+        return None
+    ministries, body, etag = parts
+    return CatalogSnapshot(version, ministries, body, etag, time.time(), False)
+
+def _store_shared_snapshot(snapshot: CatalogSnapshot) -> None:
+    if cache_manager.is_shared:
+        cache_manager.set(_shared_snapshot_key(snapshot.version),
+                          (snapshot.ministries, snapshot.body, snapshot.etag), ttl=CATALOG_MAX_AGE)
+
+def _is_current(snapshot: Optional[CatalogSnapshot], version: int) -> bool:
+    if snapshot is None or snapshot.is_fallback:
+        return False
+    if snapshot.version != version:
+        return False
+    return time.time() - snapshot.built_at < CATALOG_MAX_AGE
+
+def get_catalog_snapshot() -> CatalogSnapshot:
+    """
+    Return the active catalog snapshot, rebuilding it only when the version moved
+
+    Readers never block on the database while a current snapshot exists, and
+    with a shared cache only one worker per version queries it at all. If a
+    rebuild fails the previous snapshot keeps being served; with no previous
+    snapshot the bundled MINISTRY_DATA is served (and not retained).
+    """
+    global _snapshot
+
+    snapshot = _snapshot
+    version = get_catalog_version()
+    if _is_current(snapshot, version):
+        return snapshot
+
+    with _build_lock:
+        # Another thread may have rebuilt while we waited for the lock
+        snapshot = _snapshot
+        version = get_catalog_version()
+        if _is_current(snapshot, version):
+            return snapshot
+
+        shared = _load_shared_snapshot(version)
+        if shared is not None:
+            _snapshot = shared
+            return shared
+
+        try:
+            ministries = _load_catalog()
+        except Exception as e:
+            logger.error(f"Error loading ministries from database: {e}")
+            if snapshot is not None and not snapshot.is_fallback:
+                return snapshot
+            return _make_snapshot(_load_fallback_catalog(), version, is_fallback=True)
+
+        _snapshot = _make_snapshot(ministries, version)
+        _store_shared_snapshot(_snapshot)
+        logger.info(f"Built ministry catalog snapshot v{version} ({len(ministries)} ministries, {len(_snapshot.body)} bytes)")
+        return _snapshot
+
+# Bundled catalog fields -> ministries columns; tag lists are stored as JSON text
+SYNC_COLUMNS = (
+    ('name', 'name'), ('description', 'description'), ('details', 'details'),
+    ('age', 'age_groups'), ('gender', 'genders'), ('state', 'states'),
+    ('interest', 'interests'), ('situation', 'situations')
+)
+# Bundled ministry that must always stay active
+ALWAYS_ACTIVE_KEY = 'mass'
+
+def _sync_row(key: str, ministry: Dict[str, Any]) -> tuple:
+    values = []
+    for field, _ in SYNC_COLUMNS:
+        value = ministry.get(field, [] if field not in ('name', 'description', 'details') else '')
+        values.append(json.dumps(value) if isinstance(value, list) else value)
+    content_hash = hashlib.sha256(json.dumps([key] + values).encode('utf-8')).hexdigest()
+    return (key, *values, content_hash)
+
+def _catalog_digest(hashes: Dict[str, str]) -> str:
+    # Must match the string_agg in sync_catalog (byte order, i.e. COLLATE "C")
+    joined = ','.join(f"{key}:{hashes[key]}" for key in sorted(hashes))
+    return hashlib.md5(joined.encode('utf-8')).hexdigest()
+
+def sync_catalog(ministries: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, int]:
+    """
+    Upsert the bundled catalog (MINISTRY_DATA) into the ministries table
+
+    Each row records the hash of the bundled content it was last synced
+    from, so a sync writes only ministries whose bundled content changed
+    and leaves edits made in the admin alone otherwise. Rows that predate
+    hashing keep their content and are just stamped. Missing ministries are
+    only inserted into an empty table (plus the always-active one), so a
+    ministry deleted in the admin stays deleted. A sync with nothing to do
+    costs one query.
+    """
+    if ministries is None:
+        from app.ministries import MINISTRY_DATA
+        ministries = MINISTRY_DATA
+
+    rows = [_sync_row(key, ministry) for key, ministry in ministries.items()]
+    hashes = {row[0]: row[-1] for row in rows}
+    columns = ['ministry_key'] + [column for _, column in SYNC_COLUMNS]
+    # Adopted rows (no hash yet) keep what is in the database
+    updates = ',\n'.join(
+        f"{column} = CASE WHEN ministries.content_hash IS NULL THEN ministries.{column} ELSE EXCLUDED.{column} END"
+        for column in columns[1:]
+    )
+
+    with database.get_db_connection() as (conn, cur):
+        cur.execute('''
+            SELECT md5(COALESCE(string_agg(ministry_key || ':' || COALESCE(content_hash, ''), ','
+                                           ORDER BY ministry_key COLLATE "C"), '')),
+                   COALESCE(bool_and(active) FILTER (WHERE ministry_key = %s), TRUE),
+                   COALESCE(array_agg(ministry_key), '{}'),
+                   NOT EXISTS (SELECT 1 FROM ministries)
+            FROM ministries
+            WHERE ministry_key = ANY(%s)
+        ''', (ALWAYS_ACTIVE_KEY, list(hashes)))
+        digest, always_active_ok, present, is_empty = cur.fetchone()
+
+        # Bundled ministries absent from a seeded table were deleted in the admin
+        if not is_empty:
+            kept = set(present) | {ALWAYS_ACTIVE_KEY}
+            rows = [row for row in rows if row[0] in kept]
+        skipped = len(hashes) - len(rows)
+        if digest == _catalog_digest({row[0]: row[-1] for row in rows}) and always_active_ok:
+            logger.info(f"Ministry catalog in sync ({len(rows)} ministries, {skipped} deleted in the admin)")
+            return {'inserted': 0, 'updated': 0, 'unchanged': len(rows), 'skipped': skipped}
+
+        # The always-active key is a constant; execute_values takes no other parameters
+        written = execute_values(cur, f'''
+            INSERT INTO ministries ({', '.join(columns)}, active, content_hash)
+            VALUES %s
+            ON CONFLICT (ministry_key) DO UPDATE SET
+                {updates},
+                active = ministries.active OR EXCLUDED.ministry_key = '{ALWAYS_ACTIVE_KEY}',
+                content_hash = EXCLUDED.content_hash,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE ministries.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+               OR (EXCLUDED.ministry_key = '{ALWAYS_ACTIVE_KEY}' AND NOT ministries.active)
+            RETURNING (xmax = 0)
+        ''', rows, template='(' + ', '.join(['%s'] * len(columns)) + ', TRUE, %s)',
+            page_size=len(rows), fetch=True)
+
+    inserted = sum(1 for (is_insert,) in written if is_insert)
+    result = {'inserted': inserted, 'updated': len(written) - inserted,
+              'unchanged': len(rows) - len(written), 'skipped': skipped}
+    if written:
+        bump_catalog_version()
+    logger.info(f"Ministry catalog synced: {result}")
+    return result
+
+def seed_catalog_if_empty() -> Optional[Dict[str, int]]:
+    """
+    Sync the bundled catalog into an empty ministries table, or do nothing
+
+    create_app runs this after the migrations so a fresh database is seeded
+    however the app is started (python main.py, or gunicorn without
+    preload); keeping an existing catalog in sync is left to sync_catalog.
+    """
+    with database.get_db_connection() as (conn, cur):
+        cur.execute('SELECT EXISTS (SELECT 1 FROM ministries)')
+        if cur.fetchone()[0]:
+            return None
+    logger.info("Ministries table is empty, seeding the bundled catalog")
+    return sync_catalog()
@@ -98,5 +98,10 @@ class Config:
             'SESSION_TIMEOUT': cls.get_session_timeout(),
             'DEBUG': env == 'development',  # Only debug in development
             'FLASK_ENV': env,
-            'IS_PRODUCTION': env == 'production'
+            'IS_PRODUCTION': env == 'production',
+            'CACHE_BACKEND': os.environ.get('CACHE_BACKEND', 'memory'),
+            'CACHE_REDIS_URL': os.environ.get('CACHE_REDIS_URL') or os.environ.get('REDIS_URL'),
+            'CACHE_SHARED_PATH': os.environ.get('CACHE_SHARED_PATH'),
+            'CACHE_SHARED_SLOTS': os.environ.get('CACHE_SHARED_SLOTS', 256),
+            'CACHE_SHARED_SLOT_KB': os.environ.get('CACHE_SHARED_SLOT_KB', 128)
         }
@@ -3,24 +3,290 @@
 # Unauthorized use, distribution, or modification is prohibited.
 
 import os
+import codecs
+import csv
+import io
+import json
 import logging
+import re
+import tempfile
+import time
+import weakref
 import psycopg2
 import psycopg2.pool
 import psycopg2.extras
+from collections import deque
 from contextlib import contextmanager
-from threading import Lock
+from threading import Condition, Event, Lock, Thread
+
+from app.query_stats import DB_QUERY_STATS, instrumented, query_stats
 
 logger = logging.getLogger(__name__)
 
+# Pool sizing is per process, so each gunicorn worker gets its own min/max
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+# Seconds a request waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+# Connections are replaced after this many seconds, or after sitting idle this
+# long, so server-side idle disconnects and stale sessions never reach a request
+DB_POOL_MAX_AGE = float(os.environ.get('DB_POOL_MAX_AGE', 1800))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', 300))
+# Only connections idle longer than this are pinged before use
+DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 30))
+# How often the background reaper recycles idle connections
+DB_POOL_REAP_INTERVAL = float(os.environ.get('DB_POOL_REAP_INTERVAL', 60))
+
+class PoolTimeoutError(psycopg2.pool.PoolError):
+    """No connection became free within the checkout timeout"""
+
+class BlockingConnectionPool(psycopg2.pool.AbstractConnectionPool):
+    """
+    Thread-safe pool that waits for a free connection instead of failing
+
+    ThreadedConnectionPool raises PoolError as soon as every connection is in
+    use; here callers queue in FIFO order and each is handed the next
+    connection returned, up to a checkout timeout. Wait times and how often
+    the pool was saturated are counted for the health endpoint.
+
+    Each connection's creation and last-use time is tracked: connections past
+    max_age or max_idle are replaced at checkout or by the background reaper,
+    and only those idle longer than ping_after need a ping before use.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=DB_POOL_TIMEOUT, max_age=DB_POOL_MAX_AGE,
+                 max_idle=DB_POOL_MAX_IDLE, ping_after=DB_POOL_PING_AFTER, **kwargs):
+        self._lock = Lock()
+        self._waiters = deque()
+        self.timeout = timeout
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        # id(conn) -> monotonic time created / last returned to the pool
+        self._created = {}
+        self._last_used = {}
+        self._reaper = None
+        self._reaper_stop = Event()
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+            'peak_in_use': 0,
+            'recycled': 0,
+            'pings': 0,
+            'ping_failures': 0
+        }
+        psycopg2.pool.AbstractConnectionPool.__init__(self, minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        conn = psycopg2.pool.AbstractConnectionPool._connect(self, key)
+        self._created[id(conn)] = self._last_used[id(conn)] = time.monotonic()
+        return conn
+
+    def _forget(self, conn):
+        self._created.pop(id(conn), None)
+        self._last_used.pop(id(conn), None)
+
+    def _expired(self, conn, now):
+        return (now - self._created.get(id(conn), now) > self.max_age
+                or now - self._last_used.get(id(conn), now) > self.max_idle)
+
+    def _discard(self, conn):
+        """Close a connection and drop it from the pool (lock held)"""
+        key = self._rused.pop(id(conn), None)
+        if key is not None:
+            self._used.pop(key, None)
+        elif conn in self._pool:
+            self._pool.remove(conn)
+        self._forget(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _has_capacity(self):
+        return bool(self._pool) or len(self._used) < self.maxconn
+
+    def _checkout(self, key):
+        now = time.monotonic()
+        conn = self._getconn(key)
+        while self._expired(conn, now):
+            self._discard(conn)
+            self.stats['recycled'] += 1
+            conn = self._getconn(key)
+        self.stats['checkouts'] += 1
+        self.stats['peak_in_use'] = max(self.stats['peak_in_use'], len(self._used))
+        return conn
+
+    def getconn(self, key=None, timeout=None):
+        """Get a free connection, waiting up to timeout seconds for one"""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.closed:
+                raise psycopg2.pool.PoolError("connection pool is closed")
+            # Queue behind existing waiters even if a connection is free, so
+            # a newcomer never jumps ahead of a request that has been waiting
+            if not self._waiters and self._has_capacity():
+                return self._checkout(key)
+
+            waiter = Condition(self._lock)
+            self._waiters.append(waiter)
+            self.stats['waits'] += 1
+            started = time.monotonic()
+            try:
+                while not (self._waiters[0] is waiter and self._has_capacity()):
+                    remaining = started + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection free after {timeout:g}s ({self.maxconn} in use)"
+                        )
+                    waiter.wait(remaining)
+                    if self.closed:
+                        raise psycopg2.pool.PoolError("connection pool is closed")
+                return self._checkout(key)
+            finally:
+                self._waiters.remove(waiter)
+                waited_ms = (time.monotonic() - started) * 1000
+                self.stats['wait_ms_total'] += waited_ms
+                self.stats['wait_ms_max'] = max(self.stats['wait_ms_max'], waited_ms)
+                # Pass any remaining capacity on to the next request in line
+                if self._waiters and self._has_capacity():
+                    self._waiters[0].notify()
+
+    def putconn(self, conn=None, key=None, close=False):
+        """Return a connection and wake the longest-waiting request"""
+        with self._lock:
+            self._putconn(conn, key, close)
+            # The base pool closes connections beyond minconn instead of keeping them
+            if any(idle is conn for idle in self._pool):
+                self._last_used[id(conn)] = time.monotonic()
+            else:
+                self._forget(conn)
+            if self._waiters:
+                self._waiters[0].notify()
+
+    def needs_ping(self, conn):
+        """True when a checked-out connection sat idle long enough to be suspect"""
+        with self._lock:
+            return time.monotonic() - self._last_used.get(id(conn), 0) > self.ping_after
+
+    def ping(self, conn):
+        """Round-trip a trivial query; False if the server has dropped the connection"""
+        with self._lock:
+            self.stats['pings'] += 1
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            with self._lock:
+                self.stats['ping_failures'] += 1
+            return False
+
+    def discard_idle(self):
+        """Close every idle connection, e.g. once one of them is found dead"""
+        with self._lock:
+            idle = list(self._pool)
+            for conn in idle:
+                self._discard(conn)
+            self.stats['recycled'] += len(idle)
+            return len(idle)
+
+    def reap(self):
+        """Close idle connections past max_age/max_idle and refill to minconn"""
+        now = time.monotonic()
+        with self._lock:
+            if self.closed:
+                return 0
+            expired = [conn for conn in self._pool if self._expired(conn, now)]
+            for conn in expired:
+                self._discard(conn)
+            self.stats['recycled'] += len(expired)
+            missing = min(self.minconn - len(self._pool), self.maxconn - len(self._pool) - len(self._used))
+
+        # Connect outside the lock so checkouts are not held up by the handshake
+        fresh = []
+        for _ in range(max(0, missing)):
+            try:
+                fresh.append(psycopg2.connect(*self._args, **self._kwargs))
+            except psycopg2.Error as e:
+                logger.warning(f"Connection pool reaper could not reconnect: {e}")
+                break
+
+        with self._lock:
+            for conn in fresh:
+                if self.closed or len(self._pool) + len(self._used) >= self.maxconn:
+                    conn.close()
+                    continue
+                self._pool.append(conn)
+                self._created[id(conn)] = self._last_used[id(conn)] = time.monotonic()
+                if self._waiters:
+                    self._waiters[0].notify()
+        if expired:
+            logger.info(f"Recycled {len(expired)} idle database connections")
+        return len(expired)
+
+    def start_reaper(self, interval=DB_POOL_REAP_INTERVAL):
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper_stop.clear()
+        self._reaper = Thread(target=self._reap_loop, args=(interval,), name='db-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self, interval):
+        while not self._reaper_stop.wait(interval):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Connection pool reaper error: {e}")
+
+    def closeall(self):
+        self._reaper_stop.set()
+        with self._lock:
+            self._closeall()
+            self._created.clear()
+            self._last_used.clear()
+            for waiter in self._waiters:
+                waiter.notify()
+
+    def get_stats(self):
+        with self._lock:
+            waits = self.stats['waits']
+            return {
+                **self.stats,
+                'wait_ms_total': round(self.stats['wait_ms_total'], 1),
+                'wait_ms_max': round(self.stats['wait_ms_max'], 1),
+                'avg_wait_ms': round(self.stats['wait_ms_total'] / waits, 1) if waits else 0.0,
+                'in_use': len(self._used),
+                'idle': len(self._pool),
+                'waiting': len(self._waiters),
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'timeout': self.timeout,
+                'max_age': self.max_age,
+                'max_idle': self.max_idle
+            }
+
+# Prepared statements must be skipped behind a transaction-mode pgbouncer
+DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', 'true').lower() == 'true'
+
 # Thread-safe connection pool instance
 _connection_pool = None
 _pool_pid = None
 _pool_lock = Lock()
 
-def init_connection_pool(minconn=2, maxconn=10):
-    """Initialize the connection pool"""
+def init_connection_pool(minconn=None, maxconn=None, timeout=None):
+    """Initialize the connection pool (sizes default to DB_POOL_MIN/DB_POOL_MAX)"""
     global _connection_pool, _pool_pid
     
+    minconn = DB_POOL_MIN if minconn is None else minconn
+    maxconn = DB_POOL_MAX if maxconn is None else maxconn
+    timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+    
     with _pool_lock:
         current_pid = os.getpid()
         
@@ -39,10 +305,11 @@ def init_connection_pool(minconn=2, maxconn=10):
         try:
             if DATABASE_URL:
                 # Production database
-                _connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                _connection_pool = BlockingConnectionPool(
                     minconn,
                     maxconn,
                     DATABASE_URL,
+                    timeout=timeout,
                     sslmode='require',
                     connect_timeout=10,  # 10 second connection timeout
                     options='-c statement_timeout=30000'  # 30 second query timeout
@@ -50,9 +317,10 @@ def init_connection_pool(minconn=2, maxconn=10):
                 logger.info(f"Initialized production connection pool (min={minconn}, max={maxconn})")
             else:
                 # Local development
-                _connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                _connection_pool = BlockingConnectionPool(
                     minconn,
                     maxconn,
+                    timeout=timeout,
                     host=os.environ.get('DB_HOST', 'localhost'),
                     database=os.environ.get('DB_NAME', 'st_edward_ministries'),
                     user=os.environ.get('DB_USER', 'your_username'),
@@ -67,6 +335,7 @@ def init_connection_pool(minconn=2, maxconn=10):
             raise
             
         _pool_pid = current_pid
+        _connection_pool.start_reaper()
             
     return _connection_pool
 
@@ -83,10 +352,13 @@ def get_connection_pool():
     return _connection_pool
 
 @contextmanager
-def get_db_connection(cursor_factory=None):
+def get_db_connection(cursor_factory=None, timeout=None):
     """
     Context manager for database connections with automatic cleanup
     
+    Waits up to timeout seconds (DB_POOL_TIMEOUT by default) for a free
+    connection before raising PoolTimeoutError.
+    
     Usage:
         with get_db_connection() as (conn, cur):
             cur.execute("SELECT * FROM table")
@@ -101,25 +373,26 @@ def get_db_connection(cursor_factory=None):
     
     try:
         # Get connection from pool
-        conn = pool.getconn()
+        checkout_started = time.perf_counter()
+        conn = pool.getconn(timeout=timeout)
         
-        # Verify connection is alive and healthy
-        is_healthy = False
-        try:
-            if not conn.closed:
-                # poll() returns None if healthy, or raises error
-                conn.poll()
-                is_healthy = True
-        except (psycopg2.OperationalError, psycopg2.InterfaceError):
-            is_healthy = False
-
-        if not is_healthy:
-            logger.warning("Retrieved unhealthy connection from pool, attempting to get a new one")
+        # Recently used connections are trusted; one that sat idle may have been
+        # dropped by the server (or the host slept), so it is pinged first
+        if conn.closed or (pool.needs_ping(conn) and not pool.ping(conn)):
+            logger.warning("Retrieved dead connection from pool, discarding idle connections and reconnecting")
             try:
                 pool.putconn(conn, close=True)
             except:
                 pass
-            conn = pool.getconn()
+            conn = None
+            # Its idle siblings are most likely dead too
+            pool.discard_idle()
+            conn = pool.getconn(timeout=timeout)
+        
+        if DB_QUERY_STATS:
+            query_stats.record_checkout(time.perf_counter() - checkout_started)
+            # Times each statement by its SQL fingerprint for /api/metrics
+            cursor_factory = instrumented(cursor_factory)
             
         if cursor_factory:
             cur = conn.cursor(cursor_factory=cursor_factory)
@@ -176,11 +449,69 @@ def close_connection_pool():
     global _connection_pool
     
     with _pool_lock:
-        if _connection_pool:
+        if _connection_pool and _pool_pid != os.getpid():
+            # Inherited across fork: the sockets belong to the parent, so only forget them
+            _connection_pool = None
+        elif _connection_pool:
             _connection_pool.closeall()
             _connection_pool = None
             logger.info("Connection pool closed")
 
+def warm_connection_pool():
+    """Open this process's pool (minconn connections) before it takes traffic"""
+    pool = get_connection_pool()
+    stats = pool.get_stats()
+    logger.info(f"Connection pool warm in PID {os.getpid()}: {stats['idle']} idle of max {stats['max_size']}")
+    return stats['idle']
+
+def get_pool_stats():
+    """Checkout, wait and saturation counters for this worker's pool"""
+    pool = _connection_pool
+    if pool is None or _pool_pid != os.getpid():
+        return {'initialized': False}
+    return {'initialized': True, **pool.get_stats()}
+
+# Registered statements: name -> SQL with %s placeholders
+_prepared_sql = {}
+# Names already prepared on each connection; entries go away with the connection
+_prepared_on = weakref.WeakKeyDictionary()
+
+def register_prepared(name, sql):
+    """
+    Register a hot query to be run as a server-side prepared statement
+    
+    The SQL uses the usual %s placeholders; parameter types are inferred by
+    Postgres, so add casts (e.g. %s::text[]) wherever they are ambiguous.
+    """
+    if not re.fullmatch(r'[a-z_][a-z0-9_]*', name):
+        raise ValueError(f"Invalid prepared statement name: {name}")
+    _prepared_sql[name] = sql
+
+def execute_prepared(cur, name, params=()):
+    """
+    Execute a registered statement on this cursor's connection
+    
+    The statement is PREPAREd the first time a connection runs it, so
+    Postgres parses and plans it once per connection instead of per call.
+    Results are read from the cursor as usual.
+    """
+    sql = _prepared_sql[name]
+    if not DB_PREPARED_STATEMENTS:
+        cur.execute(sql, params or None)
+        return
+
+    prepared = _prepared_on.setdefault(cur.connection, set())
+    if name not in prepared:
+        counter = iter(range(1, len(params) + 1))
+        # Prepared statements outlive transactions, so this holds even if the caller rolls back
+        cur.execute(f"PREPARE {name} AS {re.sub('%s', lambda _: f'${next(counter)}', sql)}")
+        prepared.add(name)
+
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
 def execute_query(query, params=None, fetch_one=False, cursor_factory=None):
     """
     Helper function for simple queries
@@ -221,22 +552,32 @@ def execute_many(query, params_list):
         cur.executemany(query, params_list)
         return cur.rowcount
 
-# CSV Export specific function
-def get_submissions_for_csv(date_from=None, date_to=None):
+# Columns included in the admin CSV export, in file order
+EXPORT_COLUMNS = (
+    'id', 'name', 'age_group', 'gender', 'state_in_life', 'interest',
+    'situation', 'recommended_ministries', 'submitted_at'
+)
+
+def _csv_value(value):
+    # JSONB columns come back as lists; write them as JSON, like COPY does
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def stream_submissions_csv(date_from=None, date_to=None, use_copy=False, itersize=2000):
     """
-    Get submissions for CSV export with dynamic column handling
+    Generate the submissions CSV in chunks without loading the table
     
-    Args:
-        date_from: Optional start date filter
-        date_to: Optional end date filter
-        
-    Returns:
-        Tuple of (headers, rows)
-    """
-    query = """
-        SELECT * FROM ministry_submissions
-        WHERE 1=1
+    Rows are read through a named (server-side) cursor, itersize rows per
+    round trip, and each batch is yielded as CSV text, so memory stays flat
+    however large the export. With use_copy=True Postgres renders the CSV
+    itself via COPY ... TO STDOUT; that output is spooled to a temporary
+    file (in memory up to 1MB) and streamed from there.
+    
+    The query runs when the first chunk (the header row) is requested, so
+    callers can pull it eagerly to surface database errors before streaming.
     """
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM ministry_submissions WHERE 1=1"
     params = []
     
     if date_from:
@@ -249,13 +590,40 @@ def get_submissions_for_csv(date_from=None, date_to=None):
         
     query += " ORDER BY submitted_at DESC"
     
-    with get_db_connection(cursor_factory=psycopg2.extras.RealDictCursor) as (conn, cur):
-        cur.execute(query, params)
-        
-        # Get column names dynamically from cursor description
-        headers = [desc[0] for desc in cur.description]
-        
-        # Fetch all rows
-        rows = cur.fetchall()
+    with get_db_connection() as (conn, cur):
+        if use_copy:
+            copy_sql = f"COPY ({cur.mogrify(query, params).decode('utf-8')}) TO STDOUT WITH (FORMAT csv, HEADER)"
+            with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+                cur.copy_expert(copy_sql, spool)
+                spool.seek(0)
+                # Fixed-size reads can split a multibyte character between chunks
+                decoder = codecs.getincrementaldecoder('utf-8')()
+                while True:
+                    chunk = spool.read(64 * 1024)
+                    text = decoder.decode(chunk, final=not chunk)
+                    if text:
+                        yield text
+                    if not chunk:
+                        break
+            return
         
-        return headers, rows
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        export_cur = conn.cursor(name='submissions_export')
+        export_cur.itersize = itersize
+        try:
+            export_cur.execute(query, params)
+            writer.writerow(EXPORT_COLUMNS)
+            
+            while True:
+                rows = export_cur.fetchmany(itersize)
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                if chunk:
+                    yield chunk
+                if not rows:
+                    break
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+        finally:
+            export_cur.close()
@@ -0,0 +1,311 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import glob
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Every worker writes its own file here; /metrics sums them all
+METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    'involvement-quiz-metrics'
+)
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Request latency buckets in seconds (+Inf is implied)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Pool, cache and queue counters are copied into the file at most this often
+PUBLISH_INTERVAL = 1.0
+
+# name -> (type, help). Gauges only count files of live processes; counters
+# and histograms keep the totals of exited workers so they never go backwards
+FAMILIES = {
+    'quiz_http_requests': ('counter', 'HTTP requests by route, method and status'),
+    'quiz_http_request_duration_seconds': ('histogram', 'HTTP request latency by route and method'),
+    'quiz_http_response_bytes': ('counter', 'HTTP response body bytes by route and method'),
+    'quiz_db_pool_connections': ('gauge', 'Pooled database connections by state'),
+    'quiz_db_pool_max_connections': ('gauge', 'Configured maximum pool size, summed over workers'),
+    'quiz_db_pool_checkouts': ('counter', 'Connections checked out of the pool'),
+    'quiz_db_pool_waits': ('counter', 'Checkouts that had to wait for a free connection'),
+    'quiz_db_pool_timeouts': ('counter', 'Checkouts that gave up waiting'),
+    'quiz_cache_requests': ('counter', 'Cache lookups by cache and result'),
+    'quiz_submissions': ('counter', 'Accepted quiz submissions by write path'),
+    'quiz_submission_queue_events': ('counter', 'Write-behind submission queue activity by event'),
+    'quiz_submission_queue_pending': ('gauge', 'Submissions waiting in the write-behind queue'),
+}
+
+class MetricsFile:
+    """
+    One process's metric values in an mmap-ed file
+
+    The file is a header holding the bytes in use, followed by entries of a
+    length-prefixed key and an 8-byte aligned double. Only the owning process
+    writes it, so updates need just a thread lock; new entries are written
+    before the header is bumped, so readers in other processes never see a
+    half-written one.
+    """
+
+    MAGIC = b'IQM1'
+    HEADER = struct.Struct('<4sI')   # magic, bytes used
+    KEY_LENGTH = struct.Struct('<I')
+    VALUE = struct.Struct('<d')
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._size = max(os.fstat(self._fd).st_size, self.INITIAL_SIZE)
+        os.ftruncate(self._fd, self._size)
+        self._mmap = mmap.mmap(self._fd, self._size)
+        self._offsets: Dict[str, int] = {}
+        magic, used = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            self.HEADER.pack_into(self._mmap, 0, self.MAGIC, self.HEADER.size)
+        else:
+            for key, offset in _entries(self._mmap, used):
+                self._offsets[key] = offset
+
+    def _offset(self, key: str) -> int:
+        """Value offset for a key, appending an entry for a new one (caller holds the lock)"""
+        offset = self._offsets.get(key)
+        if offset is not None:
+            return offset
+
+        encoded = key.encode('utf-8')
+        _, used = self.HEADER.unpack_from(self._mmap, 0)
+        value_at = _align(used + self.KEY_LENGTH.size + len(encoded))
+        end = value_at + self.VALUE.size
+        if end > self._size:
+            while end > self._size:
+                self._size *= 2
+            os.ftruncate(self._fd, self._size)
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._fd, self._size)
+
+        self.KEY_LENGTH.pack_into(self._mmap, used, len(encoded))
+        self._mmap[used + self.KEY_LENGTH.size:used + self.KEY_LENGTH.size + len(encoded)] = encoded
+        self.VALUE.pack_into(self._mmap, value_at, 0.0)
+        self.HEADER.pack_into(self._mmap, 0, self.MAGIC, end)
+        self._offsets[key] = value_at
+        return value_at
+
+    def inc(self, key: str, amount: float = 1.0):
+        with self._lock:
+            offset = self._offset(key)
+            self.VALUE.pack_into(self._mmap, offset, self.VALUE.unpack_from(self._mmap, offset)[0] + amount)
+
+    def set(self, key: str, value: float):
+        with self._lock:
+            self.VALUE.pack_into(self._mmap, self._offset(key), value)
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _entries(data, used: int) -> Iterable[Tuple[str, int]]:
+    """(key, value offset) for each entry in a metrics file's bytes"""
+    position = MetricsFile.HEADER.size
+    while position < used:
+        length = MetricsFile.KEY_LENGTH.unpack_from(data, position)[0]
+        start = position + MetricsFile.KEY_LENGTH.size
+        value_at = _align(start + length)
+        yield bytes(data[start:start + length]).decode('utf-8'), value_at
+        position = value_at + MetricsFile.VALUE.size
+
+def read_metrics_file(path: str) -> Dict[str, float]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MetricsFile.HEADER.size:
+        return {}
+    magic, used = MetricsFile.HEADER.unpack_from(data, 0)
+    if magic != MetricsFile.MAGIC:
+        return {}
+    return {key: MetricsFile.VALUE.unpack_from(data, offset)[0] for key, offset in _entries(data, used)}
+
+_file: Optional[MetricsFile] = None
+_file_pid: Optional[int] = None
+_file_lock = Lock()
+_last_publish = 0.0
+
+def _metrics_file() -> MetricsFile:
+    """This process's file; a forked worker opens its own rather than writing its parent's"""
+    global _file, _file_pid
+    if _file is None or _file_pid != os.getpid():
+        with _file_lock:
+            if _file is None or _file_pid != os.getpid():
+                os.makedirs(METRICS_DIR, exist_ok=True)
+                _file = MetricsFile(os.path.join(METRICS_DIR, f'{os.getpid()}.db'))
+                _file_pid = os.getpid()
+    return _file
+
+def _key(sample: str, **labels) -> str:
+    return json.dumps([sample, sorted(labels.items())], separators=(',', ':'))
+
+def inc(sample: str, amount: float = 1.0, **labels):
+    try:
+        _metrics_file().inc(_key(sample, **labels), amount)
+    except OSError as e:
+        # Metrics must never fail the request that records them
+        logger.debug(f"Metric {sample} not recorded: {e}")
+
+def set_value(sample: str, value: float, **labels):
+    try:
+        _metrics_file().set(_key(sample, **labels), value)
+    except OSError as e:
+        logger.debug(f"Metric {sample} not recorded: {e}")
+
+def observe_request(method: str, route: str, status_code: int, seconds: float, response_size: Optional[int]):
+    """Count one request and add its duration to the latency histogram"""
+    try:
+        metrics_file = _metrics_file()
+        metrics_file.inc(_key('quiz_http_requests_total', method=method, route=route, status=str(status_code)))
+        le = next((str(bound) for bound in LATENCY_BUCKETS if seconds <= bound), '+Inf')
+        metrics_file.inc(_key('quiz_http_request_duration_seconds_bucket', method=method, route=route, le=le))
+        metrics_file.inc(_key('quiz_http_request_duration_seconds_count', method=method, route=route))
+        metrics_file.inc(_key('quiz_http_request_duration_seconds_sum', method=method, route=route), seconds)
+        if response_size:
+            metrics_file.inc(_key('quiz_http_response_bytes_total', method=method, route=route), response_size)
+        publish_process_stats()
+    except Exception as e:
+        logger.debug(f"Request metrics not recorded: {e}")
+
+def publish_process_stats(force: bool = False):
+    """Copy this worker's pool, cache and queue counters into its metrics file"""
+    global _last_publish
+    now = time.monotonic()
+    if not force and now - _last_publish < PUBLISH_INTERVAL:
+        return
+    _last_publish = now
+
+    # Imported here: these modules are heavier and some import this one
+    from app.cache import cache_manager, recommendation_cache
+    from app.database import get_pool_stats
+    from app.submission_queue import submission_queue
+
+    pool = get_pool_stats()
+    if pool.get('initialized'):
+        for state in ('in_use', 'idle', 'waiting'):
+            set_value('quiz_db_pool_connections', pool[state], state=state)
+        set_value('quiz_db_pool_max_connections', pool['max_size'])
+        set_value('quiz_db_pool_checkouts_total', pool['checkouts'])
+        set_value('quiz_db_pool_waits_total', pool['waits'])
+        set_value('quiz_db_pool_timeouts_total', pool['timeouts'])
+
+    for cache_name, cache in (('app', cache_manager), ('recommendations', recommendation_cache)):
+        set_value('quiz_cache_requests_total', cache.hits, cache=cache_name, result='hit')
+        set_value('quiz_cache_requests_total', cache.misses, cache=cache_name, result='miss')
+
+    queue = submission_queue.get_stats()
+    for event in ('enqueued', 'written', 'batches', 'rejected', 'spilled', 'replayed', 'failures'):
+        set_value('quiz_submission_queue_events_total', queue[event], event=event)
+    set_value('quiz_submission_queue_pending', queue['pending'])
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _family_of(sample: str) -> str:
+    for suffix in ('_total', '_bucket', '_count', '_sum'):
+        if sample.endswith(suffix) and sample[:-len(suffix)] in FAMILIES:
+            return sample[:-len(suffix)]
+    return sample
+
+def collect() -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """Sum every worker's samples; gauges only from processes still running"""
+    totals: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.db')):
+        try:
+            pid = int(os.path.basename(path)[:-3])
+            values = read_metrics_file(path)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Skipping metrics file {path}: {e}")
+            continue
+        alive = None
+        for key, value in values.items():
+            sample, labels = json.loads(key)
+            if FAMILIES.get(_family_of(sample), ('counter',))[0] == 'gauge':
+                if alive is None:
+                    alive = _pid_alive(pid)
+                if not alive:
+                    continue
+            sample_key = (sample, tuple(tuple(pair) for pair in labels))
+            totals[sample_key] = totals.get(sample_key, 0.0) + value
+    return totals
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_sample(sample: str, labels: Iterable[Tuple[str, str]], value: float) -> str:
+    label_text = ','.join(f'{name}="{_escape(str(label))}"' for name, label in labels)
+    number = repr(value) if value != int(value) else str(int(value))
+    return f'{sample}{{{label_text}}} {number}' if label_text else f'{sample} {number}'
+
+def render_metrics() -> str:
+    """All workers' metrics in OpenMetrics text format"""
+    publish_process_stats(force=True)
+    by_family: Dict[str, List[Tuple[str, Tuple[Tuple[str, str], ...], float]]] = {}
+    for (sample, labels), value in collect().items():
+        by_family.setdefault(_family_of(sample), []).append((sample, labels, value))
+
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        samples = by_family.get(family)
+        if not samples:
+            continue
+        lines.append(f'# TYPE {family} {kind}')
+        lines.append(f'# HELP {family} {help_text}')
+        if kind == 'histogram':
+            lines.extend(_histogram_lines(family, samples))
+        else:
+            for sample, labels, value in sorted(samples):
+                lines.append(_format_sample(sample, labels, value))
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+def _histogram_lines(family: str, samples) -> List[str]:
+    """Cumulative buckets, then count and sum, for each label set"""
+    series: Dict[Tuple[Tuple[str, str], ...], Dict[str, object]] = {}
+    for sample, labels, value in samples:
+        le = dict(labels).get('le')
+        base = tuple(pair for pair in labels if pair[0] != 'le')
+        entry = series.setdefault(base, {'buckets': {}, 'count': 0.0, 'sum': 0.0})
+        if sample.endswith('_bucket'):
+            entry['buckets'][le] = value
+        elif sample.endswith('_count'):
+            entry['count'] = value
+        else:
+            entry['sum'] = value
+
+    lines = []
+    for labels, entry in sorted(series.items()):
+        cumulative = 0.0
+        for bound in [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']:
+            cumulative += entry['buckets'].get(bound, 0.0)
+            lines.append(_format_sample(f'{family}_bucket', labels + (('le', bound),), cumulative))
+        lines.append(_format_sample(f'{family}_count', labels, entry['count']))
+        lines.append(_format_sample(f'{family}_sum', labels, entry['sum']))
+    return lines
+
+def clear_metrics_dir():
+    """Start from zero; called by the gunicorn master before any worker exists"""
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
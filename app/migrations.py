@@ -2,17 +2,78 @@
 # Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
 # Unauthorized use, distribution, or modification is prohibited.
 
-import logging
-from app.database import get_db_connection
+import psycopg2
+
+import app.database as database
 from app.logging_config import get_logger
+from app.rollups import device_rollups_sql, rollup_tables_sql
 
 logger = get_logger(__name__)
 
+# Held while migrating so only one worker applies migrations at a time
+MIGRATION_LOCK_ID = 4851_0016
+
 class MigrationManager:
     """Simple database migration manager"""
     
     def __init__(self):
         self.migrations = [
+            {
+                # Formerly init_db(), which ran its checks on every boot; it
+                # precedes migration 1 because fresh databases were created by it
+                'id': 0,
+                'name': 'initial_submission_schema',
+                'sql': '''
+                    CREATE TABLE IF NOT EXISTS ministry_submissions (
+                        id SERIAL PRIMARY KEY,
+                        name VARCHAR(255),
+                        email VARCHAR(255) DEFAULT '',
+                        age_group VARCHAR(50),
+                        gender VARCHAR(20),
+                        state_in_life JSONB DEFAULT '[]'::jsonb,
+                        interest JSONB,
+                        situation JSONB DEFAULT '[]'::jsonb,
+                        recommended_ministries JSONB DEFAULT '[]'::jsonb,
+                        submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        ip_address VARCHAR(45)
+                    );
+                    
+                    ALTER TABLE ministry_submissions
+                        ADD COLUMN IF NOT EXISTS situation JSONB DEFAULT '[]'::jsonb,
+                        ADD COLUMN IF NOT EXISTS ip_address VARCHAR(45),
+                        ALTER COLUMN email DROP NOT NULL,
+                        ALTER COLUMN email SET DEFAULT '';
+                    
+                    DO $$
+                    BEGIN
+                        IF EXISTS (
+                            SELECT 1 FROM information_schema.columns
+                            WHERE table_name = 'ministry_submissions'
+                              AND column_name = 'state_in_life'
+                              AND data_type <> 'jsonb'
+                        ) THEN
+                            BEGIN
+                                ALTER TABLE ministry_submissions
+                                ALTER COLUMN state_in_life TYPE JSONB
+                                USING
+                                    CASE
+                                        WHEN state_in_life IS NULL OR state_in_life = '' THEN '[]'::jsonb
+                                        WHEN state_in_life LIKE '[%' THEN state_in_life::jsonb
+                                        ELSE to_jsonb(ARRAY[state_in_life])
+                                    END;
+                            EXCEPTION
+                                WHEN others THEN
+                                    -- Keep the text column; readers handle both shapes
+                                    NULL;
+                            END;
+                        END IF;
+                    END
+                    $$;
+                    
+                    -- Ministries tables created by init_db() lacked this column
+                    ALTER TABLE IF EXISTS ministries ADD COLUMN IF NOT EXISTS situations TEXT;
+                '''
+            },
             {
                 'id': 1,
                 'name': 'create_ministry_submissions_table',
@@ -151,89 +212,175 @@ class MigrationManager:
                     END
                     $$;
                 '''
+            },
+            {
+                'id': 8,
+                'name': 'add_submission_ref',
+                'sql': '''
+                    ALTER TABLE ministry_submissions
+                        ADD COLUMN IF NOT EXISTS submission_ref VARCHAR(36);
+
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_ministry_submissions_submission_ref
+                        ON ministry_submissions(submission_ref);
+                '''
+            },
+            {
+                'id': 9,
+                'name': 'add_submission_keyset_indexes',
+                'sql': '''
+                    CREATE INDEX IF NOT EXISTS idx_ministry_submissions_keyset
+                        ON ministry_submissions(submitted_at DESC, id DESC);
+
+                    CREATE INDEX IF NOT EXISTS idx_ministry_submissions_age_group_keyset
+                        ON ministry_submissions(age_group, submitted_at DESC, id DESC);
+
+                    CREATE INDEX IF NOT EXISTS idx_ministry_submissions_gender_keyset
+                        ON ministry_submissions(gender, submitted_at DESC, id DESC);
+
+                    DO $$
+                    BEGIN
+                        -- Containment index for the ministry filter, only once the column is JSONB
+                        IF EXISTS (
+                            SELECT 1 FROM information_schema.columns
+                            WHERE table_name = 'ministry_submissions'
+                              AND column_name = 'recommended_ministries'
+                              AND data_type = 'jsonb'
+                        ) THEN
+                            CREATE INDEX IF NOT EXISTS idx_ministry_submissions_recommended_gin
+                                ON ministry_submissions USING GIN (recommended_ministries jsonb_path_ops);
+                        END IF;
+                    END
+                    $$;
+                '''
+            },
+            {
+                'id': 10,
+                'name': 'create_submission_rollups',
+                'sql': rollup_tables_sql()
+            },
+            {
+                'id': 11,
+                'name': 'add_ministry_content_hash',
+                'sql': '''
+                    ALTER TABLE ministries
+                        ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)
+                '''
+            },
+            {
+                'id': 12,
+                'name': 'add_device_rollups',
+                'sql': device_rollups_sql()
             }
         ]
     
-    def create_migrations_table(self):
-        """Create the migrations tracking table"""
+    @property
+    def latest_version(self):
+        """Schema version once every migration is applied"""
+        return max(m['id'] for m in self.migrations)
+    
+    def get_schema_version(self):
+        """Recorded schema version, or None if it has never been recorded"""
         try:
-            with get_db_connection() as (conn, cur):
-                cur.execute('''
-                    CREATE TABLE IF NOT EXISTS migrations (
-                        id SERIAL PRIMARY KEY,
-                        migration_id INTEGER UNIQUE NOT NULL,
-                        name VARCHAR(255) NOT NULL,
-                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                conn.commit()
-                logger.info("Migrations table created/verified")
-        except Exception as e:
-            logger.error(f"Failed to create migrations table: {e}")
-            raise
+            with database.get_db_connection() as (conn, cur):
+                cur.execute('SELECT version FROM schema_version')
+                row = cur.fetchone()
+                return row[0] if row else None
+        except psycopg2.Error:
+            # Tracking tables are created on the first full migration run
+            return None
     
-    def get_applied_migrations(self):
+    def create_tracking_tables(self, cur):
+        """Create the migrations and schema version tables"""
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS migrations (
+                id SERIAL PRIMARY KEY,
+                migration_id INTEGER UNIQUE NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            
+            CREATE TABLE IF NOT EXISTS schema_version (
+                singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+                version INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    
+    def get_applied_migrations(self, cur):
         """Get list of applied migration IDs"""
-        try:
-            with get_db_connection() as (conn, cur):
-                cur.execute('SELECT migration_id FROM migrations ORDER BY migration_id')
-                return [row[0] for row in cur.fetchall()]
-        except Exception as e:
-            logger.error(f"Failed to get applied migrations: {e}")
-            return []
+        cur.execute('SELECT migration_id FROM migrations ORDER BY migration_id')
+        return [row[0] for row in cur.fetchall()]
     
-    def apply_migration(self, migration):
-        """Apply a single migration"""
-        try:
-            with get_db_connection() as (conn, cur):
-                # Execute the migration SQL
-                cur.execute(migration['sql'])
+    def apply_migration(self, cur, migration):
+        """Apply a single migration and record it in the same transaction"""
+        cur.execute(migration['sql'])
+        cur.execute('''
+            INSERT INTO migrations (migration_id, name)
+            VALUES (%s, %s)
+        ''', (migration['id'], migration['name']))
+        logger.info(f"Applied migration {migration['id']}: {migration['name']}")
+    
+    def run_migrations(self):
+        """
+        Bring the schema up to date
+        
+        Boots with a current schema cost a single query. Otherwise one worker
+        applies the pending migrations under an advisory lock while the others
+        wait on it, then find nothing left to do.
+        """
+        latest = self.latest_version
+        current = self.get_schema_version()
+        if current is not None and current >= latest:
+            logger.info(f"Schema is current (version {current})")
+            return
+        
+        with database.get_db_connection() as (conn, cur):
+            # Migrations may run longer than the per-statement timeout, and so may the wait
+            cur.execute('SET statement_timeout = 0')
+            cur.execute('SELECT pg_advisory_lock(%s)', (MIGRATION_LOCK_ID,))
+            try:
+                self.create_tracking_tables(cur)
+                conn.commit()
                 
-                # Record the migration
-                cur.execute('''
-                    INSERT INTO migrations (migration_id, name)
-                    VALUES (%s, %s)
-                ''', (migration['id'], migration['name']))
+                # Read under the lock: another worker may have just finished
+                applied_migrations = set(self.get_applied_migrations(cur))
+                pending_migrations = [
+                    m for m in sorted(self.migrations, key=lambda m: m['id'])
+                    if m['id'] not in applied_migrations
+                ]
                 
+                if pending_migrations:
+                    logger.info(f"Running {len(pending_migrations)} pending migrations")
+                for migration in pending_migrations:
+                    try:
+                        self.apply_migration(cur, migration)
+                        conn.commit()
+                    except Exception as e:
+                        logger.error(f"Failed to apply migration {migration['id']}: {e}")
+                        raise
+                
+                cur.execute('''
+                    INSERT INTO schema_version (version) VALUES (%s)
+                    ON CONFLICT (singleton)
+                    DO UPDATE SET version = GREATEST(schema_version.version, EXCLUDED.version),
+                                  updated_at = CURRENT_TIMESTAMP
+                ''', (latest,))
                 conn.commit()
-                logger.info(f"Applied migration {migration['id']}: {migration['name']}")
+                logger.info(f"Schema at version {latest}")
                 
-        except Exception as e:
-            logger.error(f"Failed to apply migration {migration['id']}: {e}")
-            raise
-    
-    def run_migrations(self):
-        """Run all pending migrations"""
-        try:
-            # Ensure migrations table exists
-            self.create_migrations_table()
-            
-            # Get applied migrations
-            applied_migrations = self.get_applied_migrations()
-            
-            # Find pending migrations
-            pending_migrations = [
-                m for m in self.migrations 
-                if m['id'] not in applied_migrations
-            ]
-            
-            if not pending_migrations:
-                logger.info("No pending migrations")
-                return
-            
-            logger.info(f"Running {len(pending_migrations)} pending migrations")
-            
-            # Apply pending migrations
-            for migration in pending_migrations:
-                self.apply_migration(migration)
-            
-            logger.info("All migrations completed successfully")
-            
-        except Exception as e:
-            logger.error(f"Migration failed: {e}")
-            raise
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Migration failed: {e}")
+                raise
+            finally:
+                try:
+                    cur.execute('SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_ID,))
+                    cur.execute('RESET statement_timeout')
+                except psycopg2.Error:
+                    # The lock goes away with the session if the connection broke
+                    pass
 
 def run_migrations():
     """Convenience function to run migrations"""
     manager = MigrationManager()
-    manager.run_migrations() 
\ No newline at end of file
+    manager.run_migrations()
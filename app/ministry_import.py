@@ -0,0 +1,143 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import app.database as database
+from app.error_handlers import ValidationError
+from app.logging_config import get_logger
+from app.schema import has_column
+
+logger = get_logger(__name__)
+
+IMPORT_COLUMNS = (
+    'ministry_key', 'name', 'description', 'details', 'age_groups',
+    'genders', 'states', 'interests', 'situations', 'active'
+)
+# Tag columns and the bundled-catalog field names also accepted for them
+TAG_COLUMNS = (
+    ('age_groups', 'age'), ('genders', 'gender'), ('states', 'state'),
+    ('interests', 'interest'), ('situations', 'situation')
+)
+# Column limits of the ministries table, checked up front so they are row errors
+MAX_KEY_LENGTH = 100
+MAX_NAME_LENGTH = 255
+
+def _tags(value: Any) -> List[str]:
+    """Tag lists arrive as JSON lists or as pipe-separated CSV cells"""
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    if isinstance(value, str):
+        return [item.strip() for item in value.split('|') if item.strip()]
+    return []
+
+def ministry_import_row(raw: Any) -> tuple:
+    """Validate one imported ministry and return it in IMPORT_COLUMNS order"""
+    if not isinstance(raw, dict):
+        raise ValidationError("Each ministry must be an object")
+
+    key = (raw.get('ministry_key') or '').strip()
+    name = (raw.get('name') or '').strip()
+    if not key:
+        raise ValidationError("ministry_key is required", 'ministry_key')
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValidationError(f"ministry_key is longer than {MAX_KEY_LENGTH} characters", 'ministry_key')
+    if not name:
+        raise ValidationError("name is required", 'name')
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValidationError(f"name is longer than {MAX_NAME_LENGTH} characters", 'name')
+
+    active = raw.get('active', True)
+    if isinstance(active, str):
+        active = active.strip().lower() == 'true'
+
+    tags = [json.dumps(_tags(raw.get(column, raw.get(alias)))) for column, alias in TAG_COLUMNS]
+    return (key, name, raw.get('description') or '', raw.get('details') or '', *tags, bool(active))
+
+class _CopyStream:
+    """Read-only file object that COPY pulls from, producing lines on demand"""
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = ''
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def _staging_lines(rows: Iterable[Tuple[str, Any]], errors: List[str]) -> Iterator[str]:
+    """CSV lines for the staging table; rows that fail validation become errors"""
+    out = io.StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator='\n')
+    for position, (label, raw) in enumerate(rows):
+        try:
+            values = ministry_import_row(raw)
+        except ValidationError as e:
+            errors.append(f"{label}: {e.message}")
+            continue
+        writer.writerow((position, *values))
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+
+def import_ministries(rows: Iterable[Tuple[str, Any]]) -> Dict[str, Any]:
+    """
+    Upsert ministries from (label, row) pairs in a fixed handful of statements
+
+    Rows are validated as they are read and streamed through COPY into a
+    temporary staging table, then merged into ministries with one upsert,
+    so neither the upload nor the statement count grows with its size.
+    When a key appears more than once the last row wins. Labels name the
+    row in validation errors.
+    """
+    errors: List[str] = []
+    columns = ', '.join(IMPORT_COLUMNS)
+    updates = ',\n'.join(f"{column} = EXCLUDED.{column}" for column in IMPORT_COLUMNS[1:])
+    if has_column('ministries', 'updated_at'):
+        updates += ',\nupdated_at = CURRENT_TIMESTAMP'
+
+    with database.get_db_connection() as (conn, cur):
+        cur.execute('''
+            CREATE TEMP TABLE ministry_import (
+                position INTEGER,
+                ministry_key TEXT,
+                name TEXT,
+                description TEXT,
+                details TEXT,
+                age_groups TEXT,
+                genders TEXT,
+                states TEXT,
+                interests TEXT,
+                situations TEXT,
+                active BOOLEAN
+            ) ON COMMIT DROP
+        ''')
+        cur.copy_expert(f"COPY ministry_import (position, {columns}) FROM STDIN WITH (FORMAT csv)",
+                        _CopyStream(_staging_lines(rows, errors)))
+
+        cur.execute(f'''
+            INSERT INTO ministries ({columns})
+            SELECT DISTINCT ON (ministry_key) {columns}
+            FROM ministry_import
+            ORDER BY ministry_key, position DESC
+            ON CONFLICT (ministry_key) DO UPDATE SET
+                {updates}
+            RETURNING (xmax = 0)
+        ''')
+        written = cur.fetchall()
+
+    created = sum(1 for (is_insert,) in written if is_insert)
+    result = {'created': created, 'updated': len(written) - created, 'errors': errors}
+    logger.info(f"Imported ministries: {created} created, {result['updated']} updated, {len(errors)} rejected")
+    return result
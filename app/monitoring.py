@@ -4,23 +4,91 @@
 
 import time
 import threading
+from array import array
+from bisect import bisect_left
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import logging
 
-# Try to import optional dependencies
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    PSUTIL_AVAILABLE = False
-    psutil = None
+from flask import g, request
 
+import app.metrics as metrics
 from app.logging_config import get_logger
 from app.cache import cache_manager, get_cache_stats
+from app.query_stats import get_query_stats
+from app.system_stats import get_system_snapshot
 
 logger = get_logger(__name__)
 
+# Latency bucket upper bounds in seconds: 0.5ms to 60s, each 10% above the last,
+# so a reported percentile is at most 10% above the true value
+LATENCY_GROWTH = 1.1
+
+def _latency_bounds(lowest: float = 0.0005, highest: float = 60.0) -> List[float]:
+    bounds = []
+    bound = lowest
+    while bound < highest:
+        bounds.append(bound)
+        bound *= LATENCY_GROWTH
+    # Catch-all bucket for anything slower
+    return bounds + [float('inf')]
+
+LATENCY_BOUNDS = _latency_bounds()
+
+# Rolling windows reported per route, in minutes
+LATENCY_WINDOWS = (1, 5, 60)
+LATENCY_PERCENTILES = (50, 95, 99)
+
+class LatencyHistogram:
+    """
+    Response-time histogram for one route, kept per minute for the last hour
+
+    Each minute is a compact array of bucket counts, allocated on the first
+    request in that minute and reused an hour later, so recording is O(1)
+    and memory does not grow with traffic. A window of N minutes merges the
+    N most recent whole minutes plus the current, partial one.
+    """
+    
+    __slots__ = ('_counts', '_minutes')
+    
+    def __init__(self):
+        self._counts: List[Optional[array]] = [None] * max(LATENCY_WINDOWS)
+        self._minutes = [-1] * max(LATENCY_WINDOWS)
+    
+    def record(self, seconds: float, now: Optional[float] = None):
+        minute = int((time.time() if now is None else now) // 60)
+        slot = minute % len(self._counts)
+        if self._minutes[slot] != minute:
+            self._counts[slot] = array('I', [0]) * len(LATENCY_BOUNDS)
+            self._minutes[slot] = minute
+        self._counts[slot][bisect_left(LATENCY_BOUNDS, seconds)] += 1
+    
+    def percentiles(self, minutes: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """Request count and p50/p95/p99 in milliseconds over the last minutes"""
+        current = int((time.time() if now is None else now) // 60)
+        merged = [0] * len(LATENCY_BOUNDS)
+        for slot, minute in enumerate(self._minutes):
+            if current - minutes <= minute <= current:
+                for bucket, count in enumerate(self._counts[slot]):
+                    merged[bucket] += count
+        
+        total = sum(merged)
+        summary: Dict[str, Any] = {'count': total}
+        for percentile in LATENCY_PERCENTILES:
+            summary[f'p{percentile}'] = self._value_at(merged, total * percentile / 100) if total else None
+        return summary
+    
+    @staticmethod
+    def _value_at(merged: List[int], rank: float) -> float:
+        seen = 0
+        for bucket, count in enumerate(merged):
+            seen += count
+            if seen >= rank:
+                # Requests past the last finite bound are reported at that bound
+                bound = LATENCY_BOUNDS[min(bucket, len(LATENCY_BOUNDS) - 2)]
+                return round(bound * 1000, 1)
+        return round(LATENCY_BOUNDS[-2] * 1000, 1)
+
 class ApplicationMonitor:
     """Application performance monitoring"""
     
@@ -28,8 +96,11 @@ class ApplicationMonitor:
         self.start_time = time.time()
         self.request_counts = {}
         self.error_counts = {}
-        self.response_times = []
-        self.max_response_times = 100  # Keep last 100 response times
+        self.latency: Dict[str, LatencyHistogram] = {}  # Same keys as request_counts
+        self.latency_lock = threading.Lock()
+        self.timed_requests = 0
+        self.total_response_time = 0.0
+        self.slow_requests = 0
         self.max_request_counts = 50  # Maximum number of endpoints to track
         self.max_error_counts = 100  # Maximum number of error types to track
         
@@ -45,7 +116,7 @@ class ApplicationMonitor:
         self.last_health_check = time.time()
         self.health_check_interval = 900  # Check system health every 15 minutes (increased from 5)
         self.last_cpu_check = time.time()
-        self.cpu_check_interval = 1800  # Check CPU every 30 minutes (new separate interval)
+        self.cpu_check_interval = 300  # Reads the shared host snapshot, so it costs nothing to check each loop
         
         # CPU usage throttling
         self.last_cpu_usage = 0
@@ -63,10 +134,11 @@ class ApplicationMonitor:
                     
                     # Check if we should throttle due to high CPU
                     if current_time - self.last_cpu_check >= self.cpu_check_interval:
-                        if PSUTIL_AVAILABLE and psutil:
+                        snapshot = get_system_snapshot()
+                        if snapshot and snapshot.get('cpu_percent') is not None:
                             try:
-                                # Use a longer interval for more accurate but less frequent CPU measurement
-                                cpu_percent = psutil.cpu_percent(interval=1.0)
+                                # Host-wide CPU from the shared sampler; never blocks to measure
+                                cpu_percent = snapshot['cpu_percent']
                                 self.last_cpu_usage = cpu_percent
                                 self.last_cpu_check = current_time
                                 
@@ -109,16 +181,13 @@ class ApplicationMonitor:
             return
         
         try:
-            # Limit response times array
-            if len(self.response_times) > self.max_response_times:
-                self.response_times = self.response_times[-self.max_response_times:]
-            
             # Limit request counts
             if len(self.request_counts) > self.max_request_counts:
                 # Remove oldest endpoints (simple FIFO)
                 oldest_keys = list(self.request_counts.keys())[:len(self.request_counts) - self.max_request_counts]
                 for key in oldest_keys:
                     del self.request_counts[key]
+                    self.latency.pop(key, None)
                 logger.debug(f"Cleaned up {len(oldest_keys)} old endpoint tracking entries")
             
             # Limit error counts
@@ -134,7 +203,8 @@ class ApplicationMonitor:
         except Exception as e:
             logger.error(f"Error cleaning up monitoring data: {e}")
     
-    def record_request(self, endpoint: str, method: str, status_code: int, response_time: float):
+    def record_request(self, endpoint: str, method: str, status_code: int, response_time: float,
+                       response_size: Optional[int] = None):
         """Record a request for monitoring"""
         try:
             # Skip recording if CPU is very high to reduce overhead
@@ -152,9 +222,10 @@ class ApplicationMonitor:
                     # Remove oldest endpoint (simple FIFO)
                     oldest_key = next(iter(self.request_counts))
                     del self.request_counts[oldest_key]
+                    self.latency.pop(oldest_key, None)
                     logger.debug(f"Removed old endpoint tracking: {oldest_key}")
                 
-                self.request_counts[key] = {'total': 0, 'success': 0, 'error': 0}
+                self.request_counts[key] = {'total': 0, 'success': 0, 'error': 0, 'bytes': 0}
             
             self.request_counts[key]['total'] += 1
             
@@ -163,13 +234,21 @@ class ApplicationMonitor:
             else:
                 self.request_counts[key]['error'] += 1
             
-            # Record response time
-            self.response_times.append(response_time)
-            if len(self.response_times) > self.max_response_times:
-                self.response_times.pop(0)
+            if response_size:
+                self.request_counts[key]['bytes'] += response_size
+            
+            # Record response time in the route's histogram
+            with self.latency_lock:
+                histogram = self.latency.get(key)
+                if histogram is None:
+                    histogram = self.latency[key] = LatencyHistogram()
+                histogram.record(response_time)
+                self.timed_requests += 1
+                self.total_response_time += response_time
             
             # Log slow requests
             if response_time > self.slow_request_threshold:
+                self.slow_requests += 1
                 logger.warning(f"Slow request detected: {method} {endpoint} took {response_time:.2f}s")
             
             # Record errors
@@ -183,21 +262,20 @@ class ApplicationMonitor:
     def _check_system_health(self):
         """Check system health and log warnings"""
         try:
-            # Check system metrics if psutil is available
-            if PSUTIL_AVAILABLE and psutil:
+            # Check system metrics if the host sampler has published any
+            snapshot = get_system_snapshot()
+            if snapshot:
                 # Check memory usage
-                memory = psutil.virtual_memory()
-                if memory.percent > 80:
-                    logger.warning(f"High memory usage: {memory.percent:.1f}%")
+                if snapshot['memory_percent'] > 80:
+                    logger.warning(f"High memory usage: {snapshot['memory_percent']:.1f}%")
                 
                 # CPU usage already checked in main loop, just log if very high
                 if self.last_cpu_usage > 90:
                     logger.warning(f"Very high CPU usage: {self.last_cpu_usage:.1f}%")
                 
                 # Check disk usage
-                disk = psutil.disk_usage('/')
-                if disk.percent > 90:
-                    logger.warning(f"High disk usage: {disk.percent:.1f}%")
+                if snapshot['disk_percent'] > 90:
+                    logger.warning(f"High disk usage: {snapshot['disk_percent']:.1f}%")
             
             # Check error rates
             self._check_error_rates()
@@ -216,20 +294,27 @@ class ApplicationMonitor:
         except Exception as e:
             logger.error(f"Error rate check failed: {e}")
     
+    def get_latency(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """p50/p95/p99 per method:endpoint over each rolling window"""
+        now = time.time()
+        with self.latency_lock:
+            return {
+                key: {f'{minutes}m': histogram.percentiles(minutes, now) for minutes in LATENCY_WINDOWS}
+                for key, histogram in self.latency.items()
+            }
+    
     def get_metrics(self) -> Dict[str, Any]:
         """Get current application metrics"""
         try:
-            # System metrics
-            system_metrics = {}
-            if PSUTIL_AVAILABLE and psutil:
-                memory = psutil.virtual_memory()
-                # Use cached CPU value to avoid additional CPU measurement
-                cpu_percent = self.last_cpu_usage if self.last_cpu_usage > 0 else psutil.cpu_percent(interval=0.1)
-                disk = psutil.disk_usage('/')
+            # System metrics, from the host snapshot so no request ever samples
+            snapshot = get_system_snapshot()
+            if snapshot:
                 system_metrics = {
-                    'memory_percent': memory.percent,
-                    'cpu_percent': cpu_percent,
-                    'disk_percent': disk.percent,
+                    'memory_percent': snapshot['memory_percent'],
+                    'cpu_percent': snapshot['cpu_percent'] if snapshot['cpu_percent'] is not None else 'N/A',
+                    'disk_percent': snapshot['disk_percent'],
+                    'load_average': snapshot['load_average'],
+                    'sampled_at': datetime.fromtimestamp(snapshot['sampled_at']).isoformat()
                 }
             else:
                 system_metrics = {
@@ -240,7 +325,7 @@ class ApplicationMonitor:
             
             # Application metrics
             uptime = time.time() - self.start_time
-            avg_response_time = sum(self.response_times) / len(self.response_times) if self.response_times else 0
+            avg_response_time = self.total_response_time / self.timed_requests if self.timed_requests else 0
             
             # Cache metrics
             cache_stats = get_cache_stats()
@@ -258,15 +343,17 @@ class ApplicationMonitor:
                     'total_requests': sum(counts['total'] for counts in self.request_counts.values()),
                     'total_errors': sum(counts['error'] for counts in self.request_counts.values()),
                     'avg_response_time': round(avg_response_time, 3),
-                    'slow_requests': len([rt for rt in self.response_times if rt > self.slow_request_threshold]),
+                    'slow_requests': self.slow_requests,
                     'endpoints': self.request_counts,
+                    'latency_ms': self.get_latency(),
                     'monitoring_data_size': {
                         'request_counts': len(self.request_counts),
-                        'response_times': len(self.response_times),
+                        'latency_histograms': len(self.latency),
                         'error_counts': len(self.error_counts)
                     }
                 },
                 'cache': cache_stats,
+                'database': get_query_stats(),
                 'rate_limiting': rate_limit_stats,
                 'timestamp': datetime.now().isoformat()
             }
@@ -345,31 +432,38 @@ class ApplicationMonitor:
 # Global monitor instance
 app_monitor = ApplicationMonitor()
 
-def monitor_request(f):
-    """Decorator to monitor request performance"""
-    def decorator(*args, **kwargs):
-        start_time = time.time()
-        try:
-            result = f(*args, **kwargs)
-            response_time = time.time() - start_time
-            
-            # Extract request info (this is a simplified version)
-            # In a real implementation, you'd get this from Flask request context
-            app_monitor.record_request(
-                endpoint='unknown',
-                method='GET',
-                status_code=200,
-                response_time=response_time
-            )
-            
-            return result
-        except Exception as e:
-            response_time = time.time() - start_time
-            app_monitor.record_request(
-                endpoint='unknown',
-                method='GET',
-                status_code=500,
-                response_time=response_time
-            )
-            raise
-    return decorator 
\ No newline at end of file
+def init_request_monitoring(app):
+    """
+    Time every request and record it with app_monitor and the shared metrics
+    
+    Requests are keyed by their URL rule (e.g. /api/ministries/<int:ministry_id>)
+    rather than the path, so the number of tracked routes stays bounded;
+    requests that match no rule share 'unmatched'. after_request records the
+    final status and size; teardown_request catches requests that never
+    produced a response.
+    """
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.request_recorded = False
+    
+    def record(status_code: int, response_size: Optional[int]):
+        started = g.pop('request_started', None)
+        if started is None or g.get('request_recorded'):
+            return
+        g.request_recorded = True
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        duration = time.perf_counter() - started
+        app_monitor.record_request(endpoint, request.method, status_code, duration, response_size)
+        # Shared across workers for /metrics
+        metrics.observe_request(request.method, endpoint, status_code, duration, response_size)
+    
+    @app.after_request
+    def record_response(response):
+        # Streamed bodies have no length until sent; they are recorded without one
+        record(response.status_code, response.content_length)
+        return response
+    
+    @app.teardown_request
+    def record_failed_request(exception=None):
+        record(500, None)
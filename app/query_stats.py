@@ -0,0 +1,213 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import os
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Statement timing through the instrumented cursors get_db_connection hands out
+DB_QUERY_STATS = os.environ.get('DB_QUERY_STATS', 'true').lower() == 'true'
+DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 500))
+# Share of slow read-only queries re-run under EXPLAIN (ANALYZE, BUFFERS); off by default
+DB_EXPLAIN_SAMPLE_RATE = float(os.environ.get('DB_EXPLAIN_SAMPLE_RATE', 0))
+
+# Bounds on what is kept per worker
+MAX_FINGERPRINTS = 200
+MAX_SLOW_QUERIES = 20
+OTHER_FINGERPRINT = '<other>'
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\b(?:true|false|null)\b|%\(\w+\)s|%s|\$\d+", re.I)
+_VALUE_ROW = r"\(\s*\?(?:::[\w\[\]]+)?(?:\s*,\s*\?(?:::[\w\[\]]+)?)*\s*\)"
+_VALUE_ROWS = re.compile(rf"({_VALUE_ROW})(?:\s*,\s*{_VALUE_ROW})+")
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+# Longer statements usually have their values inlined (execute_values
+# batches), so each is unique; caching them would only pin the text
+FINGERPRINT_CACHE_MAX_LENGTH = 1024
+
+def _normalize(sql: str) -> str:
+    sql = _COMMENTS.sub(' ', sql)
+    sql = _LITERALS.sub('?', sql)
+    sql = ' '.join(sql.split())
+    return _VALUE_ROWS.sub(r'\1, ...', sql)
+
+_normalize_cached = lru_cache(maxsize=1024)(_normalize)
+
+def fingerprint(sql: str) -> str:
+    """
+    Normalized form of a statement, shared by every call with other values
+
+    Literals and placeholders become ?, and runs of VALUES rows (as built by
+    execute_values) collapse to one row, so batches of any size share a key.
+    """
+    if len(sql) > FINGERPRINT_CACHE_MAX_LENGTH:
+        return _normalize(sql)
+    return _normalize_cached(sql)
+
+def _is_read_only(sql: str) -> bool:
+    # EXPLAIN ANALYZE runs the statement again, so only plain reads are sampled
+    words = sql.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() == 'SELECT' and not re.search(
+        r'\b(INSERT|UPDATE|DELETE|FOR\s+UPDATE|FOR\s+SHARE)\b', sql, re.I)
+
+class QueryStats:
+    """Per-worker checkout and statement timings, keyed by SQL fingerprint"""
+
+    def __init__(self, slow_ms=DB_SLOW_QUERY_MS, explain_rate=DB_EXPLAIN_SAMPLE_RATE):
+        self.slow_ms = slow_ms
+        self.explain_rate = explain_rate
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._queries: Dict[str, Dict[str, float]] = {}
+            self._slow = deque(maxlen=MAX_SLOW_QUERIES)
+            self._checkouts = 0
+            self._checkout_ms_total = 0.0
+            self._checkout_ms_max = 0.0
+
+    def record_checkout(self, elapsed: float):
+        """Time spent getting a usable connection, including any wait and ping"""
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self._checkouts += 1
+            self._checkout_ms_total += elapsed_ms
+            self._checkout_ms_max = max(self._checkout_ms_max, elapsed_ms)
+
+    def record_query(self, cur, sql: str, params: Any, elapsed: float, rows: int):
+        key = fingerprint(sql)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            stats = self._queries.get(key)
+            if stats is None:
+                if len(self._queries) >= MAX_FINGERPRINTS:
+                    key = OTHER_FINGERPRINT
+                stats = self._queries.setdefault(key, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0})
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['rows'] += rows
+
+        if elapsed_ms < self.slow_ms:
+            return
+        logger.warning(f"Slow query ({elapsed_ms:.0f} ms, {rows} rows): {key[:500]}")
+        entry = {
+            'fingerprint': key,
+            'ms': round(elapsed_ms, 1),
+            'rows': rows,
+            'at': datetime.now().isoformat()
+        }
+        if self.explain_rate and random.random() < self.explain_rate and _is_read_only(sql):
+            entry['plan'] = self._explain(cur, sql, params)
+        with self._lock:
+            self._slow.append(entry)
+
+    def _explain(self, cur, sql: str, params: Any) -> Optional[str]:
+        """Capture the plan of a slow query, without disturbing the caller's transaction"""
+        conn = cur.connection
+        savepoint = not conn.autocommit
+        explain_cur = conn.cursor()
+        try:
+            if savepoint:
+                explain_cur.execute('SAVEPOINT query_stats_explain')
+            explain_cur.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+            plan = '\n'.join(row[0] for row in explain_cur.fetchall())
+            if savepoint:
+                explain_cur.execute('RELEASE SAVEPOINT query_stats_explain')
+            return plan
+        except psycopg2.Error as e:
+            logger.warning(f"EXPLAIN of slow query failed: {e}")
+            if savepoint:
+                try:
+                    explain_cur.execute('ROLLBACK TO SAVEPOINT query_stats_explain')
+                except psycopg2.Error:
+                    pass
+            return None
+        finally:
+            explain_cur.close()
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        """Checkout timings, the statements with the most total time, and recent slow queries"""
+        with self._lock:
+            queries = [{'fingerprint': key, **stats} for key, stats in self._queries.items()]
+            slow = list(self._slow)
+            checkouts = self._checkouts
+            checkout_total = self._checkout_ms_total
+            checkout_max = self._checkout_ms_max
+
+        queries.sort(key=lambda query: query['total_ms'], reverse=True)
+        for query in queries:
+            query['avg_ms'] = round(query['total_ms'] / query['calls'], 2)
+            query['total_ms'] = round(query['total_ms'], 1)
+            query['max_ms'] = round(query['max_ms'], 1)
+        return {
+            'enabled': DB_QUERY_STATS,
+            'checkouts': checkouts,
+            'checkout_ms_avg': round(checkout_total / checkouts, 2) if checkouts else 0.0,
+            'checkout_ms_max': round(checkout_max, 1),
+            'queries': sum(query['calls'] for query in queries),
+            'query_ms_total': round(sum(query['total_ms'] for query in queries), 1),
+            'fingerprints': len(queries),
+            'slow_query_ms': self.slow_ms,
+            'top_queries': queries[:top],
+            'slow_queries': slow
+        }
+
+query_stats = QueryStats()
+
+class InstrumentedCursorMixin:
+    """Times execute, executemany and copy_expert and records them in query_stats"""
+
+    def _record(self, query, params, started):
+        elapsed = time.perf_counter() - started
+        try:
+            if isinstance(query, bytes):
+                query = query.decode('utf-8', 'replace')
+            elif not isinstance(query, str):
+                # psycopg2.sql.Composed and friends
+                query = query.as_string(self)
+            query_stats.record_query(self, query, params, elapsed, max(self.rowcount, 0))
+        except Exception as e:
+            logger.debug(f"Query stats not recorded: {e}")
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        result = super().execute(query, vars)
+        self._record(query, vars, started)
+        return result
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        result = super().executemany(query, vars_list)
+        self._record(query, None, started)
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        result = super().copy_expert(sql, file, size)
+        self._record(sql, None, started)
+        return result
+
+@lru_cache(maxsize=None)
+def instrumented(cursor_factory=None):
+    """Instrumented subclass of a cursor class (the plain cursor by default)"""
+    base = cursor_factory or psycopg2.extensions.cursor
+    return type(f'Instrumented{base.__name__}', (InstrumentedCursorMixin, base), {})
+
+def get_query_stats(top: int = 20) -> Dict[str, Any]:
+    return query_stats.get_stats(top)
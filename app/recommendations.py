@@ -0,0 +1,205 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+from functools import reduce
+from operator import or_
+from threading import Lock
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import app.catalog as catalog
+from app.cache import recommendation_cache
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Catalog field for each answer dimension
+DIMENSIONS = ('age', 'gender', 'state', 'situation', 'interest')
+
+CHILDREN_AGES = ('infant', 'elementary', 'junior-high', 'high-school')
+MASS_KEY = 'mass'
+WELCOME_KEY = 'welcome-committee'
+FAMILY_FALLBACK_KEYS = ('st-edward-school', 'prep-kids', 'moms-group', 'meal-train-provide', 'totus-tuus-kids')
+ELEMENTARY_CORE_KEYS = ('st-edward-school', 'prep-kids', MASS_KEY)
+
+class CompiledCatalog(NamedTuple):
+    """
+    Catalog compiled into per-tag bitsets; bit i stands for keys[i]
+
+    index[dimension][tag] holds every ministry listing that tag and
+    unconstrained[dimension] every ministry listing none, so a whole answer
+    is evaluated with a handful of integer ANDs/ORs instead of a ministry scan.
+    """
+    etag: str
+    keys: Tuple[str, ...]
+    ministries: Dict[str, Dict[str, Any]]
+    all_mask: int
+    unconstrained: Dict[str, int]
+    index: Dict[str, Dict[str, int]]
+    children_mask: int
+
+_compiled: Optional[CompiledCatalog] = None
+_compile_lock = Lock()
+
+def compile_catalog(snapshot: catalog.CatalogSnapshot) -> CompiledCatalog:
+    """Encode every ministry's tag lists as bitsets over the catalog order"""
+    keys = tuple(snapshot.ministries.keys())
+    unconstrained = {dimension: 0 for dimension in DIMENSIONS}
+    index: Dict[str, Dict[str, int]] = {dimension: {} for dimension in DIMENSIONS}
+
+    for position, key in enumerate(keys):
+        bit = 1 << position
+        ministry = snapshot.ministries[key]
+        for dimension in DIMENSIONS:
+            tags = catalog.normalize_tags(ministry.get(dimension))
+            if not tags:
+                unconstrained[dimension] |= bit
+                continue
+            tag_index = index[dimension]
+            for tag in tags:
+                tag_index[tag] = tag_index.get(tag, 0) | bit
+
+    children_mask = _any_of(index['age'], CHILDREN_AGES)
+    return CompiledCatalog(
+        snapshot.etag, keys, snapshot.ministries, (1 << len(keys)) - 1,
+        unconstrained, index, children_mask
+    )
+
+def get_compiled_catalog() -> CompiledCatalog:
+    """Compiled form of the current catalog snapshot, rebuilt when it changes"""
+    global _compiled
+
+    snapshot = catalog.get_catalog_snapshot()
+    compiled = _compiled
+    if compiled is not None and compiled.etag == snapshot.etag:
+        return compiled
+
+    with _compile_lock:
+        if _compiled is None or _compiled.etag != snapshot.etag:
+            _compiled = compile_catalog(snapshot)
+            logger.debug(f"Compiled recommendation bitsets for {len(_compiled.keys)} ministries")
+        return _compiled
+
+def _any_of(tag_index: Dict[str, int], tags: Iterable[str]) -> int:
+    return reduce(or_, (tag_index.get(tag, 0) for tag in tags), 0)
+
+def _bit(compiled: CompiledCatalog, key: str) -> int:
+    try:
+        return 1 << compiled.keys.index(key)
+    except ValueError:
+        return 0
+
+def _match_mask(compiled: CompiledCatalog, age: str, gender: str, states: List[str],
+                situation: List[str], interests: List[str]) -> int:
+    """Bitset of ministries passing every answer filter"""
+    index = compiled.index
+    unconstrained = compiled.unconstrained
+    wants_kids = 'kids' in interests or 'parent' in states
+
+    # Parents and "for my children" also see children's ministries
+    effective_ages = [age, *CHILDREN_AGES] if wants_kids else [age]
+    mask = compiled.all_mask & (unconstrained['age'] | _any_of(index['age'], effective_ages))
+
+    if gender != 'skip':
+        mask &= unconstrained['gender'] | index['gender'].get(gender, 0)
+
+    if states and 'none-of-above' not in states:
+        mask &= unconstrained['state'] | _any_of(index['state'], states)
+
+    mask &= unconstrained['situation'] | _any_of(index['situation'], situation)
+
+    if interests and 'all' not in interests:
+        interest_ok = unconstrained['interest'] | index['interest'].get('all', 0) | _any_of(index['interest'], interests)
+        if 'kids' in interests:
+            interest_ok |= compiled.children_mask
+        mask &= interest_ok
+
+    # The welcome committee is only for people new to St. Edward
+    if 'new-to-stedward' not in situation:
+        mask &= ~_bit(compiled, WELCOME_KEY)
+
+    return mask
+
+def _keys_in_mask(compiled: CompiledCatalog, mask: int) -> List[str]:
+    keys = []
+    while mask:
+        low_bit = mask & -mask
+        keys.append(compiled.keys[low_bit.bit_length() - 1])
+        mask ^= low_bit
+    return keys
+
+def _mass_first(keys: List[str]) -> List[str]:
+    if MASS_KEY not in keys:
+        return keys
+    return [MASS_KEY] + [key for key in keys if key != MASS_KEY]
+
+def recommend_ministry_keys(compiled: CompiledCatalog, age: str = '', gender: str = '',
+                            states: Optional[List[str]] = None, situation: Optional[List[str]] = None,
+                            interests: Optional[List[str]] = None) -> List[str]:
+    """
+    Ministry keys recommended for one set of quiz answers, in display order
+
+    Mirrors the original client-side findMinistries() rules: Mass first,
+    welcome-committee gating, the parent fallback list and the core
+    ministries for elementary-age children. No interests means no matches.
+    """
+    states = states or []
+    situation = situation or []
+    interests = interests or []
+
+    if not interests:
+        return []
+
+    keys = _mass_first(_keys_in_mask(compiled, _match_mask(compiled, age, gender, states, situation, interests)))
+
+    if not keys and ('parent' in states or 'kids' in interests):
+        keys = [key for key in FAMILY_FALLBACK_KEYS if key in compiled.ministries]
+
+    if age == 'elementary' and len(keys) < 2:
+        extra_keys = list(ELEMENTARY_CORE_KEYS)
+        if 'fellowship' in interests or 'all' in interests:
+            extra_keys.append('cub-scouts')
+        keys += [key for key in extra_keys if key in compiled.ministries and key not in keys]
+        keys = _mass_first(keys)
+
+    return keys
+
+def canonical_answer_key(answers: Dict[str, Any]) -> Tuple:
+    """Order-insensitive key for a set of validated answers"""
+    return (
+        answers.get('age_group', ''),
+        answers.get('gender', ''),
+        tuple(sorted(set(answers.get('states', [])))),
+        tuple(sorted(set(answers.get('situation', [])))),
+        tuple(sorted(set(answers.get('interests', []))))
+    )
+
+def _memoized_keys(compiled: CompiledCatalog, answers: Dict[str, Any]) -> Tuple[str, ...]:
+    """Recommended keys, served from the per-catalog-version LRU when possible"""
+    answer_key = canonical_answer_key(answers)
+    keys = recommendation_cache.get(compiled.etag, answer_key)
+    if keys is not None:
+        return keys
+
+    age, gender, states, situation, interests = answer_key
+    keys = tuple(recommend_ministry_keys(
+        compiled, age=age, gender=gender,
+        states=list(states), situation=list(situation), interests=list(interests)
+    ))
+    recommendation_cache.set(compiled.etag, answer_key, keys)
+    return keys
+
+def recommend_ministries(answers: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Recommend ministries for validated answers
+
+    Args:
+        answers: dict with age_group, gender, states, situation and interests
+                 as produced by InputValidator.validate_ministry_submission
+
+    Returns:
+        Catalog entries (with their ministry_key) in display order
+    """
+    compiled = get_compiled_catalog()
+    keys = _memoized_keys(compiled, answers)
+    return [{'ministry_key': key, **compiled.ministries[key]} for key in keys]
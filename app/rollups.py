@@ -0,0 +1,271 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import app.database as database
+from app.error_handlers import ValidationError
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Rollup table for each granularity; both share (bucket, dimension, value, count)
+ROLLUP_TABLES = {
+    'hour': 'submission_rollups_hourly',
+    'day': 'submission_rollups_daily'
+}
+# 'total' has a single '' value per bucket; the rest count each answer value
+DIMENSIONS = ('total', 'age_group', 'gender', 'state', 'interest', 'situation', 'ministry')
+# Daily rollups also count submissions per device: by anonymous client ID,
+# or by IP hash for older rows without one
+DEVICE_DIMENSIONS = ('client', 'ip')
+_DEVICE_DIMENSIONS_SQL = ', '.join(f"'{dimension}'" for dimension in DEVICE_DIMENSIONS)
+
+# Hourly reads are for recent activity; longer ranges should use daily rollups
+MAX_HOURLY_DAYS = 14
+
+# Shared with incremental updates so a rebuild never races a flush
+ROLLUP_LOCK_ID = 4851_0011
+
+def json_array_sql(column: str) -> str:
+    """
+    A JSON array column as JSONB, whether the column is JSONB or still text
+
+    Databases where the text-to-JSONB migration failed keep text columns, so
+    the value goes through text rather than calling JSONB functions on it;
+    scalar values left behind by that migration count as no values.
+    """
+    return f"(CASE WHEN left({column}::text, 1) = '[' THEN {column}::text::jsonb ELSE '[]'::jsonb END)"
+
+def _array_values(column: str) -> str:
+    return f"jsonb_array_elements_text({json_array_sql('s.' + column)})"
+
+ROLLUP_SELECT = f'''
+    SELECT date_trunc(%(granularity)s, s.submitted_at) AS bucket, d.dimension, d.value, COUNT(*) AS count
+    FROM ministry_submissions s
+    CROSS JOIN LATERAL (
+        SELECT 'total', ''
+        UNION ALL SELECT 'age_group', COALESCE(s.age_group, '')
+        UNION ALL SELECT 'gender', COALESCE(s.gender, '')
+        UNION ALL SELECT 'state', value FROM {_array_values('state_in_life')} AS value
+        UNION ALL SELECT 'interest', value FROM {_array_values('interest')} AS value
+        UNION ALL SELECT 'situation', value FROM {_array_values('situation')} AS value
+        UNION ALL SELECT 'ministry', value FROM {_array_values('recommended_ministries')} AS value
+        UNION ALL SELECT 'client', s.client_id_hash
+            WHERE %(granularity)s = 'day' AND s.client_id_hash IS NOT NULL
+        UNION ALL SELECT 'ip', s.ip_address
+            WHERE %(granularity)s = 'day' AND s.client_id_hash IS NULL AND s.ip_address <> 'unknown'
+    ) AS d(dimension, value)
+    WHERE s.submitted_at IS NOT NULL AND {{where}}
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+'''
+
+def _upsert_sql(table: str, where: str) -> str:
+    # Concurrent flushes share the advisory lock, so rows are upserted in key
+    # order to take their row locks in the same order and never deadlock
+    return f'''
+        INSERT INTO {table} (bucket, dimension, value, count)
+        {ROLLUP_SELECT.format(where=where)}
+        ON CONFLICT (bucket, dimension, value)
+        DO UPDATE SET count = {table}.count + EXCLUDED.count
+    '''
+
+def rollup_tables_sql() -> str:
+    """DDL for the rollup tables plus an initial fill from existing submissions"""
+    statements = []
+    for granularity, table in ROLLUP_TABLES.items():
+        statements.append(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TIMESTAMP NOT NULL,
+                dimension VARCHAR(20) NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, dimension, value)
+            );
+        ''')
+        statements.append(_upsert_sql(table, 'TRUE').replace('%(granularity)s', f"'{granularity}'") + ';')
+    return '\n'.join(statements)
+
+def device_rollups_sql() -> str:
+    """Recount the per-device daily rows from existing submissions (they postdate the first fill)"""
+    table = ROLLUP_TABLES['day']
+    where = f"d.dimension IN ({_DEVICE_DIMENSIONS_SQL})"
+    return f'''
+        SELECT pg_advisory_xact_lock({ROLLUP_LOCK_ID});
+        DELETE FROM {table} WHERE {where.replace('d.dimension', 'dimension')};
+        {_upsert_sql(table, where).replace('%(granularity)s', "'day'")};
+    '''
+
+def update_rollups(cur, submission_ids: Sequence[int]) -> None:
+    """
+    Add freshly inserted submissions to the hourly and daily rollups
+
+    Runs on the caller's cursor so the rollups commit (or roll back) together
+    with the rows they count.
+    """
+    if not submission_ids:
+        return
+    cur.execute('SELECT pg_advisory_xact_lock_shared(%s)', (ROLLUP_LOCK_ID,))
+    for granularity, table in ROLLUP_TABLES.items():
+        cur.execute(_upsert_sql(table, 's.id = ANY(%(ids)s)'),
+                    {'granularity': granularity, 'ids': list(submission_ids)})
+
+def rebuild_rollups(date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, int]:
+    """
+    Recompute rollups from raw submissions, for all time or whole days in a range
+
+    Returns the number of rollup rows written per granularity.
+    """
+    clauses = []
+    params: Dict[str, Any] = {}
+    if date_from:
+        clauses.append('s.submitted_at >= %(date_from)s')
+        params['date_from'] = date_from
+    if date_to:
+        clauses.append('s.submitted_at < %(date_to_end)s')
+        params['date_to_end'] = date_to + timedelta(days=1)
+    where = ' AND '.join(clauses) or 'TRUE'
+    delete_where = where.replace('s.submitted_at', 'bucket')
+
+    written = {}
+    with database.get_db_connection() as (conn, cur):
+        # Waits for in-flight incremental updates and holds new ones off until commit
+        cur.execute('SELECT pg_advisory_xact_lock(%s)', (ROLLUP_LOCK_ID,))
+        for granularity, table in ROLLUP_TABLES.items():
+            cur.execute(f'DELETE FROM {table} WHERE {delete_where}', params)
+            cur.execute(_upsert_sql(table, where), {**params, 'granularity': granularity})
+            written[granularity] = cur.rowcount
+
+    logger.info(f"Rebuilt submission rollups from {date_from or 'start'} to {date_to or 'now'}: {written}")
+    return written
+
+def clear_rollups(cur) -> None:
+    for table in ROLLUP_TABLES.values():
+        cur.execute(f'DELETE FROM {table}')
+
+def _range_sql(date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, List[Any]]:
+    """AND-ed bucket bounds for an inclusive YYYY-MM-DD range, and their parameters"""
+    bounds = []
+    params: List[Any] = []
+    if date_from:
+        bounds.append('bucket >= %s')
+        params.append(date_from)
+    if date_to:
+        bounds.append("bucket < %s::date + INTERVAL '1 day'")
+        params.append(date_to)
+    return ''.join(' AND ' + bound for bound in bounds), params
+
+def rollup_devices_sql(date_from: Optional[str] = None, date_to: Optional[str] = None) -> Tuple[str, List[Any]]:
+    """
+    Subquery of (device, is_client, submissions) rows for a date range
+
+    Reads the per-device daily rows, so it costs one row per device and day
+    in the range rather than one per submission.
+    """
+    range_sql, params = _range_sql(date_from, date_to)
+    return f'''
+        SELECT value AS device, dimension = 'client' AS is_client, SUM(count) AS submissions
+        FROM {ROLLUP_TABLES['day']}
+        WHERE dimension IN ({_DEVICE_DIMENSIONS_SQL}){range_sql}
+        GROUP BY value, dimension
+    ''', params
+
+def read_rollup_stats(cur, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Dashboard totals and per-dimension counts from the rollups
+
+    Distributions come from the daily rollups; today and the last 7 days come
+    from the hourly ones, so "this week" is accurate to the hour.
+    """
+    range_sql, params = _range_sql(date_from, date_to)
+
+    cur.execute(f'''
+        SELECT dimension, value, SUM(count) AS count
+        FROM {ROLLUP_TABLES['day']}
+        WHERE dimension NOT IN ({_DEVICE_DIMENSIONS_SQL}){range_sql}
+        GROUP BY dimension, value
+        ORDER BY dimension, count DESC, value
+    ''', params)
+    counts: Dict[str, List[tuple]] = {dimension: [] for dimension in DIMENSIONS}
+    for dimension, value, count in cur.fetchall():
+        counts.setdefault(dimension, []).append((value, int(count)))
+
+    cur.execute(f'''
+        SELECT COALESCE(SUM(count) FILTER (WHERE bucket >= CURRENT_DATE), 0),
+               COALESCE(SUM(count), 0)
+        FROM {ROLLUP_TABLES['hour']}
+        WHERE dimension = 'total'
+          AND bucket >= date_trunc('hour', LOCALTIMESTAMP - INTERVAL '7 days'){range_sql}
+    ''', params)
+    today, this_week = cur.fetchone()
+
+    return {
+        'total': sum(count for _, count in counts['total']),
+        'today': int(today),
+        'this_week': int(this_week),
+        'counts': counts
+    }
+
+def get_rollup_report(granularity: str, date_from: date, date_to: date,
+                      dimensions: Sequence[str] = DIMENSIONS) -> Dict[str, Any]:
+    """
+    Per-bucket totals and per-dimension breakdowns for a date range (inclusive)
+
+    Reads only rollup rows, so the cost follows the length of the range and
+    not the number of submissions ever stored.
+    """
+    table = ROLLUP_TABLES[granularity]
+    range_end = date_to + timedelta(days=1)
+
+    with database.get_db_connection() as (conn, cur):
+        cur.execute(f'''
+            SELECT bucket, count
+            FROM {table}
+            WHERE dimension = 'total' AND bucket >= %s AND bucket < %s
+            ORDER BY bucket
+        ''', (date_from, range_end))
+        series = [{'bucket': row[0].isoformat(), 'count': row[1]} for row in cur.fetchall()]
+
+        breakdown_dimensions = [dimension for dimension in dimensions if dimension != 'total']
+        breakdown: Dict[str, List[Dict[str, Any]]] = {dimension: [] for dimension in breakdown_dimensions}
+        if breakdown_dimensions:
+            cur.execute(f'''
+                SELECT dimension, value, SUM(count) AS count
+                FROM {table}
+                WHERE dimension = ANY(%s) AND bucket >= %s AND bucket < %s
+                GROUP BY dimension, value
+                ORDER BY dimension, count DESC, value
+            ''', (breakdown_dimensions, date_from, range_end))
+            for dimension, value, count in cur.fetchall():
+                breakdown[dimension].append({'label': value, 'count': int(count)})
+
+    return {
+        'granularity': granularity,
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'total': sum(point['count'] for point in series),
+        'series': series,
+        'breakdown': breakdown
+    }
+
+def parse_rollup_range(granularity: Optional[str], date_from: Optional[str], date_to: Optional[str]):
+    """Validate rollup query parameters, defaulting to the last 30 days (or 2 days hourly)"""
+    granularity = granularity or 'day'
+    if granularity not in ROLLUP_TABLES:
+        raise ValidationError("granularity must be 'day' or 'hour'", 'granularity')
+
+    try:
+        end = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else date.today()
+        default_days = 1 if granularity == 'hour' else 29
+        start = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else end - timedelta(days=default_days)
+    except ValueError as e:
+        raise ValidationError("from/to must be YYYY-MM-DD dates", 'from') from e
+
+    if start > end:
+        raise ValidationError("from must not be after to", 'from')
+    if granularity == 'hour' and (end - start).days >= MAX_HOURLY_DAYS:
+        raise ValidationError(f"Hourly rollups cover at most {MAX_HOURLY_DAYS} days", 'granularity')
+    return granularity, start, end
@@ -0,0 +1,53 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+from threading import Lock
+from typing import Dict, FrozenSet, Optional
+
+import app.database as database
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Column names per table of the app's schema, loaded once per worker
+_columns: Optional[Dict[str, FrozenSet[str]]] = None
+_load_lock = Lock()
+
+def refresh_schema(cur=None) -> Dict[str, FrozenSet[str]]:
+    """
+    Reload column metadata for the app's tables from information_schema
+
+    Called once the migrations have run; with a preloaded app the master does
+    it before forking, so workers start with the cache already filled.
+    """
+    global _columns
+
+    query = '''
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+    '''
+    if cur is None:
+        with database.get_db_connection() as (conn, cur):
+            cur.execute(query)
+            rows = cur.fetchall()
+    else:
+        cur.execute(query)
+        rows = cur.fetchall()
+
+    tables: Dict[str, set] = {}
+    for table, column in rows:
+        tables.setdefault(table, set()).add(column)
+    _columns = {table: frozenset(columns) for table, columns in tables.items()}
+    logger.info(f"Loaded schema metadata for {len(_columns)} tables")
+    return _columns
+
+def has_column(table: str, column: str) -> bool:
+    """Whether a table has a column, answered from the cache without I/O"""
+    columns = _columns
+    if columns is None:
+        with _load_lock:
+            # Another thread may have loaded it while we waited for the lock
+            columns = _columns if _columns is not None else refresh_schema()
+    return column in columns.get(table, frozenset())
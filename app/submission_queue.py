@@ -0,0 +1,302 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional
+
+import app.database as database
+from app.logging_config import get_logger
+from app.rollups import update_rollups
+
+logger = get_logger(__name__)
+
+SUBMIT_QUEUE_ENABLED = os.environ.get('SUBMIT_QUEUE_ENABLED', 'true').lower() == 'true'
+SUBMIT_BATCH_SIZE = int(os.environ.get('SUBMIT_BATCH_SIZE', 100))
+SUBMIT_FLUSH_MS = int(os.environ.get('SUBMIT_FLUSH_MS', 250))
+SUBMIT_QUEUE_MAX = int(os.environ.get('SUBMIT_QUEUE_MAX', 10000))
+SUBMIT_SPILL_PATH = os.environ.get(
+    'SUBMIT_SPILL_PATH',
+    os.path.join(tempfile.gettempdir(), 'involvement-quiz-submissions.jsonl')
+)
+# How often a worker retries rows spilled while the database was down
+SPILL_RETRY_SECONDS = 30
+
+SUBMISSION_COLUMNS = (
+    'submission_ref', 'name', 'email', 'age_group', 'gender', 'state_in_life', 'interest',
+    'situation', 'recommended_ministries', 'ip_address', 'client_id_hash', 'session_id', 'submitted_at'
+)
+JSON_COLUMNS = ('state_in_life', 'interest', 'situation', 'recommended_ministries')
+
+def _column_value(column: str) -> str:
+    if column in JSON_COLUMNS:
+        return f'{column}::jsonb'
+    if column == 'submitted_at':
+        return 'submitted_at::timestamptz'
+    return column
+
+# One text array per column, so the same prepared statement inserts a batch
+# of any size. submission_ref makes replays idempotent, so a batch that
+# committed just before a connection error is never stored twice.
+INSERT_SQL = f'''
+    INSERT INTO ministry_submissions ({', '.join(SUBMISSION_COLUMNS)})
+    SELECT {', '.join(_column_value(column) for column in SUBMISSION_COLUMNS)}
+    FROM unnest({', '.join(['%s::text[]'] * len(SUBMISSION_COLUMNS))})
+         AS batch({', '.join(SUBMISSION_COLUMNS)})
+    ON CONFLICT (submission_ref) DO NOTHING
+    RETURNING id
+'''
+database.register_prepared('insert_submissions', INSERT_SQL)
+
+def new_submission_ref(candidate: Any = None) -> str:
+    """Use a well-formed client-generated UUID, otherwise mint one"""
+    if candidate:
+        try:
+            return str(uuid.UUID(str(candidate)))
+        except ValueError:
+            pass
+    return str(uuid.uuid4())
+
+def build_submission_row(validated_data: Dict[str, Any], recommended_names: List[str],
+                         ip_hash: Optional[str], client_id_hash: Optional[str],
+                         session_id: Optional[str], submission_ref: str) -> Dict[str, Any]:
+    """Plain, JSON-serializable row so it can be queued or spilled to disk as-is"""
+    return {
+        'submission_ref': submission_ref,
+        'name': 'Anonymous User',
+        'email': '',
+        'age_group': validated_data.get('age_group', ''),
+        'gender': validated_data.get('gender', ''),
+        'state_in_life': validated_data.get('states', []),
+        'interest': validated_data.get('interests', []),
+        'situation': validated_data.get('situation', []),
+        'recommended_ministries': recommended_names,
+        'ip_address': ip_hash[:45] if ip_hash else None,
+        'client_id_hash': client_id_hash,
+        'session_id': session_id,
+        # Captured now so batching does not shift the submission time
+        'submitted_at': datetime.now(timezone.utc).isoformat()
+    }
+
+def insert_submissions(rows: List[Dict[str, Any]]) -> int:
+    """Write rows in one multi-row INSERT, update the rollups, and commit once"""
+    if not rows:
+        return 0
+
+    columns = [
+        [json.dumps(row.get(column)) if column in JSON_COLUMNS else row.get(column) for row in rows]
+        for column in SUBMISSION_COLUMNS
+    ]
+    with database.get_db_connection() as (conn, cur):
+        database.execute_prepared(cur, 'insert_submissions', columns)
+        # Only rows actually inserted are counted, so replayed duplicates are not
+        update_rollups(cur, [row[0] for row in cur.fetchall()])
+    return len(rows)
+
+def _claimed_by_live_process(path: str) -> bool:
+    """Whether the worker named in a .replay-<pid>-<id> file is still running"""
+    try:
+        pid = int(path.rsplit('.replay-', 1)[1].split('-', 1)[0])
+    except (IndexError, ValueError):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _remove_claim(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        # Already reclaimed by another worker; replays are idempotent
+        pass
+
+class SubmissionQueue:
+    """
+    Write-behind buffer for quiz submissions
+
+    Requests enqueue rows and return at once; a background thread writes them
+    every batch_size rows or flush_interval seconds, whichever comes first, so
+    a burst of phones after Mass costs a handful of connections instead of one
+    per submission. The buffer is bounded (enqueue() returns False when full,
+    and the caller writes synchronously), rows that cannot be written are
+    appended to a JSON-lines spill file and replayed once the database is
+    back, and whatever is pending is flushed at interpreter exit.
+    """
+
+    def __init__(self, batch_size: int = SUBMIT_BATCH_SIZE, flush_interval: float = SUBMIT_FLUSH_MS / 1000,
+                 max_size: int = SUBMIT_QUEUE_MAX, spill_path: str = SUBMIT_SPILL_PATH):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.spill_path = spill_path
+        self._rows = deque()
+        self._reset_threading()
+        self._last_replay = 0.0
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'rejected': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'failures': 0
+        }
+
+    def _reset_threading(self):
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._wakeup = Event()
+        self._stopping = Event()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopping.clear()
+                    self._thread = Thread(target=self._run, name='submission-flusher', daemon=True)
+                    self._thread.start()
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """Queue a row for the next batch; False when the buffer is full"""
+        # Threads do not survive fork(); each worker runs its own flusher and
+        # must not write rows its parent still owns
+        if self._pid != os.getpid():
+            self._rows = deque()
+            self._reset_threading()
+
+        with self._lock:
+            if len(self._rows) >= self.max_size:
+                self.stats['rejected'] += 1
+                return False
+            self._rows.append(row)
+            self.stats['enqueued'] += 1
+            pending = len(self._rows)
+
+        self._ensure_started()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._rows.popleft() for _ in range(min(limit, len(self._rows)))]
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if time.time() - self._last_replay >= SPILL_RETRY_SECONDS:
+                    self.replay_spill()
+            except Exception as e:
+                logger.error(f"Submission flusher error: {e}")
+
+    def flush(self) -> int:
+        """Write everything pending; on database errors spill it instead"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    written += insert_submissions(batch)
+                    self.stats['written'] += len(batch)
+                    self.stats['batches'] += 1
+                except Exception as e:
+                    self.stats['failures'] += 1
+                    logger.error(f"Failed to write {len(batch)} submissions, spilling to disk: {e}")
+                    # Keep memory bounded while the database is down
+                    self._spill(batch + self._take(len(self._rows)))
+                    break
+        if written:
+            logger.info(f"Wrote {written} queued submissions")
+        return written
+
+    def _spill(self, rows: List[Dict[str, Any]]):
+        lines = ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in rows)
+        try:
+            # One O_APPEND write per batch keeps workers from interleaving lines
+            fd = os.open(self.spill_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, lines.encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self.stats['spilled'] += len(rows)
+        except OSError as e:
+            logger.critical(f"Could not spill {len(rows)} submissions to {self.spill_path}: {e}")
+
+    def replay_spill(self) -> int:
+        """Write rows spilled by any worker; returns how many were replayed"""
+        self._last_replay = time.time()
+        replayed = 0
+
+        # Claims of exited workers are picked up again; live ones are still replaying
+        stale_claims = [path for path in glob.glob(self.spill_path + '.replay-*')
+                        if not _claimed_by_live_process(path)]
+        for path in [self.spill_path] + stale_claims:
+            claimed = f"{self.spill_path}.replay-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            try:
+                # rename() is atomic, so only one worker claims each file
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # Nothing spilled, or another worker claimed it first
+                continue
+
+            with open(claimed, encoding='utf-8') as spill_file:
+                rows = [json.loads(line) for line in spill_file if line.strip()]
+
+            written = 0
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    written += insert_submissions(rows[start:start + self.batch_size])
+            except Exception as e:
+                logger.warning(f"Database still unavailable, keeping spilled submissions: {e}")
+                self._spill(rows[written:])
+                _remove_claim(claimed)
+                replayed += written
+                break
+            _remove_claim(claimed)
+            replayed += written
+
+        if replayed:
+            self.stats['replayed'] += replayed
+            logger.info(f"Replayed {replayed} spilled submissions")
+        return replayed
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the flusher and write (or spill) whatever is still pending"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        if self._pid == os.getpid():
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'pending': len(self._rows),
+            'max_size': self.max_size,
+            'spill_pending': os.path.exists(self.spill_path)
+        }
+
+submission_queue = SubmissionQueue()
+atexit.register(submission_queue.stop)
@@ -0,0 +1,303 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import psycopg2.extras
+
+import app.database as database
+from app.cache import cache_submissions
+from app.error_handlers import ValidationError
+from app.logging_config import get_logger
+from app.rollups import json_array_sql, read_rollup_stats, rollup_devices_sql
+
+logger = get_logger(__name__)
+
+# Columns the admin API may return, in response order
+SUBMISSION_FIELDS = (
+    'id', 'name', 'age_group', 'gender', 'state_in_life', 'interest',
+    'situation', 'recommended_ministries', 'submitted_at', 'ip_address',
+    'client_id_hash', 'session_id'
+)
+JSON_FIELDS = ('state_in_life', 'interest', 'situation', 'recommended_ministries')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(submitted_at: datetime, submission_id: int) -> str:
+    """Opaque page token for the keyset position (submitted_at, id)"""
+    raw = json.dumps([submitted_at.isoformat(), submission_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        submitted_at, submission_id = json.loads(raw)
+        return datetime.fromisoformat(submitted_at), int(submission_id)
+    except (ValueError, TypeError) as e:
+        raise ValidationError("Invalid cursor", "cursor") from e
+
+def _parse_date(value: str, field: str) -> str:
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError as e:
+        raise ValidationError(f"{field} must be a YYYY-MM-DD date", field) from e
+    return value
+
+def build_submission_filters(args) -> Tuple[List[str], List[Any]]:
+    """
+    WHERE clauses and parameters for the admin submission filters
+
+    Supports from/to (inclusive dates), age_group, gender and ministry (a
+    recommended ministry name, matched with JSONB containment).
+    """
+    clauses = []
+    params = []
+
+    date_from = args.get('from')
+    if date_from:
+        clauses.append('submitted_at >= %s')
+        params.append(_parse_date(date_from, 'from'))
+
+    date_to = args.get('to')
+    if date_to:
+        clauses.append("submitted_at < %s::date + INTERVAL '1 day'")
+        params.append(_parse_date(date_to, 'to'))
+
+    for field in ('age_group', 'gender'):
+        value = args.get(field)
+        if value:
+            clauses.append(f'{field} = %s')
+            params.append(value)
+
+    ministry = args.get('ministry')
+    if ministry:
+        clauses.append('recommended_ministries @> %s::jsonb')
+        params.append(json.dumps([ministry]))
+
+    return clauses, params
+
+def parse_fields(value: Optional[str]) -> Sequence[str]:
+    """Sparse field selection; unknown names are rejected"""
+    if not value:
+        return SUBMISSION_FIELDS
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(SUBMISSION_FIELDS)
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}", "fields")
+    return tuple(field for field in SUBMISSION_FIELDS if field in requested)
+
+def parse_limit(value: Optional[str]) -> int:
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError as e:
+        raise ValidationError("limit must be a number", "limit") from e
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _normalize_json_field(field: str, value: Any) -> list:
+    # Rows written before the JSONB migrations may still hold plain text
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, list) else []
+        except json.JSONDecodeError:
+            return [value] if field == 'interest' else []
+    return []
+
+def fetch_submissions_page(args) -> Dict[str, Any]:
+    """
+    One page of submissions, newest first, for the admin API
+
+    Pages are addressed by keyset on (submitted_at, id) rather than OFFSET, so
+    every page is an index range scan no matter how deep it is.
+    """
+    fields = parse_fields(args.get('fields'))
+    limit = parse_limit(args.get('limit'))
+    clauses, params = build_submission_filters(args)
+
+    cursor = args.get('cursor')
+    if cursor:
+        cursor_at, cursor_id = decode_cursor(cursor)
+        clauses.append('(submitted_at, id) < (%s, %s)')
+        params.extend([cursor_at, cursor_id])
+
+    # The keyset columns are always read so the next cursor can be built
+    select_fields = list(dict.fromkeys(('id', 'submitted_at') + tuple(fields)))
+    query = f"SELECT {', '.join(select_fields)} FROM ministry_submissions"
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    query += ' ORDER BY submitted_at DESC, id DESC LIMIT %s'
+    params.append(limit + 1)
+
+    with database.get_db_connection(cursor_factory=psycopg2.extras.RealDictCursor) as (conn, cur):
+        cur.execute(query, params)
+        rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows[-1]['submitted_at'] is not None:
+        next_cursor = encode_cursor(rows[-1]['submitted_at'], rows[-1]['id'])
+
+    submissions = []
+    for row in rows:
+        submission = {}
+        for field in fields:
+            value = row[field]
+            if field in JSON_FIELDS:
+                value = _normalize_json_field(field, value)
+            elif field == 'submitted_at' and value:
+                value = value.isoformat()
+            submission[field] = value
+        submissions.append(submission)
+
+    return {
+        'submissions': submissions,
+        'count': len(submissions),
+        'has_more': has_more,
+        'next_cursor': next_cursor
+    }
+
+# Filters accepted by the stats endpoint (the same ones the list API takes)
+STATS_FILTERS = ('from', 'to', 'age_group', 'gender', 'ministry')
+# Filters the rollups can answer (they are bucketed by time only)
+ROLLUP_FILTERS = ('from', 'to')
+
+# Devices by number of submissions, in the order of the engagement query
+ENGAGEMENT_LABELS = ('1 submission', '2-3 submissions', '4-5 submissions', '6+ submissions')
+
+# Values the dashboard charts leave out
+EXCLUDED_MINISTRY = 'Come to Mass!'
+EXCLUDED_INTEREST = 'all'
+EXCLUDED_SITUATION = 'situation-none-of-above'
+
+def _distribution(cur, column_sql: str, where_sql: str, params: List[Any], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    query = f"""
+        SELECT {column_sql} AS label, COUNT(*) AS count
+        FROM ministry_submissions
+        {where_sql}
+        GROUP BY label
+        ORDER BY count DESC, label
+    """
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    cur.execute(query, params)
+    return [{'label': row[0], 'count': row[1]} for row in cur.fetchall()]
+
+def _element_distribution(cur, column: str, excluded: str, where_sql: str, params: List[Any],
+                          limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Counts of each value inside a JSONB array column"""
+    # Scalar values left behind by the text-to-JSONB migration are skipped
+    query = f"""
+        SELECT element AS label, COUNT(*) AS count
+        FROM ministry_submissions
+        CROSS JOIN LATERAL jsonb_array_elements_text({json_array_sql(column)}) AS element
+        {where_sql} {'AND' if where_sql else 'WHERE'} element <> %s
+        GROUP BY element
+        ORDER BY count DESC, element
+    """
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    cur.execute(query, params + [excluded])
+    return [{'label': row[0], 'count': row[1]} for row in cur.fetchall()]
+
+def _labelled(pairs: List[tuple], excluded: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    items = [{'label': label, 'count': count} for label, count in pairs if label != excluded]
+    return items[:limit] if limit else items
+
+@cache_submissions
+def get_submission_stats(**filters) -> Dict[str, Any]:
+    """
+    Dashboard totals and chart distributions, aggregated in SQL
+
+    With at most a date range as filter, everything (totals, distributions,
+    unique devices and engagement) comes from the daily and hourly rollups,
+    so the cost follows the range rather than the table size; other filters
+    aggregate the raw rows. Results are cached in the submissions namespace,
+    so clearing data drops them at once and new submissions show up within
+    the cache TTL.
+    """
+    clauses, params = build_submission_filters(filters)
+    where_sql = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+    use_rollups = set(filters) <= set(ROLLUP_FILTERS)
+
+    if use_rollups:
+        devices_sql, devices_params = rollup_devices_sql(filters.get('from'), filters.get('to'))
+    else:
+        # Devices are counted by anonymous client ID, falling back to the IP hash for older rows
+        devices_sql = f"""
+            SELECT COALESCE(client_id_hash, NULLIF(ip_address, 'unknown')) AS device,
+                   client_id_hash IS NOT NULL AS is_client,
+                   COUNT(*) AS submissions
+            FROM ministry_submissions
+            {where_sql}
+            GROUP BY 1, 2
+        """
+        devices_params = params
+
+    with database.get_db_connection() as (conn, cur):
+        cur.execute(f"""
+            SELECT COUNT(*) FILTER (WHERE is_client),
+                   COUNT(*) FILTER (WHERE NOT is_client),
+                   COUNT(*) FILTER (WHERE submissions = 1),
+                   COUNT(*) FILTER (WHERE submissions BETWEEN 2 AND 3),
+                   COUNT(*) FILTER (WHERE submissions BETWEEN 4 AND 5),
+                   COUNT(*) FILTER (WHERE submissions > 5)
+            FROM ({devices_sql}) AS devices
+            WHERE device IS NOT NULL
+        """, devices_params)
+        device_ids, fallback_ips, *engagement = cur.fetchone()
+
+        if use_rollups:
+            rollup = read_rollup_stats(cur, filters.get('from'), filters.get('to'))
+            counts = rollup['counts']
+            total, today, this_week = rollup['total'], rollup['today'], rollup['this_week']
+            distributions = {
+                'ministries': _labelled(counts['ministry'], EXCLUDED_MINISTRY, limit=10),
+                'age_groups': _labelled(counts['age_group']),
+                'genders': _labelled(counts['gender']),
+                'interests': _labelled(counts['interest'], EXCLUDED_INTEREST),
+                'situations': _labelled(counts['situation'], EXCLUDED_SITUATION)
+            }
+        else:
+            cur.execute(f"""
+                SELECT COUNT(*),
+                       COUNT(*) FILTER (WHERE submitted_at >= CURRENT_DATE),
+                       COUNT(*) FILTER (WHERE submitted_at >= LOCALTIMESTAMP - INTERVAL '7 days')
+                FROM ministry_submissions
+                {where_sql}
+            """, params)
+            total, today, this_week = cur.fetchone()
+            distributions = {
+                'ministries': _element_distribution(cur, 'recommended_ministries', EXCLUDED_MINISTRY, where_sql, params, limit=10),
+                'age_groups': _distribution(cur, 'age_group', where_sql, params),
+                'genders': _distribution(cur, 'gender', where_sql, params),
+                'interests': _element_distribution(cur, 'interest', EXCLUDED_INTEREST, where_sql, params),
+                'situations': _element_distribution(cur, 'situation', EXCLUDED_SITUATION, where_sql, params)
+            }
+
+    # Same estimate the dashboard has always shown
+    unique = device_ids + max(0, fallback_ips - device_ids)
+    return {
+        'total_submissions': total,
+        'today': today,
+        'this_week': this_week,
+        'unique_devices': unique,
+        'avg_submissions_per_device': round(total / unique, 1) if unique else 0.0,
+        **distributions,
+        'engagement': [
+            {'label': label, 'count': count}
+            for label, count in zip(ENGAGEMENT_LABELS, engagement)
+        ],
+        'source': 'rollups' if use_rollups else 'submissions'
+    }
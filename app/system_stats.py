@@ -0,0 +1,190 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import fcntl
+import json
+import os
+import tempfile
+import time
+from threading import Lock, Thread
+from typing import Any, Dict, Optional, Tuple
+
+# Try to import optional dependencies
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+    psutil = None
+
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SYSTEM_SAMPLE_INTERVAL = float(os.environ.get('SYSTEM_SAMPLE_INTERVAL', 5))
+# Latest host snapshot, shared by every worker; the sampler holds <path>.lock
+SYSTEM_STATS_PATH = os.environ.get('SYSTEM_STATS_PATH') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    'involvement-quiz-system.json'
+)
+
+def _cpu_counters(times) -> Tuple[float, float]:
+    """Busy and total CPU seconds since boot"""
+    idle = times.idle + getattr(times, 'iowait', 0.0)
+    total = sum(times)
+    return total - idle, total
+
+class SystemSampler:
+    """
+    Host CPU, memory and disk usage, sampled by one process per host
+
+    Every process runs a light thread, but only the one holding an flock on
+    the lock file samples; it writes a small JSON snapshot that all workers
+    read (and cache for an interval). If that process exits its lock goes
+    with it and another worker takes over on its next tick. CPU usage comes
+    from the change in cumulative CPU times between ticks, so nothing ever
+    sleeps to measure it.
+    """
+
+    # Snapshots older than this many intervals are treated as missing
+    SNAPSHOT_MAX_AGE = 3
+
+    def __init__(self, path: str = SYSTEM_STATS_PATH, interval: float = SYSTEM_SAMPLE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._start_lock = Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = None
+        self._lock_fd = None
+        self._previous_cpu = None
+        self._snapshot = None
+        self._read_at = 0.0
+        self._process = None
+
+    def start(self):
+        """Start this process's sampler thread (again after a fork)"""
+        if self._pid == os.getpid() or not PSUTIL_AVAILABLE:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._lock_fd is not None:
+                # Inherited from the parent; the parent's lock is not ours to hold
+                os.close(self._lock_fd)
+            self._reset()
+            self._pid = os.getpid()
+            Thread(target=self._run, daemon=True, name='system-sampler').start()
+
+    def _run(self):
+        while True:
+            try:
+                if self._try_lead():
+                    self._publish(self.sample())
+            except Exception as e:
+                logger.warning(f"System sampling failed: {e}")
+            time.sleep(self.interval)
+
+    def _try_lead(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logger.info(f"PID {os.getpid()} is sampling host statistics every {self.interval:g}s")
+        return True
+
+    def sample(self) -> Dict[str, Any]:
+        """One snapshot; CPU is measured since the previous call (None on the first)"""
+        busy, total = _cpu_counters(psutil.cpu_times())
+        cpu_percent = None
+        if self._previous_cpu is not None:
+            busy_delta = busy - self._previous_cpu[0]
+            total_delta = total - self._previous_cpu[1]
+            if total_delta > 0:
+                cpu_percent = round(100 * busy_delta / total_delta, 1)
+        self._previous_cpu = (busy, total)
+
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        return {
+            'cpu_percent': cpu_percent,
+            'memory_percent': memory.percent,
+            'memory_total_bytes': memory.total,
+            'memory_available_bytes': memory.available,
+            'disk_percent': disk.percent,
+            'load_average': list(os.getloadavg()) if hasattr(os, 'getloadavg') else None,
+            'sampled_at': time.time(),
+            'sampler_pid': os.getpid()
+        }
+
+    def _publish(self, snapshot: Dict[str, Any]):
+        # Written aside and renamed so readers never see a partial file
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, self.path)
+        self._snapshot = snapshot
+        self._read_at = time.monotonic()
+
+    def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        Latest host snapshot, re-read at most once per interval
+
+        None until the first one is written, and again once it is more than
+        SNAPSHOT_MAX_AGE intervals old (left by a previous run, or by a
+        sampler that stopped writing).
+        """
+        self.start()
+        now = time.monotonic()
+        if self._snapshot is None or now - self._read_at >= self.interval:
+            try:
+                with open(self.path) as f:
+                    self._snapshot = json.load(f)
+                self._read_at = now
+            except (OSError, ValueError):
+                pass
+        snapshot = self._snapshot
+        if snapshot is None or time.time() - snapshot.get('sampled_at', 0) > self.SNAPSHOT_MAX_AGE * self.interval:
+            return None
+        return snapshot
+
+    def host_memory(self) -> Optional[Dict[str, float]]:
+        """Host memory from the snapshot, or read directly (it never blocks) until there is one"""
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return {key: snapshot[key] for key in ('memory_total_bytes', 'memory_available_bytes', 'memory_percent')}
+        if not PSUTIL_AVAILABLE:
+            return None
+        memory = psutil.virtual_memory()
+        return {
+            'memory_total_bytes': memory.total,
+            'memory_available_bytes': memory.available,
+            'memory_percent': memory.percent
+        }
+
+    def process_memory(self) -> Optional[Dict[str, float]]:
+        """This worker's own memory use (a cheap /proc read, not a host sample)"""
+        if not PSUTIL_AVAILABLE:
+            return None
+        if self._process is None or self._process.pid != os.getpid():
+            self._process = psutil.Process()
+        memory_info = self._process.memory_info()
+        snapshot = self.get_snapshot()
+        total = snapshot['memory_total_bytes'] if snapshot else psutil.virtual_memory().total
+        return {
+            'rss_mb': round(memory_info.rss / (1024 * 1024), 2),
+            'vms_mb': round(memory_info.vms / (1024 * 1024), 2),
+            'percent': round(100 * memory_info.rss / total, 2)
+        }
+
+system_sampler = SystemSampler()
+
+def get_system_snapshot() -> Optional[Dict[str, Any]]:
+    return system_sampler.get_snapshot()
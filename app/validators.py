@@ -27,9 +27,9 @@ class InputValidator:
         'infant', 'elementary', 'junior-high', 'high-school', 'college-young-adult', 'married-parents', 'journeying-adults'
     }
     
-    # Valid genders
+    # Valid genders ('skip' is the quiz's "Show me everything" answer)
     VALID_GENDERS = {
-        'male', 'female', 'other', 'prefer-not-to-say'
+        'male', 'female', 'other', 'prefer-not-to-say', 'skip'
     }
     
     # Valid states in life
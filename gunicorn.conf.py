@@ -0,0 +1,66 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+"""
+Gunicorn settings and worker lifecycle hooks
+
+Start with `gunicorn main:app` (this file is picked up automatically). The
+app is preloaded in the master so workers share its memory copy-on-write;
+the master may touch the database while starting up (migrations, catalog
+sync), but it closes its pool before forking, and each worker opens and warms its own
+pool in post_fork and closes it again in worker_exit.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 20))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+accesslog = '-'
+
+# With per-worker memory caches a catalog edit would only reach the worker
+# that handled it (the others catch up after CATALOG_MAX_AGE), so several
+# workers share the host's mmap cache unless a backend is chosen explicitly
+if workers > 1:
+    os.environ.setdefault('CACHE_BACKEND', 'shared')
+
+def on_starting(server):
+    from app.metrics import clear_metrics_dir
+    # Workers of a previous run must not count towards this one
+    clear_metrics_dir()
+
+def when_ready(server):
+    from app.catalog import sync_catalog
+    from app.database import close_connection_pool
+    # Once per deploy rather than per worker; a single query when nothing changed.
+    # Without preload it can run before any migration, but then each worker's
+    # create_app seeds an empty catalog itself
+    try:
+        sync_catalog()
+    except Exception as e:
+        server.log.warning(f"Ministry catalog sync failed: {e}")
+    # Connections opened while preloading must not be inherited by workers
+    close_connection_pool()
+
+def pre_fork(server, worker):
+    from app.database import close_connection_pool
+    close_connection_pool()
+
+def post_fork(server, worker):
+    from app.database import warm_connection_pool
+    try:
+        warm_connection_pool()
+    except Exception as e:
+        # The pool is created lazily on first use if the database is not up yet
+        server.log.warning(f"Worker {worker.pid} could not warm its connection pool: {e}")
+
+def worker_exit(server, worker):
+    from app.database import close_connection_pool
+    from app.submission_queue import submission_queue
+    # Write queued submissions while the pool is still open
+    submission_queue.stop()
+    close_connection_pool()
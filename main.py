@@ -9,12 +9,10 @@ import time
 import requests
 import pytz
 from datetime import datetime
-import json
 
 from flask import jsonify
 from app import create_app
 from app.database import get_db_connection, close_connection_pool
-from app.ministries import MINISTRY_DATA
 from app.config import Config
 
 # Create the Flask application using the factory pattern
@@ -63,73 +61,6 @@ def keep_alive():
             logger.error(f"Keep-alive service error: {e}")
             time.sleep(900)  # Wait 15 minutes before retrying (increased from 10)
 
-def auto_migrate_ministries():
-    """Auto-migrate ministry data to database on startup"""
-    try:
-        logger.info("Starting ministry migration...")
-        
-        with get_db_connection() as (conn, cur):
-            # Check if ministries table is empty
-            cur.execute("SELECT COUNT(*) FROM ministries")
-            count = cur.fetchone()[0]
-            
-            if count == 0:
-                logger.info("Ministries table is empty, migrating data...")
-                
-                # Insert all ministries from MINISTRY_DATA
-                for key, ministry in MINISTRY_DATA.items():
-                    cur.execute('''
-                        INSERT INTO ministries 
-                        (ministry_key, name, description, details, age_groups, 
-                         genders, states, interests, situations, active)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (ministry_key) DO NOTHING
-                    ''', (
-                        key,
-                        ministry.get('name'),
-                        ministry.get('description', ''),
-                        ministry.get('details', ''),
-                        json.dumps(ministry.get('age', [])),
-                        json.dumps(ministry.get('gender', [])),
-                        json.dumps(ministry.get('state', [])),
-                        json.dumps(ministry.get('interest', [])),
-                        json.dumps(ministry.get('situation', [])),
-                        True
-                    ))
-                
-                logger.info(f"Successfully migrated {len(MINISTRY_DATA)} ministries to database")
-            else:
-                logger.info(f"Ministries table already has {count} entries, skipping migration")
-                
-                # Ensure mass ministry is always active
-                mass_data = MINISTRY_DATA.get('mass')
-                if mass_data:
-                    cur.execute(
-                        '''
-                        INSERT INTO ministries (ministry_key, name, description, details, age_groups, genders, states, interests, situations, active)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, TRUE)
-                        ON CONFLICT (ministry_key)
-                        DO UPDATE SET active = TRUE
-                        ''',
-                        ( 'mass', 
-                          mass_data.get('name'),
-                          mass_data.get('description', ''),
-                          mass_data.get('details', ''),
-                          json.dumps(mass_data.get('age', [])),
-                          json.dumps(mass_data.get('gender', [])),
-                          json.dumps(mass_data.get('state', [])),
-                          json.dumps(mass_data.get('interest', [])),
-                          json.dumps(mass_data.get('situation', []))
-                        )
-                    )
-                    logger.info("Ensured 'Come to Mass' ministry is present and active")
-                
-    except Exception as e:
-        logger.error(f"Ministry migration failed: {e}")
-
-# Auto-migrate ministries on startup
-auto_migrate_ministries()
-
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+"""
+Rebuild the hourly and daily submission rollups from raw submissions.
+
+Run after importing or deleting submissions outside the app:
+    python scripts/backfill_rollups.py                      # everything
+    python scripts/backfill_rollups.py --from 2025-01-01 --to 2025-01-31
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Add parent directory to path so app can be imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rollups import rebuild_rollups
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild submission rollups')
+    parser.add_argument('--from', dest='date_from', type=parse_date, help='First day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='date_to', type=parse_date, help='Last day to rebuild (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    try:
+        written = rebuild_rollups(args.date_from, args.date_to)
+    except Exception as e:
+        print(f"❌ Rollup backfill failed: {e}")
+        return 1
+
+    print(f"✅ Rebuilt rollups: {written.get('day', 0)} daily rows, {written.get('hour', 0)} hourly rows")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
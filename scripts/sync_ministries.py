@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+"""
+Sync the bundled ministry catalog (app/ministries.py) into the database.
+
+Seeds an empty table and updates ministries whose bundled content changed
+since the last sync; ministries edited or deleted in the admin are left alone.
+The app seeds an empty table on startup by itself; run this after changing
+the catalog (gunicorn also runs it once at startup):
+    python scripts/sync_ministries.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path so app can be imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.catalog import sync_catalog
+
+def main():
+    try:
+        result = sync_catalog()
+    except Exception as e:
+        print(f"❌ Ministry sync failed: {e}")
+        return 1
+
+    print(f"✅ Ministries synced: {result['inserted']} inserted, {result['updated']} updated, "
+          f"{result['unchanged']} unchanged, {result['skipped']} deleted in the admin")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
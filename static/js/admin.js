@@ -4,7 +4,11 @@
 
 // Admin Dashboard JavaScript - VERSION 2.3
 console.log('Admin Dashboard JavaScript loaded - Version 2.3');
-let submissionsData = [];
+let nextSubmissionsCursor = null;
+
+// The table pages through /admin/api/submissions; stats and charts come pre-aggregated from /admin/api/stats
+const SUBMISSIONS_PAGE_SIZE = 50;
+const TABLE_FIELDS = 'submitted_at,age_group,gender,state_in_life,situation,interest,recommended_ministries';
 
 // Helper functions for show/hide without inline styles
 function show(element) {
@@ -55,25 +59,22 @@ async function loadDashboardData() {
         show('loading');
         
         console.log('Loading dashboard data from /admin/api/submissions...');
-        const response = await fetch('/admin/api/submissions');
-        console.log('Response status:', response.status);
         
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
+        // Render the first page of the table as soon as it arrives
+        const firstPage = await fetchSubmissionsPage({ limit: SUBMISSIONS_PAGE_SIZE, fields: TABLE_FIELDS });
+        renderSubmissionsTable(firstPage.submissions);
+        nextSubmissionsCursor = firstPage.next_cursor;
+        updateLoadMoreButton();
+        
+        hide('loading');
         
-        submissionsData = await response.json();
+        const stats = await fetchStats();
         
         // Update stats
-        updateStats(submissionsData);
-        
-        // Render submissions table
-        renderSubmissionsTable(submissionsData);
+        updateStats(stats);
         
         // Initialize charts
-        initializeCharts(submissionsData);
-        
-        hide('loading');
+        initializeCharts(stats);
         
     } catch (error) {
         console.error('Error loading dashboard data:', error);
@@ -88,19 +89,64 @@ async function loadDashboardData() {
 }
 
 
+async function fetchSubmissionsPage(params) {
+    const response = await fetch('/admin/api/submissions?' + new URLSearchParams(params));
+    console.log('Response status:', response.status);
+    
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    
+    return response.json();
+}
 
-// Update statistics cards
-function updateStats(data) {
-    console.log('Updating stats with data:', data);
-    const uniqueUsers = getUniqueUsers(data);
-    const engagementRate = getEngagementRate(data);
+async function fetchStats() {
+    const response = await fetch('/admin/api/stats');
     
-    console.log('Calculated metrics:', {
-        totalSubmissions: data.length,
-        uniqueUsers: uniqueUsers,
-        engagementRate: engagementRate,
-        thisWeek: getSubmissionsThisWeek(data)
-    });
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    
+    return response.json();
+}
+
+async function loadMoreSubmissions() {
+    if (!nextSubmissionsCursor) return;
+    
+    const button = document.getElementById('loadMoreBtn');
+    button.disabled = true;
+    
+    try {
+        const page = await fetchSubmissionsPage({
+            limit: SUBMISSIONS_PAGE_SIZE,
+            fields: TABLE_FIELDS,
+            cursor: nextSubmissionsCursor
+        });
+        document.querySelector('#submissions tbody')
+            .insertAdjacentHTML('beforeend', page.submissions.map(submissionRowHtml).join(''));
+        nextSubmissionsCursor = page.next_cursor;
+    } catch (error) {
+        console.error('Error loading more submissions:', error);
+    }
+    
+    button.disabled = false;
+    updateLoadMoreButton();
+}
+
+function updateLoadMoreButton() {
+    const button = document.getElementById('loadMoreBtn');
+    if (!button) return;
+    
+    if (nextSubmissionsCursor) {
+        show(button);
+    } else {
+        hide(button);
+    }
+}
+
+// Update statistics cards
+function updateStats(stats) {
+    console.log('Updating stats:', stats);
     
     const statsHtml = `
         <div class="stat-card">
@@ -109,7 +155,7 @@ function updateStats(data) {
                     <i class="fas fa-users"></i>
                 </div>
             </div>
-            <div class="stat-number">${data.length}</div>
+            <div class="stat-number">${stats.total_submissions}</div>
             <div class="stat-label">Total Submissions</div>
         </div>
         <div class="stat-card">
@@ -118,7 +164,7 @@ function updateStats(data) {
                     <i class="fas fa-user-friends"></i>
                 </div>
             </div>
-            <div class="stat-number" title="Unique devices by anonymous ID (not IP)">${uniqueUsers}</div>
+            <div class="stat-number" title="Unique devices by anonymous ID (not IP)">${stats.unique_devices}</div>
             <div class="stat-label">Unique Devices*</div>
         </div>
         <div class="stat-card">
@@ -127,7 +173,7 @@ function updateStats(data) {
                     <i class="fas fa-calendar-week"></i>
                 </div>
             </div>
-            <div class="stat-number">${getSubmissionsThisWeek(data)}</div>
+            <div class="stat-number">${stats.this_week}</div>
             <div class="stat-label">This Week</div>
         </div>
         <div class="stat-card">
@@ -136,7 +182,7 @@ function updateStats(data) {
                     <i class="fas fa-chart-line"></i>
                 </div>
             </div>
-            <div class="stat-number">${engagementRate}</div>
+            <div class="stat-number">${stats.avg_submissions_per_device.toFixed(1)}</div>
             <div class="stat-label">Avg Submissions/User</div>
         </div>
     `;
@@ -144,51 +190,6 @@ function updateStats(data) {
     document.getElementById('stats').innerHTML = statsHtml;
 }
 
-// Calculate stats
-function getSubmissionsToday(data) {
-    const today = new Date().toDateString();
-    return data.filter(s => new Date(s.submitted_at).toDateString() === today).length;
-}
-
-function getSubmissionsThisWeek(data) {
-    const oneWeekAgo = new Date();
-    oneWeekAgo.setDate(oneWeekAgo.getDate() - 7);
-    return data.filter(s => new Date(s.submitted_at) >= oneWeekAgo).length;
-}
-
-function getAveragePerDay(data) {
-    if (data.length === 0) return 0;
-    
-    const dates = data.map(s => new Date(s.submitted_at).toDateString());
-    const uniqueDates = [...new Set(dates)];
-    return (data.length / uniqueDates.length).toFixed(1);
-}
-
-// New engagement tracking functions
-function getUniqueUsers(data) {
-    if (data.length === 0) return 0;
-    
-    // Prefer client_id_hash; fallback to IP for older rows
-    const uniqueDeviceHashes = new Set();
-    const fallbackIPs = new Set();
-    data.forEach(submission => {
-        if (submission.client_id_hash) {
-            uniqueDeviceHashes.add(submission.client_id_hash);
-        } else if (submission.ip_address && submission.ip_address !== 'unknown') {
-            fallbackIPs.add(submission.ip_address);
-        }
-    });
-    const totalUnique = uniqueDeviceHashes.size + Math.max(0, fallbackIPs.size - uniqueDeviceHashes.size);
-    return totalUnique;
-}
-
-function getEngagementRate(data) {
-    const uniqueUsers = getUniqueUsers(data);
-    if (uniqueUsers === 0) return '0.0';
-    
-    return (data.length / uniqueUsers).toFixed(1);
-}
-
 // Render submissions table
 function renderSubmissionsTable(data) {
     const tableHtml = `
@@ -205,22 +206,28 @@ function renderSubmissionsTable(data) {
                 </tr>
             </thead>
             <tbody>
-                ${data.map(submission => `
-                    <tr class="${isRecent(submission.submitted_at) ? 'recent' : ''}">
-                        <td>${formatDate(submission.submitted_at)}</td>
-                        <td>${formatAge(submission.age_group)}</td>
-                        <td>${submission.gender || '-'}</td>
-                        <td>${formatArray(submission.state_in_life)}</td>
-                        <td>${formatArray(submission.situation)}</td>
-                        <td>${formatArray(submission.interest)}</td>
-                        <td>${formatMinistries(submission.recommended_ministries)}</td>
-                    </tr>
-                `).join('')}
+                ${data.map(submissionRowHtml).join('')}
             </tbody>
         </table>
+        <button class="btn btn-secondary hidden" id="loadMoreBtn">Load more</button>
     `;
     
     document.getElementById('submissions').innerHTML = tableHtml;
+    document.getElementById('loadMoreBtn').addEventListener('click', loadMoreSubmissions);
+}
+
+function submissionRowHtml(submission) {
+    return `
+        <tr class="${isRecent(submission.submitted_at) ? 'recent' : ''}">
+            <td>${formatDate(submission.submitted_at)}</td>
+            <td>${formatAge(submission.age_group)}</td>
+            <td>${submission.gender || '-'}</td>
+            <td>${formatArray(submission.state_in_life)}</td>
+            <td>${formatArray(submission.situation)}</td>
+            <td>${formatArray(submission.interest)}</td>
+            <td>${formatMinistries(submission.recommended_ministries)}</td>
+        </tr>
+    `;
 }
 
 // Format helpers
@@ -262,7 +269,7 @@ function isRecent(dateString) {
 }
 
 // Initialize charts
-function initializeCharts(data) {
+function initializeCharts(stats) {
     const chartLoading = document.getElementById('chart-loading');
     const chartError = document.getElementById('chart-error');
     const chartsContent = document.getElementById('charts-content');
@@ -274,12 +281,12 @@ function initializeCharts(data) {
         show(chartsContent);
         
         // Create charts
-        createMinistriesChart(data);
-        createAgeChart(data);
-        createGenderChart(data);
-        createInterestChart(data);
-        createSituationChart(data);
-        createEngagementChart(data);
+        createMinistriesChart(stats.ministries);
+        createAgeChart(stats.age_groups);
+        createGenderChart(stats.genders);
+        createInterestChart(stats.interests);
+        createSituationChart(stats.situations);
+        createEngagementChart(stats.engagement);
         
     } catch (error) {
         console.error('Error creating charts:', error);
@@ -289,33 +296,16 @@ function initializeCharts(data) {
     }
 }
 
-// Ministry popularity chart
-function createMinistriesChart(data) {
-    const ministryCount = {};
-    
-    data.forEach(submission => {
-        if (submission.recommended_ministries && Array.isArray(submission.recommended_ministries)) {
-            submission.recommended_ministries.forEach(ministry => {
-                // Skip "Come to Mass!" as it's always included
-                if (ministry !== 'Come to Mass!') {
-                    ministryCount[ministry] = (ministryCount[ministry] || 0) + 1;
-                }
-            });
-        }
-    });
-    
-    const sorted = Object.entries(ministryCount)
-        .sort((a, b) => b[1] - a[1])
-        .slice(0, 10);
-    
+// Ministry popularity chart (top 10, "Come to Mass!" excluded server-side)
+function createMinistriesChart(counts) {
     const ctx = document.getElementById('ministriesChart').getContext('2d');
     new Chart(ctx, {
         type: 'bar',
         data: {
-            labels: sorted.map(item => truncateLabel(item[0])),
+            labels: counts.map(item => truncateLabel(item.label)),
             datasets: [{
                 label: 'Recommendations',
-                data: sorted.map(item => item[1]),
+                data: counts.map(item => item.count),
                 backgroundColor: '#005921',
                 borderRadius: 4
             }]
@@ -337,8 +327,7 @@ function createMinistriesChart(data) {
 }
 
 // Age distribution chart
-function createAgeChart(data) {
-    const ageCount = {};
+function createAgeChart(counts) {
     const ageLabels = {
         'infant': 'Infant',
         'elementary': 'Elementary',
@@ -349,20 +338,15 @@ function createAgeChart(data) {
         'journeying-adults': '"Established" Adults'
     };
     
-    data.forEach(submission => {
-        const age = submission.age_group;
-        if (age) {
-            ageCount[age] = (ageCount[age] || 0) + 1;
-        }
-    });
+    counts = counts.filter(item => item.label);
     
     const ctx = document.getElementById('ageChart').getContext('2d');
     new Chart(ctx, {
         type: 'doughnut',
         data: {
-            labels: Object.keys(ageCount).map(age => ageLabels[age] || age),
+            labels: counts.map(item => ageLabels[item.label] || item.label),
             datasets: [{
-                data: Object.values(ageCount),
+                data: counts.map(item => item.count),
                 backgroundColor: ['#005921', '#00843D', '#DAAA00', '#003764', '#52c41a', '#722ed1', '#ff6b6b']
             }]
         },
@@ -380,12 +364,12 @@ function createAgeChart(data) {
 }
 
 // Gender distribution chart
-function createGenderChart(data) {
+function createGenderChart(counts) {
     const genderCount = { male: 0, female: 0, skip: 0 };
     
-    data.forEach(submission => {
-        if (submission.gender) {
-            genderCount[submission.gender] = (genderCount[submission.gender] || 0) + 1;
+    counts.forEach(item => {
+        if (item.label) {
+            genderCount[item.label] = item.count;
         }
     });
     
@@ -411,30 +395,16 @@ function createGenderChart(data) {
     });
 }
 
-// Interest chart
-function createInterestChart(data) {
-    const interestCount = {};
-    
-    data.forEach(submission => {
-        if (submission.interest && Array.isArray(submission.interest)) {
-            submission.interest.forEach(interest => {
-                if (interest !== 'all') {
-                    interestCount[interest] = (interestCount[interest] || 0) + 1;
-                }
-            });
-        }
-    });
-    
-    const sorted = Object.entries(interestCount).sort((a, b) => b[1] - a[1]);
-    
+// Interest chart ("all" excluded server-side)
+function createInterestChart(counts) {
     const ctx = document.getElementById('interestChart').getContext('2d');
     new Chart(ctx, {
         type: 'bar',
         data: {
-            labels: sorted.map(item => formatLabel(item[0])),
+            labels: counts.map(item => formatLabel(item.label)),
             datasets: [{
                 label: 'Count',
-                data: sorted.map(item => item[1]),
+                data: counts.map(item => item.count),
                 backgroundColor: '#00843D',
                 borderRadius: 4
             }]
@@ -456,27 +426,15 @@ function createInterestChart(data) {
     });
 }
 
-// Situation chart
-function createSituationChart(data) {
-    const situationCount = {};
-    
-    data.forEach(submission => {
-        if (submission.situation && Array.isArray(submission.situation)) {
-            submission.situation.forEach(situation => {
-                if (situation !== 'situation-none-of-above') {
-                    situationCount[situation] = (situationCount[situation] || 0) + 1;
-                }
-            });
-        }
-    });
-    
+// Situation chart ("none of the above" excluded server-side)
+function createSituationChart(counts) {
     const ctx = document.getElementById('situationChart').getContext('2d');
     new Chart(ctx, {
         type: 'doughnut',
         data: {
-            labels: Object.keys(situationCount).map(s => formatLabel(s)),
+            labels: counts.map(item => formatLabel(item.label)),
             datasets: [{
-                data: Object.values(situationCount),
+                data: counts.map(item => item.count),
                 backgroundColor: ['#005921', '#DAAA00', '#003764', '#00843D', '#ff6b6b']
             }]
         },
@@ -498,60 +456,17 @@ function truncateLabel(label) {
     return label.length > 20 ? label.substring(0, 20) + '...' : label;
 }
 
-// Engagement patterns chart
-function createEngagementChart(data) {
-    // Group submissions by IP to show engagement patterns
-    const ipEngagement = {};
-    
-    data.forEach(submission => {
-        const key = submission.client_id_hash || submission.ip_address || 'unknown';
-        if (!key || key === 'unknown') return;
-        if (!ipEngagement[key]) {
-            ipEngagement[key] = {
-                count: 0,
-                firstSeen: new Date(submission.submitted_at),
-                lastSeen: new Date(submission.submitted_at)
-            };
-        }
-        ipEngagement[key].count++;
-        const submissionDate = new Date(submission.submitted_at);
-        if (submissionDate < ipEngagement[key].firstSeen) {
-            ipEngagement[key].firstSeen = submissionDate;
-        }
-        if (submissionDate > ipEngagement[key].lastSeen) {
-            ipEngagement[key].lastSeen = submissionDate;
-        }
-    });
-    
-    // Count engagement levels
-    const engagementLevels = {
-        '1 submission': 0,
-        '2-3 submissions': 0,
-        '4-5 submissions': 0,
-        '6+ submissions': 0
-    };
-    
-    Object.values(ipEngagement).forEach(user => {
-        if (user.count === 1) {
-            engagementLevels['1 submission']++;
-        } else if (user.count <= 3) {
-            engagementLevels['2-3 submissions']++;
-        } else if (user.count <= 5) {
-            engagementLevels['4-5 submissions']++;
-        } else {
-            engagementLevels['6+ submissions']++;
-        }
-    });
-    
+// Engagement patterns chart (devices bucketed by how many times they submitted)
+function createEngagementChart(engagement) {
     const ctx = document.getElementById('engagementChart');
     if (!ctx) return; // Chart container might not exist
     
     new Chart(ctx.getContext('2d'), {
         type: 'doughnut',
         data: {
-            labels: Object.keys(engagementLevels),
+            labels: engagement.map(item => item.label),
             datasets: [{
-                data: Object.values(engagementLevels),
+                data: engagement.map(item => item.count),
                 backgroundColor: ['#005921', '#DAAA00', '#003764', '#00843D'],
                 borderWidth: 2,
                 borderColor: '#fff'
@@ -585,71 +500,16 @@ function formatLabel(text) {
 // Show/hide contacts
 
 
-// Export to CSV
+// Export to CSV (streamed by the server, so the browser never holds every row)
 function exportToCSV() {
-    // Optional: Add date filter UI
     const dateFrom = prompt('Export from date (YYYY-MM-DD) or leave empty for all:');
     const dateTo = prompt('Export to date (YYYY-MM-DD) or leave empty for all:');
     
-    let dataToExport = submissionsData;
-    
-    // Filter by date if provided
-    if (dateFrom || dateTo) {
-        dataToExport = submissionsData.filter(submission => {
-            const submittedAt = new Date(submission.submitted_at);
-            if (dateFrom && submittedAt < new Date(dateFrom)) return false;
-            if (dateTo && submittedAt > new Date(dateTo + 'T23:59:59')) return false;
-            return true;
-        });
-    }
-    
-    const csvContent = convertToCSV(dataToExport);
-    const blob = new Blob([csvContent], { type: 'text/csv' });
-    const url = window.URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    
-    const dateRange = (dateFrom || dateTo) 
-        ? `_${dateFrom || 'start'}_to_${dateTo || 'end'}`
-        : '';
-    
-    a.download = `st_edward_ministry_data${dateRange}_${new Date().toISOString().split('T')[0]}.csv`;
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
-    window.URL.revokeObjectURL(url);
-}
-
-function convertToCSV(data) {
-    if (data.length === 0) return '';
-    
-    // Define headers
-    const headers = [
-        'Date/Time',
-        'Age Group',
-        'Gender',
-        'State(s)',
-        'Situation(s)',
-        'Interest(s)',
-        'Recommended Ministries',
-        'IP Address'
-    ];
-    
-    // Create rows
-    const rows = data.map(submission => {
-        return [
-            formatDate(submission.submitted_at),
-            formatAge(submission.age_group),
-            submission.gender || '-',
-            formatArray(submission.state_in_life),
-            formatArray(submission.situation),
-            formatArray(submission.interest),
-            submission.recommended_ministries?.join('; ') || '-',
-            submission.ip_address || '-'
-        ].map(cell => `"${cell}"`).join(',');
-    });
+    const params = new URLSearchParams();
+    if (dateFrom) params.set('from', dateFrom);
+    if (dateTo) params.set('to', dateTo);
     
-    return [headers.join(','), ...rows].join('\n');
+    window.location.href = '/admin/api/submissions/export' + (params.toString() ? '?' + params : '');
 }
 
 // Clear all data modal
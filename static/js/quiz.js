@@ -596,11 +596,11 @@ function createSelectionsummary() {
 }
 
 // ENHANCED RESULTS DISPLAY - NOW WITH PARENT/CHILDREN SEPARATION ✨
-function showResults() {
+async function showResults() {
     document.querySelector('.question.active').classList.remove('active');
     document.getElementById('results').style.display = 'block';
     
-    const allRecommendations = findMinistries();
+    const allRecommendations = await findMinistries();
     const resultsDiv = document.getElementById('ministry-recommendations');
     
     // CREATE SELECTIONS SUMMARY
@@ -748,7 +748,9 @@ function submitAnalytics(recommendations) {
         situation: situation,
         ministries: recommendations.map(m => m.name),
         client_id: getOrRotateClientId(),
-        session_id: getSessionId()
+        session_id: getSessionId(),
+        // Lets the server drop duplicates if the service worker replays this request
+        submission_ref: (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : undefined
     };
     
     console.log('Submitting analytics data:', analyticsData);
@@ -826,191 +828,8 @@ function getSessionId() {
     }
 }
 
-// ENHANCED MINISTRY MATCHING FUNCTION - Fixed parent/children logic + MASS FIRST
-function findMinistries() {
-    // Normalize any array-like fields that may come as JSON strings
-    const normalizeArray = (v) => {
-        if (Array.isArray(v)) return v;
-        if (typeof v === 'string') {
-            try {
-                const parsed = JSON.parse(v);
-                return Array.isArray(parsed) ? parsed : [];
-            } catch (e) {
-                return [];
-            }
-        }
-        return [];
-    };
-
-    const matches = [];
-    const userAge = answers.age;
-    const hasKidsInterest = interests.includes('kids');
-    const isParent = states.includes('parent');
-    
-    // Remove debug logging
-    
-    // Check if ministries loaded
-    if (!ministries || Object.keys(ministries).length === 0) {
-        return [{
-            name: 'Unable to Load Ministries',
-            description: 'We apologize, but we cannot load the ministry list at this time.',
-            details: 'Please contact the parish office at (615) 833-5520 or email <a href="mailto:support@stedward.org">support@stedward.org</a> for assistance.'
-        }];
-    }
-    
-    // Remove console.log
-    
-    for (const [key, ministry] of Object.entries(ministries)) {
-        // Skip the welcome committee unless user specifically selected "new-to-stedward"
-        if (key === 'welcome-committee' && !situation.includes('new-to-stedward')) {
-            continue;
-        }
-        
-        let isMatch = true;
-        
-        // ENHANCED LOGIC: If user selected "something for my children" or is a parent,
-        // include children's ministries regardless of user's age
-        const effectiveAges = [userAge];
-        if (hasKidsInterest || isParent) {
-            effectiveAges.push('infant', 'elementary', 'junior-high', 'high-school'); // UPDATED
-        }
-        
-        // Check age (enhanced to include children's ages for parents)
-        // Only apply age filtering if the ministry actually lists age groups.
-        // An empty array should be treated as "all ages" rather than excluding it.
-        if (ministry.age && ministry.age.length > 0 &&
-            !ministry.age.some(age => effectiveAges.includes(age))) {
-            isMatch = false;
-        }
-        
-        // Normalize arrays
-        ministry.age = normalizeArray(ministry.age);
-        ministry.gender = normalizeArray(ministry.gender);
-        ministry.state = normalizeArray(ministry.state);
-        ministry.interest = normalizeArray(ministry.interest);
-        ministry.situation = normalizeArray(ministry.situation);
-
-        // Check gender (only if ministry specifies genders)
-        if (ministry.gender && ministry.gender.length > 0 && answers.gender !== 'skip' && !ministry.gender.includes(answers.gender)) {
-            isMatch = false;
-        }
-        
-        // Check state - if ministry has state requirements, check if ANY selected state matches
-        if (ministry.state && ministry.state.length > 0 && states.length > 0) {
-            if (!states.includes('none-of-above')) {
-                const hasMatchingState = ministry.state.some(s => states.includes(s));
-                if (!hasMatchingState) {
-                    isMatch = false;
-                }
-            }
-        }
-        
-        // Check situation (if ministry has situation requirements)
-        if (ministry.situation && ministry.situation.length > 0) {
-            const hasMatchingSituation = ministry.situation.some(s => situation.includes(s));
-            if (!hasMatchingSituation) {
-                isMatch = false;
-            }
-        }
-        
-        // ENHANCED INTEREST MATCHING
-        if (interests.length > 0) {
-            // If user selected "all", they want to see EVERYTHING - don't filter by interests
-            if (!interests.includes('all')) {
-                // User has specific interests, check if ministry matches
-                if (ministry.interest && ministry.interest.length > 0) {
-                    let hasMatchingInterest = false;
-                    
-                    // If ministry has "all" interests, it matches ANY user interest selection
-                    if (ministry.interest.includes('all')) {
-                        hasMatchingInterest = true;
-                    } else {
-                        // Standard interest matching
-                        hasMatchingInterest = ministry.interest.some(i => interests.includes(i));
-                    }
-                    
-                    // SPECIAL CASE: If user selected "kids" interest, match children's ministries
-                    if (!hasMatchingInterest && hasKidsInterest) {
-                        // Check if this is a children's ministry - UPDATED FOR ELEMENTARY
-                        const isChildrensMinistry = ministry.age && ministry.age.some(age => 
-                            ['infant', 'elementary', 'junior-high', 'high-school'].includes(age)
-                        );
-                        if (isChildrensMinistry) {
-                            hasMatchingInterest = true;
-                        }
-                    }
-                    
-                    if (!hasMatchingInterest) {
-                        isMatch = false;
-                    }
-                }
-            }
-            // If user selected "all", isMatch remains whatever it was (true if age/gender/state matched)
-        }
-        
-        if (isMatch) {
-            matches.push(ministry);
-            // Remove console.log
-        } else {
-            // Remove console.log
-        }
-    } // FIX: Added missing closing brace for the for loop
-    
-    // **CRITICAL FIX: ENSURE MASS IS ALWAYS FIRST**
-    const massIndex = matches.findIndex(m => m.name === 'Come to Mass!');
-    if (massIndex > 0) {
-        const massMinistry = matches.splice(massIndex, 1)[0];
-        matches.unshift(massMinistry);
-    }
-    
-    // Enhanced fallback logic for parents
-    if (matches.length === 0 && (isParent || hasKidsInterest)) {
-        // Add key family-friendly ministries
-        const familyMinistries = [
-            ministries['st-edward-school'],
-            ministries['prep-kids'],
-            ministries['moms-group'],
-            ministries['meal-train-provide'],
-            ministries['totus-tuus-kids']
-        ].filter(m => m); // Remove undefined ministries
-        
-        familyMinistries.forEach(ministry => {
-            if (!matches.some(m => m.name === ministry.name)) {
-                matches.push(ministry);
-            }
-        });
-    }
-    
-    // Special handling for elementary - always show core options - UPDATED
-    if (answers.age === 'elementary' && matches.length < 2) {
-        // Always include these for elementary kids regardless of interest
-        const coreKidsMinistries = [
-            ministries['st-edward-school'],
-            ministries['prep-kids'],
-            ministries['mass']
-        ];
-        
-        coreKidsMinistries.forEach(ministry => {
-            if (ministry && !matches.some(m => m.name === ministry.name)) {
-                matches.push(ministry);
-            }
-        });
-        
-        // Add Cub Scouts if they selected fellowship or all
-        if (interests.includes('fellowship') || interests.includes('all')) {
-            if (!matches.some(m => m.name === ministries['cub-scouts'].name)) {
-                matches.push(ministries['cub-scouts']);
-            }
-        }
-        
-        // Ensure Mass is still first after adding core ministries
-        const massIndex = matches.findIndex(m => m.name === 'Come to Mass!');
-        if (massIndex > 0) {
-            const massMinistry = matches.splice(massIndex, 1)[0];
-            matches.unshift(massMinistry);
-        }
-    }
-    
+// MINISTRY MATCHING - runs server-side via /api/recommend (Mass first, parent fallbacks, etc.)
+async function findMinistries() {
     // If no interests selected, show general options with navigation
     if (interests.length === 0) {
         const noInterestsMessage = {
@@ -1021,6 +840,36 @@ function findMinistries() {
         return [noInterestsMessage];
     }
     
+    let matches;
+    try {
+        const response = await fetch('/api/recommend', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                answers: answers,
+                states: states,
+                interests: interests,
+                situation: situation
+            })
+        });
+        
+        if (!response.ok) {
+            throw new Error(`Server error: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        matches = data.ministries || [];
+    } catch (error) {
+        console.error('Error loading recommendations:', error);
+        return [{
+            name: 'Unable to Load Ministries',
+            description: 'We apologize, but we cannot load the ministry list at this time.',
+            details: 'Please contact the parish office at (615) 833-5520 or email <a href="mailto:support@stedward.org">support@stedward.org</a> for assistance.'
+        }];
+    }
+    
     // If we still have no matches for any age group, show general options
     if (matches.length === 0) {
         return [
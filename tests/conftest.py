@@ -6,6 +6,7 @@ import pytest
 import os
 import tempfile
 import json
+import time
 from unittest.mock import patch, MagicMock
 
 # Set up test environment
@@ -13,6 +14,11 @@ os.environ['FLASK_ENV'] = 'testing'
 os.environ['SECRET_KEY'] = 'test-secret-key'
 os.environ['ADMIN_USERNAME'] = 'test_admin'
 os.environ['ADMIN_PASSWORD'] = 'test_password'
+# Keep submissions spilled by the write-behind queue out of the real spill file
+os.environ['SUBMIT_SPILL_PATH'] = os.path.join(tempfile.mkdtemp(), 'submissions.jsonl')
+# Per-worker metrics files go to a scratch directory too
+os.environ['METRICS_DIR'] = tempfile.mkdtemp()
+os.environ['SYSTEM_STATS_PATH'] = os.path.join(tempfile.mkdtemp(), 'system.json')
 
 @pytest.fixture
 def app():
@@ -60,6 +66,14 @@ def mock_db_connection():
         
         yield mock
 
+@pytest.fixture
+def admin_client(client):
+    """Test client with an authenticated admin session"""
+    with client.session_transaction() as session:
+        session['admin_authenticated'] = True
+        session['auth_time'] = time.time()
+    return client
+
 @pytest.fixture
 def sample_submission_data():
     """Sample valid submission data for testing."""
@@ -0,0 +1,226 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+import app.database as database
+from app.cache import invalidate_submission_cache
+from app.submissions import encode_cursor, decode_cursor
+
+class TestSubmissionsExport:
+    """Test the streaming CSV export"""
+
+    def test_stream_uses_named_cursor_in_batches(self, mock_db_connection):
+        mock_conn = mock_db_connection.return_value.__enter__.return_value[0]
+        export_cur = mock_conn.cursor.return_value
+        export_cur.fetchmany.side_effect = [
+            [(1, 'Anonymous User', 'journeying-adults', 'female', ['single'], ['music'], [], ['Adult Choir'],
+              datetime(2025, 6, 1, 10, 30))],
+            [(2, 'Anonymous User', 'high-school', 'male', [], ['all'], [], [], datetime(2025, 6, 2, 9, 0))],
+            []
+        ]
+
+        chunks = list(database.stream_submissions_csv(itersize=1))
+
+        mock_conn.cursor.assert_called_with(name='submissions_export')
+        assert export_cur.itersize == 1
+        assert chunks[0].startswith('id,name,age_group')
+        assert len(chunks) == 3
+        assert '"[""single""]"' in chunks[1]
+        export_cur.close.assert_called_once()
+
+    def test_stream_copy_mode(self, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.mogrify.return_value = b'SELECT 1'
+        mock_cursor.copy_expert.side_effect = lambda sql, spool: spool.write(b'id,name\n1,Anonymous User\n')
+
+        body = ''.join(database.stream_submissions_csv(use_copy=True))
+
+        assert mock_cursor.copy_expert.call_args.args[0].startswith('COPY (SELECT 1) TO STDOUT')
+        assert body == 'id,name\n1,Anonymous User\n'
+
+    def test_stream_copy_mode_multibyte_across_chunks(self, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.mogrify.return_value = b'SELECT 1'
+        # The bullet's three bytes straddle the first 64KB read
+        text = 'x' * (64 * 1024 - 1) + '\u2022 done\n'
+        mock_cursor.copy_expert.side_effect = lambda sql, spool: spool.write(text.encode('utf-8'))
+
+        assert ''.join(database.stream_submissions_csv(use_copy=True)) == text
+
+    def test_export_endpoint_streams_csv(self, admin_client):
+        with patch('app.database.stream_submissions_csv', return_value=iter(['id,name\r\n', '1,Anonymous User\r\n'])) as mock_stream:
+            response = admin_client.get('/admin/api/submissions/export?to=2025-06-30')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert response.headers['Cache-Control'] == 'no-store'
+        assert response.get_data(as_text=True) == 'id,name\r\n1,Anonymous User\r\n'
+        assert mock_stream.call_args.kwargs['date_to'] == '2025-06-30 23:59:59'
+
+    def test_export_database_error(self, admin_client):
+        with patch('app.database.get_db_connection') as mock_db:
+            mock_db.side_effect = Exception("Database connection failed")
+            response = admin_client.get('/admin/api/submissions/export')
+
+        assert response.status_code == 500
+        assert response.get_json()['success'] is False
+
+class TestSubmissionsPage:
+    """Test the keyset-paginated submissions API"""
+
+    def rows(self, count):
+        return [
+            {'id': 100 - i, 'submitted_at': datetime(2025, 6, 1, 12, 0), 'age_group': 'high-school',
+             'gender': 'male', 'interest': '["music"]', 'recommended_ministries': ['Youth Choir']}
+            for i in range(count)
+        ]
+
+    def test_cursor_roundtrip(self):
+        token = encode_cursor(datetime(2025, 6, 1, 12, 30, 5, 123), 42)
+        assert decode_cursor(token) == (datetime(2025, 6, 1, 12, 30, 5, 123), 42)
+
+    def test_first_page_and_next_cursor(self, admin_client, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = self.rows(3)
+
+        response = admin_client.get('/admin/api/submissions?limit=2&fields=age_group,interest&gender=male&ministry=Youth Choir')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['count'] == 2
+        assert data['has_more'] is True
+        assert data['submissions'][0] == {'age_group': 'high-school', 'interest': ['music']}
+        assert decode_cursor(data['next_cursor']) == (datetime(2025, 6, 1, 12, 0), 99)
+
+        query, params = mock_cursor.execute.call_args.args
+        assert 'ORDER BY submitted_at DESC, id DESC LIMIT %s' in query
+        assert 'gender = %s' in query
+        assert 'recommended_ministries @> %s::jsonb' in query
+        assert params == ['male', '["Youth Choir"]', 3]
+
+    def test_cursor_continues_after_keyset(self, admin_client, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = self.rows(1)
+        token = encode_cursor(datetime(2025, 6, 1, 12, 0), 99)
+
+        data = admin_client.get(f'/admin/api/submissions?cursor={token}&from=2025-01-01&fields=gender').get_json()
+
+        assert data['has_more'] is False
+        assert data['next_cursor'] is None
+        query, params = mock_cursor.execute.call_args.args
+        assert '(submitted_at, id) < (%s, %s)' in query
+        assert params == ['2025-01-01', datetime(2025, 6, 1, 12, 0), 99, 51]
+
+    @pytest.mark.parametrize('query_string', ['cursor=not-a-cursor', 'fields=password', 'from=June'])
+    def test_invalid_parameters(self, admin_client, query_string):
+        response = admin_client.get(f'/admin/api/submissions?{query_string}')
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
+
+class TestSubmissionStats:
+    """Test the SQL-aggregated dashboard statistics"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_stats(self):
+        invalidate_submission_cache()
+
+    def test_stats_from_rollups_and_cached(self, admin_client, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchone.side_effect = [(3, 2, 2, 1, 0, 0), (1, 4)]
+        mock_cursor.fetchall.side_effect = [
+            [
+                ('age_group', 'high-school', 6), ('age_group', 'journeying-adults', 4),
+                ('gender', 'female', 7), ('gender', 'male', 3),
+                ('interest', 'music', 8), ('interest', 'all', 2),
+                ('ministry', 'Come to Mass!', 10), ('ministry', 'Adult Choir', 5),
+                ('situation', 'new-to-stedward', 2),
+                ('total', '', 10)
+            ]
+        ]
+
+        response = admin_client.get('/admin/api/stats')
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'no-store'
+        stats = response.get_json()
+        assert stats['source'] == 'rollups'
+        assert stats['total_submissions'] == 10
+        assert stats['this_week'] == 4
+        assert stats['unique_devices'] == 3
+        assert stats['avg_submissions_per_device'] == 3.3
+        assert stats['ministries'] == [{'label': 'Adult Choir', 'count': 5}]
+        assert stats['interests'] == [{'label': 'music', 'count': 8}]
+        assert stats['engagement'][:2] == [{'label': '1 submission', 'count': 2}, {'label': '2-3 submissions', 'count': 1}]
+        assert stats['engagement'][3] == {'label': '6+ submissions', 'count': 0}
+        # Devices and engagement come from the per-device daily rows, not raw submissions
+        statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert "dimension IN ('client', 'ip')" in statements[0]
+        assert not any('ministry_submissions' in statement for statement in statements)
+
+        assert admin_client.get('/admin/api/stats').get_json() == stats
+        assert mock_db_connection.call_count == 1
+
+        invalidate_submission_cache()
+        mock_cursor.fetchone.side_effect = [(0, 0, 0, 0, 0, 0), (0, 0)]
+        mock_cursor.fetchall.side_effect = None
+        admin_client.get('/admin/api/stats')
+        assert mock_db_connection.call_count == 2
+
+    def test_filtered_stats_use_raw_rows(self, admin_client, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchone.side_effect = [(2, 0, 2, 0, 0, 0), (2, 0, 2)]
+        mock_cursor.fetchall.side_effect = [[('Adult Choir', 2)], [], [], [], []]
+
+        stats = admin_client.get('/admin/api/stats?gender=female').get_json()
+
+        assert stats['source'] == 'submissions'
+        assert stats['ministries'] == [{'label': 'Adult Choir', 'count': 2}]
+        assert any('jsonb_array_elements_text' in call.args[0] for call in mock_cursor.execute.call_args_list)
+
+    def test_stats_invalid_filter(self, admin_client):
+        response = admin_client.get('/admin/api/stats?from=yesterday')
+        assert response.status_code == 400
+
+class TestSubmissionRollups:
+    """Test the hourly/daily submission rollups"""
+
+    def test_rollups_endpoint(self, admin_client, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.side_effect = [
+            [(datetime(2025, 6, 1), 3), (datetime(2025, 6, 2), 2)],
+            [('gender', 'female', 4), ('gender', 'male', 1)]
+        ]
+
+        response = admin_client.get('/admin/api/rollups?from=2025-06-01&to=2025-06-07&dimensions=total,gender')
+
+        assert response.status_code == 200
+        report = response.get_json()
+        assert report['total'] == 5
+        assert report['series'][0] == {'bucket': '2025-06-01T00:00:00', 'count': 3}
+        assert report['breakdown'] == {'gender': [{'label': 'female', 'count': 4}, {'label': 'male', 'count': 1}]}
+        assert 'submission_rollups_daily' in mock_cursor.execute.call_args_list[0].args[0]
+
+    @pytest.mark.parametrize('query_string', ['granularity=week', 'granularity=hour&from=2025-01-01&to=2025-03-01',
+                                              'from=2025-06-07&to=2025-06-01'])
+    def test_rollups_invalid_range(self, admin_client, query_string):
+        assert admin_client.get(f'/admin/api/rollups?{query_string}').status_code == 400
+
+    def test_inserted_rows_update_rollups_in_same_transaction(self, mock_db_connection):
+        from app.submission_queue import insert_submissions, build_submission_row, new_submission_ref
+
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        rows = [build_submission_row({'age_group': 'high-school'}, [], None, None, None, new_submission_ref())
+                for _ in range(2)]
+
+        # Only one row is new; the other was already stored by an earlier replay
+        mock_cursor.fetchall.return_value = [(41,)]
+        assert insert_submissions(rows) == 2
+
+        rollup_calls = [call for call in mock_cursor.execute.call_args_list if 'submission_rollups' in call.args[0]]
+        assert len(rollup_calls) == 2
+        assert all(call.args[1]['ids'] == [41] for call in rollup_calls)
+        # Row locks are taken in key order so concurrent flushes cannot deadlock
+        assert all('ORDER BY 1, 2, 3' in call.args[0] for call in rollup_calls)
@@ -0,0 +1,191 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import pytest
+from unittest.mock import patch
+
+from app.cache import CacheManager, SharedMemoryCacheBackend
+
+@pytest.fixture
+def cache():
+    manager = CacheManager()
+    manager.max_cache_size = 3
+    return manager
+
+class TestCacheManager:
+    """Test the in-memory LRU cache backend"""
+
+    def test_get_set_roundtrip(self, cache):
+        assert cache.set('a', {'x': 1})
+        assert cache.get('a') == {'x': 1}
+        assert cache.get('missing') is None
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+        cache.get('a')  # 'b' is now the least recently used
+        cache.set('d', 4)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert len(cache.memory_cache) == 3
+
+    def test_byte_accounting(self, cache):
+        cache.set('a', 'x' * 100)
+        size_after_insert = cache.memory_bytes
+        assert size_after_insert > 100
+
+        cache.set('a', 'x' * 10)
+        assert cache.memory_bytes < size_after_insert
+
+        cache.delete('a')
+        assert cache.memory_bytes == 0
+
+    def test_evicts_to_stay_under_memory_limit(self, cache):
+        cache.max_cache_size = 100
+        cache.max_memory_mb = 1000 / (1024 * 1024)  # ~1000 bytes
+
+        for i in range(5):
+            cache.set(f'key{i}', 'x' * 300)
+
+        assert cache.memory_bytes <= 1000
+        assert cache.get('key4') is not None
+        assert cache.get('key0') is None
+
+    def test_oversized_entry_rejected(self, cache):
+        cache.max_memory_mb = 100 / (1024 * 1024)
+        assert cache.set('big', 'x' * 1000) is False
+        assert cache.memory_bytes == 0
+
+    def test_lazy_expiry(self, cache):
+        with patch('app.cache.time.time', return_value=1000.0):
+            cache.set('short', 1, ttl=10)
+            cache.set('long', 2, ttl=100)
+
+        with patch('app.cache.time.time', return_value=1050.0):
+            assert cache.get('short') is None
+            assert cache.get('long') == 2
+            cache.set('new', 3)
+            assert 'short' not in cache.memory_cache
+
+class TestCacheNamespaces:
+    """Test generation-based namespace invalidation"""
+
+    def test_cached_results_invalidated_by_namespace(self):
+        from app.cache import cached, invalidate_ministry_cache, MINISTRY_NAMESPACE
+
+        calls = []
+
+        @cached(MINISTRY_NAMESPACE, ttl=60)
+        def load(value):
+            calls.append(value)
+            return {'value': value}
+
+        assert load('x') == {'value': 'x'}
+        assert load('x') == {'value': 'x'}
+        assert len(calls) == 1
+
+        invalidate_ministry_cache()
+        assert load('x') == {'value': 'x'}
+        assert len(calls) == 2
+
+    def test_keys_carry_namespace_and_generation(self, cache):
+        key = cache._generate_key('submissions', 1, page=2)
+        assert key.startswith('submissions:0:')
+
+        cache.invalidate_namespace('submissions')
+        assert cache._generate_key('submissions', 1, page=2).startswith('submissions:1:')
+        assert cache.get_generation('ministries') == 0
+
+class TestSharedMemoryBackend:
+    """Test the mmap-backed cache shared between worker processes"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / 'cache')
+
+    def test_entries_visible_to_other_instances(self, path):
+        first = SharedMemoryCacheBackend(path, slot_count=8, slot_size=1024)
+        second = SharedMemoryCacheBackend(path, slot_count=8, slot_size=1024)
+
+        assert first.set('a', b'payload', ttl=60)
+        assert second.get('a') == b'payload'
+
+        second.delete('a')
+        assert first.get('a') is None
+
+    def test_oversized_and_expired_entries(self, path):
+        backend = SharedMemoryCacheBackend(path, slot_count=8, slot_size=256)
+        assert not backend.set('big', b'x' * 512, ttl=60)
+
+        with patch('app.cache.time.time', return_value=1000.0):
+            backend.set('short', b'1', ttl=10)
+        with patch('app.cache.time.time', return_value=1050.0):
+            assert backend.get('short') is None
+
+    def test_counters_shared_and_survive_clear(self, path):
+        first = SharedMemoryCacheBackend(path, slot_count=8, slot_size=1024)
+        second = SharedMemoryCacheBackend(path, slot_count=8, slot_size=1024)
+
+        assert first.get_counter('generation:ministries') == 0
+        assert first.incr('generation:ministries') == 1
+        assert second.incr('generation:ministries') == 2
+
+        first.set('a', b'1', ttl=60)
+        second.clear()
+        assert first.get('a') is None
+        assert first.get_counter('generation:ministries') == 2
+
+    def test_threads_in_one_process_exclude_each_other(self, path):
+        import fcntl
+        import threading
+
+        backend = SharedMemoryCacheBackend(path, slot_count=8, slot_size=1024)
+        writer = threading.Thread(target=backend.set, args=('a', b'payload', 60))
+
+        # flock alone would let the second thread in through the shared fd
+        with backend._locked(fcntl.LOCK_EX):
+            writer.start()
+            writer.join(0.2)
+            assert writer.is_alive()
+        writer.join()
+        assert backend.get('a') == b'payload'
+        assert backend.get_stats()['slots_used'] == 1
+
+class TestSharedCacheManager:
+    """Test CacheManager with a shared backend configured"""
+
+    def test_generations_and_values_shared(self, tmp_path):
+        config = {'CACHE_BACKEND': 'shared', 'CACHE_SHARED_PATH': str(tmp_path / 'cache'),
+                  'CACHE_SHARED_SLOTS': 8, 'CACHE_SHARED_SLOT_KB': 4}
+        first, second = CacheManager(), CacheManager()
+        assert first.configure_backend(config) == 'shared_memory'
+        second.configure_backend(config)
+
+        first.set('k', {'rows': [1, 2]})
+        assert second.get('k') == {'rows': [1, 2]}
+
+        first.invalidate_namespace('ministries')
+        assert second.get_generation('ministries') == 1
+
+    def test_exists_sees_entries_set_by_other_workers(self, tmp_path):
+        config = {'CACHE_BACKEND': 'shared', 'CACHE_SHARED_PATH': str(tmp_path / 'cache'),
+                  'CACHE_SHARED_SLOTS': 8, 'CACHE_SHARED_SLOT_KB': 4}
+        first, second = CacheManager(), CacheManager()
+        first.configure_backend(config)
+        second.configure_backend(config)
+
+        assert not second.exists('k')
+        first.set('k', 1)
+        assert second.exists('k')
+        assert (second.hits, second.misses) == (0, 0)
+
+    def test_unreachable_backend_falls_back_to_memory(self, cache):
+        with patch('app.cache.create_shared_backend', side_effect=ConnectionError("refused")):
+            assert cache.configure_backend({'CACHE_BACKEND': 'redis'}) == 'memory'
+
+        assert not cache.is_shared
+        cache.set('a', 1)
+        assert cache.get('a') == 1
@@ -0,0 +1,182 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import pytest
+from unittest.mock import patch
+
+import app.catalog as catalog
+
+MINISTRY_ROWS = [
+    ('mass', 'Come to Mass!', 'Source and summit', 'Mass times',
+     '["infant", "journeying-adults"]', '[]', '[]', '["prayer", "all"]', '[]'),
+    ('choir', 'Choir', 'Sing with us', 'Practice Wednesdays',
+     '["journeying-adults"]', None, None, '["music"]', None),
+]
+
+@pytest.fixture(autouse=True)
+def fresh_catalog(monkeypatch):
+    """Force every test to start without a snapshot"""
+    monkeypatch.setattr(catalog, '_snapshot', None)
+    catalog.bump_catalog_version()
+
+class TestCatalogSnapshot:
+    """Test the in-process ministry catalog snapshot"""
+
+    def test_snapshot_parses_tag_columns(self, mock_db_connection):
+        """JSON text columns are decoded once, at build time"""
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = MINISTRY_ROWS
+
+        snapshot = catalog.get_catalog_snapshot()
+
+        assert snapshot.ministries['mass']['age'] == ['infant', 'journeying-adults']
+        assert snapshot.ministries['choir']['gender'] == []
+        assert not snapshot.is_fallback
+
+    def test_snapshot_reused_until_version_bump(self, mock_db_connection):
+        """Reads hit the database once per catalog version"""
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = MINISTRY_ROWS
+
+        first = catalog.get_catalog_snapshot()
+        second = catalog.get_catalog_snapshot()
+        assert first is second
+        assert mock_db_connection.call_count == 1
+
+        catalog.bump_catalog_version()
+        third = catalog.get_catalog_snapshot()
+        assert third is not first
+        assert mock_db_connection.call_count == 2
+
+    def test_database_failure_serves_fallback(self):
+        """Bundled data is served, but not retained, when the database is down"""
+        with patch('app.database.get_db_connection') as mock_db:
+            mock_db.side_effect = Exception("Database connection failed")
+
+            snapshot = catalog.get_catalog_snapshot()
+
+            assert snapshot.is_fallback
+            assert 'mass' in snapshot.ministries
+            assert catalog.get_catalog_snapshot() is not snapshot
+
+    def test_database_failure_keeps_previous_snapshot(self, mock_db_connection):
+        """A failed rebuild keeps serving the last good snapshot"""
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = MINISTRY_ROWS
+        good = catalog.get_catalog_snapshot()
+
+        catalog.bump_catalog_version()
+        mock_db_connection.side_effect = Exception("Database connection failed")
+
+        assert catalog.get_catalog_snapshot() is good
+
+    def test_shared_version_checked_at_most_every_interval(self, tmp_path, monkeypatch):
+        from app.cache import CacheManager, MINISTRY_NAMESPACE
+
+        manager, sibling = CacheManager(), CacheManager()
+        config = {'CACHE_BACKEND': 'shared', 'CACHE_SHARED_PATH': str(tmp_path / 'cache'),
+                  'CACHE_SHARED_SLOTS': 8, 'CACHE_SHARED_SLOT_KB': 4}
+        manager.configure_backend(config)
+        sibling.configure_backend(config)
+        monkeypatch.setattr(catalog, 'cache_manager', manager)
+        monkeypatch.setattr(catalog, '_version_check', None)
+
+        with patch('app.catalog.time.monotonic', return_value=100.0):
+            version = catalog.get_catalog_version()
+            with patch.object(manager, 'get_generation', wraps=manager.get_generation) as mock_generation:
+                # A sibling's bump waits for the next check; this worker's own shows at once
+                sibling.invalidate_namespace(MINISTRY_NAMESPACE)
+                assert catalog.get_catalog_version() == version
+                mock_generation.assert_not_called()
+                manager.invalidate_namespace(MINISTRY_NAMESPACE)
+                assert catalog.get_catalog_version() == version + 2
+        with patch('app.catalog.time.monotonic', return_value=100.0 + catalog.CATALOG_VERSION_CHECK_SECONDS):
+            sibling.invalidate_namespace(MINISTRY_NAMESPACE)
+            assert catalog.get_catalog_version() == version + 3
+
+class TestGetMinistriesEndpoint:
+    """Test /api/get-ministries served from the snapshot"""
+
+    def test_etag_revalidation(self, client, mock_db_connection):
+        """A matching If-None-Match returns 304 without a body"""
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = MINISTRY_ROWS
+
+        response = client.get('/api/get-ministries')
+        assert response.status_code == 200
+        assert 'choir' in response.get_json()
+        etag = response.headers['ETag']
+        assert not etag.startswith('W/')
+
+        cached = client.get('/api/get-ministries', headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.data == b''
+
+class TestCatalogSync:
+    """Test the bulk upsert of the bundled catalog"""
+
+    BUNDLED = {
+        'mass': {'name': 'Come to Mass!', 'description': 'Source and summit', 'age': ['infant'], 'interest': ['all']},
+        'choir': {'name': 'Choir', 'details': 'Practice Wednesdays', 'interest': ['music']},
+    }
+
+    def hashes(self):
+        return {key: catalog._sync_row(key, ministry)[-1] for key, ministry in self.BUNDLED.items()}
+
+    def test_noop_sync_is_one_query(self, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchone.return_value = (catalog._catalog_digest(self.hashes()), True, ['mass', 'choir'], False)
+        version = catalog.get_catalog_version()
+
+        with patch('app.catalog.execute_values') as mock_values:
+            result = catalog.sync_catalog(self.BUNDLED)
+
+        assert result == {'inserted': 0, 'updated': 0, 'unchanged': 2, 'skipped': 0}
+        assert mock_cursor.execute.call_count == 1
+        mock_values.assert_not_called()
+        assert catalog.get_catalog_version() == version
+
+    def test_changed_catalog_upserted_in_one_statement(self, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchone.return_value = ('stale', True, [], True)
+        version = catalog.get_catalog_version()
+
+        with patch('app.catalog.execute_values', return_value=[(True,)]) as mock_values:
+            result = catalog.sync_catalog(self.BUNDLED)
+
+        assert result == {'inserted': 1, 'updated': 0, 'unchanged': 1, 'skipped': 0}
+        sql, rows = mock_values.call_args.args[1:3]
+        assert 'ON CONFLICT (ministry_key) DO UPDATE' in sql
+        assert 'IS DISTINCT FROM EXCLUDED.content_hash' in sql
+        assert [row[0] for row in rows] == ['mass', 'choir']
+        assert rows[1][7] == '["music"]'
+        assert catalog.get_catalog_version() > version
+
+    def test_deleted_ministries_not_reinserted(self, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        bundled = {**self.BUNDLED, 'youth': {'name': 'Youth Group', 'age': ['teen']}}
+        # 'youth' was deleted in the admin and 'mass' is missing too
+        mock_cursor.fetchone.return_value = (catalog._catalog_digest({'choir': self.hashes()['choir']}), True, ['choir'], False)
+
+        with patch('app.catalog.execute_values', return_value=[(True,)]) as mock_values:
+            result = catalog.sync_catalog(bundled)
+
+        assert result == {'inserted': 1, 'updated': 0, 'unchanged': 1, 'skipped': 1}
+        assert [row[0] for row in mock_values.call_args.args[2]] == ['mass', 'choir']
+
+    @pytest.mark.parametrize('has_rows, seeded', [(False, True), (True, False)])
+    def test_seed_only_empty_table(self, mock_db_connection, has_rows, seeded):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchone.return_value = (has_rows,)
+
+        with patch('app.catalog.sync_catalog', return_value={'inserted': 2}) as mock_sync:
+            result = catalog.seed_catalog_if_empty()
+
+        assert mock_sync.called == seeded
+        assert result == ({'inserted': 2} if seeded else None)
+
+    def test_content_hash_tracks_bundled_content(self):
+        before = catalog._sync_row('choir', self.BUNDLED['choir'])[-1]
+        after = catalog._sync_row('choir', {**self.BUNDLED['choir'], 'details': 'Practice Thursdays'})[-1]
+        assert before != after
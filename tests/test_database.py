@@ -0,0 +1,296 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+import app.database as database
+from app.database import BlockingConnectionPool, PoolTimeoutError
+
+def fake_connect(*args, **kwargs):
+    conn = MagicMock()
+    conn.closed = False
+    conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+@pytest.fixture
+def pool():
+    with patch('psycopg2.connect', side_effect=fake_connect):
+        yield BlockingConnectionPool(1, 2, timeout=1)
+
+class TestBlockingConnectionPool:
+    """Test waiting, fairness and timeouts of the connection pool"""
+
+    def test_checkout_without_waiting(self, pool):
+        first = pool.getconn()
+        second = pool.getconn()
+        assert first is not second
+        stats = pool.get_stats()
+        assert stats['in_use'] == 2
+        assert stats['waits'] == 0
+        assert stats['peak_in_use'] == 2
+
+    def test_times_out_when_saturated(self, pool):
+        pool.getconn()
+        pool.getconn()
+
+        started = time.monotonic()
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn(timeout=0.05)
+
+        assert time.monotonic() - started >= 0.05
+        stats = pool.get_stats()
+        assert stats['timeouts'] == 1
+        assert stats['waiting'] == 0
+
+    def test_waiters_served_in_order(self, pool):
+        held = [pool.getconn(), pool.getconn()]
+        served = []
+
+        def checkout(name):
+            conn = pool.getconn(timeout=2)
+            served.append(name)
+            time.sleep(0.01)
+            pool.putconn(conn)
+
+        threads = []
+        for name in ('first', 'second', 'third'):
+            thread = threading.Thread(target=checkout, args=(name,))
+            thread.start()
+            threads.append(thread)
+            # Let each thread join the queue before starting the next one
+            while pool.get_stats()['waiting'] < len(threads):
+                time.sleep(0.001)
+
+        pool.putconn(held.pop())
+        for thread in threads:
+            thread.join(2)
+
+        assert served == ['first', 'second', 'third']
+        stats = pool.get_stats()
+        assert stats['waits'] == 3
+        assert stats['wait_ms_max'] > 0
+
+    def test_closeall_wakes_waiters(self, pool):
+        pool.getconn()
+        pool.getconn()
+        errors = []
+
+        def checkout():
+            try:
+                pool.getconn(timeout=2)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=checkout)
+        thread.start()
+        while pool.get_stats()['waiting'] < 1:
+            time.sleep(0.001)
+        pool.closeall()
+        thread.join(2)
+
+        assert len(errors) == 1
+        assert not isinstance(errors[0], PoolTimeoutError)
+
+class TestConnectionRecycling:
+    """Test age/idle recycling and pre-ping of pooled connections"""
+
+    @pytest.fixture
+    def pool(self):
+        with patch('psycopg2.connect', side_effect=fake_connect):
+            yield BlockingConnectionPool(1, 3, timeout=1, max_age=60, max_idle=30, ping_after=5)
+
+    def age(self, pool, conn, created=0, idle=0):
+        now = time.monotonic()
+        pool._created[id(conn)] = now - created
+        pool._last_used[id(conn)] = now - idle
+
+    def test_expired_connection_replaced_at_checkout(self, pool):
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.age(pool, conn, created=120)
+
+        fresh = pool.getconn()
+
+        assert fresh is not conn
+        conn.close.assert_called_once()
+        assert pool.get_stats()['recycled'] == 1
+
+    def test_ping_only_after_idle_threshold(self, pool):
+        conn = pool.getconn()
+        assert not pool.needs_ping(conn)
+        pool.putconn(conn)
+        self.age(pool, conn, idle=10)
+
+        assert pool.needs_ping(pool.getconn())
+
+    def test_reaper_closes_idle_and_refills(self, pool):
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.age(pool, conn, idle=45)
+
+        assert pool.reap() == 1
+
+        stats = pool.get_stats()
+        assert stats['idle'] == 1
+        assert pool._pool[0] is not conn
+        conn.close.assert_called_once()
+
+    def test_failed_ping_discards_idle_connections(self, pool):
+        first, second = pool.getconn(), pool.getconn()
+        pool.minconn = 2
+        pool.putconn(first)
+        pool.putconn(second)
+        for conn in (first, second):
+            self.age(pool, conn, idle=10)
+            conn.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError('server closed the connection')
+
+        with patch('app.database.get_connection_pool', return_value=pool):
+            with database.get_db_connection() as (conn, cur):
+                assert conn not in (first, second)
+
+        assert pool.get_stats()['ping_failures'] == 1
+        first.close.assert_called()
+        second.close.assert_called()
+
+class TestPreparedStatements:
+    """Test the server-side prepared statement registry"""
+
+    @pytest.fixture(autouse=True)
+    def statement(self):
+        database.register_prepared('test_lookup', 'SELECT name FROM ministries WHERE id = %s AND active = %s')
+
+    def test_prepared_once_per_connection(self):
+        cur = MagicMock()
+        cur.connection = MagicMock()
+
+        database.execute_prepared(cur, 'test_lookup', (7, True))
+        database.execute_prepared(cur, 'test_lookup', (8, True))
+
+        statements = [call.args[0] for call in cur.execute.call_args_list]
+        assert statements[0] == 'PREPARE test_lookup AS SELECT name FROM ministries WHERE id = $1 AND active = $2'
+        assert statements[1:] == ['EXECUTE test_lookup (%s, %s)'] * 2
+        assert cur.execute.call_args.args[1] == (8, True)
+
+        other = MagicMock()
+        other.connection = MagicMock()
+        database.execute_prepared(other, 'test_lookup', (7, True))
+        assert other.execute.call_args_list[0].args[0].startswith('PREPARE test_lookup')
+
+    def test_plain_execute_when_disabled(self):
+        cur = MagicMock()
+        with patch('app.database.DB_PREPARED_STATEMENTS', False):
+            database.execute_prepared(cur, 'test_lookup', (7, True))
+        cur.execute.assert_called_once_with('SELECT name FROM ministries WHERE id = %s AND active = %s', (7, True))
+
+    def test_invalid_name_rejected(self):
+        with pytest.raises(ValueError):
+            database.register_prepared('drop table; --', 'SELECT 1')
+
+class TestPoolLifecycle:
+    """Test pool handling across gunicorn's fork"""
+
+    def test_inherited_pool_is_dropped_not_closed(self):
+        inherited = MagicMock()
+        with patch('app.database._connection_pool', inherited), patch('app.database._pool_pid', -1):
+            database.close_connection_pool()
+            assert database._connection_pool is None
+        inherited.closeall.assert_not_called()
+
+    def test_worker_exit_flushes_queue_before_closing_pool(self):
+        import importlib.util
+        import os
+
+        spec = importlib.util.spec_from_file_location(
+            'gunicorn_conf', os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+        gunicorn_conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(gunicorn_conf)
+
+        calls = []
+        with patch('app.submission_queue.submission_queue.stop', side_effect=lambda: calls.append('flush')), \
+                patch('app.database.close_connection_pool', side_effect=lambda: calls.append('close')):
+            gunicorn_conf.worker_exit(MagicMock(), MagicMock())
+
+        assert calls == ['flush', 'close']
+        assert gunicorn_conf.preload_app is True
+
+class TestQueryStats:
+    """Test statement fingerprints, timings and the slow-query log"""
+
+    def test_fingerprint_normalizes_values(self):
+        from app.query_stats import fingerprint
+
+        assert fingerprint("SELECT * FROM ministries WHERE id = 7 AND name = 'O''Brien'  -- lookup") == \
+            fingerprint('SELECT *\n  FROM ministries WHERE id = %s AND name = %(name)s') == \
+            'SELECT * FROM ministries WHERE id = ? AND name = ?'
+        assert fingerprint("UPDATE ministries AS m SET active = v.active FROM (VALUES (1::integer, true), (2::integer, false)) AS v") == \
+            'UPDATE ministries AS m SET active = v.active FROM (VALUES (?::integer, ?), ...) AS v'
+        assert fingerprint("INSERT INTO t VALUES (1, 'a'), (2, 'b'), (3, 'c')") == 'INSERT INTO t VALUES (?, ?), ...'
+
+    def test_long_statements_not_cached(self):
+        from app.query_stats import _normalize_cached, fingerprint
+
+        batch = 'INSERT INTO t VALUES ' + ', '.join(f"({i}, 'name {i}')" for i in range(100))
+        misses = _normalize_cached.cache_info().misses
+        assert fingerprint(batch) == 'INSERT INTO t VALUES (?, ?), ...'
+        assert _normalize_cached.cache_info().misses == misses
+
+    def test_aggregates_and_logs_slow_queries(self):
+        from app.query_stats import QueryStats
+
+        stats = QueryStats(slow_ms=100, explain_rate=1)
+        cur = MagicMock()
+        cur.connection.autocommit = False
+        explain_cur = cur.connection.cursor.return_value
+        explain_cur.fetchall.return_value = [('Seq Scan on ministries',), ('Buffers: shared hit=4',)]
+
+        stats.record_query(cur, 'SELECT name FROM ministries WHERE id = %s', (1,), 0.002, 1)
+        stats.record_query(cur, 'SELECT name FROM ministries WHERE id = %s', (2,), 0.25, 1)
+        stats.record_query(cur, 'DELETE FROM ministries WHERE id = %s', (3,), 0.3, 1)
+        stats.record_checkout(0.004)
+
+        report = stats.get_stats()
+        assert report['queries'] == 3
+        assert report['checkouts'] == 1
+        top = report['top_queries'][0]
+        assert top['fingerprint'] == 'DELETE FROM ministries WHERE id = ?'
+        select = report['top_queries'][1]
+        assert (select['calls'], select['rows'], select['max_ms']) == (2, 2, 250.0)
+
+        slow_select, slow_delete = report['slow_queries']
+        assert slow_select['plan'] == 'Seq Scan on ministries\nBuffers: shared hit=4'
+        assert 'plan' not in slow_delete
+        explained = [call.args for call in explain_cur.execute.call_args_list]
+        assert explained == [('SAVEPOINT query_stats_explain',),
+                             ('EXPLAIN (ANALYZE, BUFFERS) SELECT name FROM ministries WHERE id = %s', (2,)),
+                             ('RELEASE SAVEPOINT query_stats_explain',)]
+
+    def test_connections_hand_out_instrumented_cursors(self, pool):
+        from app.query_stats import QueryStats, instrumented
+
+        class FakeCursor:
+            rowcount = 3
+
+            def execute(self, query, vars=None):
+                pass
+
+        recorder = QueryStats()
+        cur = instrumented(FakeCursor)()
+        with patch('app.query_stats.query_stats', recorder):
+            cur.execute('SELECT id FROM ministries WHERE active = %s', (True,))
+        assert recorder.get_stats()['top_queries'][0]['rows'] == 3
+
+        with patch('app.database.get_connection_pool', return_value=pool), \
+                patch('app.database.query_stats', recorder):
+            with database.get_db_connection(cursor_factory=psycopg2.extras.RealDictCursor) as (conn, cur):
+                pass
+
+        assert conn.cursor.call_args.kwargs['cursor_factory'] is instrumented(psycopg2.extras.RealDictCursor)
+        assert recorder.get_stats()['checkouts'] == 1
@@ -0,0 +1,77 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import os
+import pytest
+from unittest.mock import patch
+
+import app.metrics as metrics
+from app.metrics import MetricsFile, read_metrics_file
+
+# Well above any pid_max, so never a running process
+EXITED_PID = 99999999
+
+@pytest.fixture
+def metrics_dir(tmp_path):
+    with patch('app.metrics.METRICS_DIR', str(tmp_path)), patch('app.metrics._file', None):
+        yield tmp_path
+
+def sample_value(text, line_start):
+    return next(line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(line_start))
+
+class TestMetricsFile:
+    """Test the per-process mmap-backed value store"""
+
+    def test_grows_and_reopens(self, tmp_path):
+        path = str(tmp_path / '1.db')
+        store = MetricsFile(path)
+        keys = [f'sample_{i}_' + 'x' * 40 for i in range(2000)]
+        for key in keys:
+            store.inc(key, 2)
+        store.set(keys[0], 0.5)
+
+        assert os.path.getsize(path) > MetricsFile.INITIAL_SIZE
+        values = read_metrics_file(path)
+        assert len(values) == 2000
+        assert values[keys[0]] == 0.5 and values[keys[-1]] == 2
+
+        MetricsFile(path).inc(keys[-1])
+        assert read_metrics_file(path)[keys[-1]] == 3
+
+class TestOpenMetrics:
+    """Test aggregation across worker files and the text exposition"""
+
+    def test_sums_workers_and_drops_exited_gauges(self, metrics_dir):
+        exited = MetricsFile(str(metrics_dir / f'{EXITED_PID}.db'))
+        exited.inc(metrics._key('quiz_http_requests_total', method='POST', route='/api/submit', status='200'), 5)
+        exited.set(metrics._key('quiz_submission_queue_pending'), 7)
+
+        metrics.observe_request('POST', '/api/submit', 200, 0.02, 120)
+        metrics.observe_request('POST', '/api/submit', 200, 3.0, 120)
+        metrics.inc('quiz_submissions_total', path='queued')
+
+        text = metrics.render_metrics()
+
+        assert text.endswith('# EOF\n')
+        assert '# TYPE quiz_http_requests counter' in text
+        assert sample_value(text, 'quiz_http_requests_total{method="POST",route="/api/submit",status="200"}') == '7'
+        assert sample_value(text, 'quiz_http_request_duration_seconds_bucket{method="POST",route="/api/submit",le="0.025"}') == '1'
+        assert sample_value(text, 'quiz_http_request_duration_seconds_bucket{method="POST",route="/api/submit",le="+Inf"}') == '2'
+        assert sample_value(text, 'quiz_http_request_duration_seconds_count{method="POST",route="/api/submit"}') == '2'
+        assert sample_value(text, 'quiz_http_response_bytes_total{') == '240'
+        assert sample_value(text, 'quiz_submissions_total{path="queued"}') == '1'
+        # Only this process is alive, and its queue is empty
+        assert sample_value(text, 'quiz_submission_queue_pending') == '0'
+        assert 'quiz_cache_requests_total{cache="recommendations",result="hit"}' in text
+
+    def test_label_values_escaped(self):
+        assert metrics._format_sample('m_total', (('route', 'a"b\\c'),), 1.5) == 'm_total{route="a\\"b\\\\c"} 1.5'
+
+    def test_endpoint(self, client, metrics_dir):
+        client.get('/no/such/page')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type == metrics.CONTENT_TYPE
+        assert 'quiz_http_requests_total{method="GET",route="unmatched",status="404"} 1' in response.get_data(as_text=True)
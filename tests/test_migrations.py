@@ -0,0 +1,69 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import psycopg2
+
+from app.migrations import MigrationManager, MIGRATION_LOCK_ID
+
+def executed(mock_cursor):
+    return [' '.join(call.args[0].split()) for call in mock_cursor.execute.call_args_list]
+
+class TestMigrationManager:
+    """Test the schema version fast path and locked migration runs"""
+
+    def test_current_schema_costs_one_query(self, mock_db_connection):
+        manager = MigrationManager()
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchone.return_value = (manager.latest_version,)
+
+        manager.run_migrations()
+
+        assert executed(mock_cursor) == ['SELECT version FROM schema_version']
+        assert mock_db_connection.call_count == 1
+
+    def test_pending_migrations_applied_under_lock(self, mock_db_connection):
+        manager = MigrationManager()
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchone.return_value = (manager.latest_version - 1,)
+        mock_cursor.fetchall.return_value = [(m['id'],) for m in manager.migrations if m['id'] != manager.latest_version]
+
+        manager.run_migrations()
+
+        statements = executed(mock_cursor)
+        lock_at = statements.index('SELECT pg_advisory_lock(%s)')
+        assert mock_cursor.execute.call_args_list[lock_at].args[1] == (MIGRATION_LOCK_ID,)
+        recorded = [call.args[1] for call in mock_cursor.execute.call_args_list
+                    if 'INSERT INTO migrations' in call.args[0]]
+        assert recorded == [(manager.latest_version, manager.migrations[-1]['name'])]
+        assert any(s.startswith('INSERT INTO schema_version') for s in statements)
+        assert statements[-2:] == ['SELECT pg_advisory_unlock(%s)', 'RESET statement_timeout']
+
+    def test_missing_version_table_runs_everything(self, mock_db_connection):
+        manager = MigrationManager()
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.execute.side_effect = lambda sql, params=None: (
+            (_ for _ in ()).throw(psycopg2.ProgrammingError('relation "schema_version" does not exist'))
+            if sql == 'SELECT version FROM schema_version' else None
+        )
+        mock_cursor.fetchall.return_value = []
+
+        manager.run_migrations()
+
+        recorded = [call.args[1][0] for call in mock_cursor.execute.call_args_list
+                    if 'INSERT INTO migrations' in call.args[0]]
+        assert recorded == sorted(m['id'] for m in manager.migrations)
+        assert recorded[0] == 0
+
+    def test_rollup_backfill_handles_text_columns(self):
+        # Migration 0 leaves state_in_life as text when its conversion fails
+        sql = next(m['sql'] for m in MigrationManager().migrations if m['name'] == 'create_submission_rollups')
+        assert 'jsonb_typeof' not in sql
+        assert "s.state_in_life::text::jsonb" in sql
+
+    def test_device_rollups_recounted_under_rollup_lock(self):
+        from app.rollups import ROLLUP_LOCK_ID
+
+        sql = ' '.join(next(m['sql'] for m in MigrationManager().migrations if m['name'] == 'add_device_rollups').split())
+        assert sql.startswith(f'SELECT pg_advisory_xact_lock({ROLLUP_LOCK_ID}); DELETE FROM submission_rollups_daily')
+        assert "d.dimension IN ('client', 'ip')" in sql
@@ -0,0 +1,176 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+@pytest.fixture
+def ministry_db():
+    """Mock connection for the ministry admin blueprint"""
+    with patch('app.blueprints.ministry_admin.get_db_connection') as mock:
+        mock_cursor = MagicMock()
+        mock.return_value.__enter__.return_value = (MagicMock(), mock_cursor)
+        yield mock_cursor
+
+def schema(*columns):
+    """Patch the schema cache with the given ministries columns"""
+    return patch('app.schema._columns', {'ministries': frozenset(('id', 'name') + columns)})
+
+class TestBulkUpdate:
+    """Test set-based bulk updates of ministries"""
+
+    def rows(self):
+        return [
+            {'id': 1, 'age_groups': '["high-school"]', 'genders': None, 'states': '[]',
+             'interests': '["music", "service"]', 'situations': None},
+            {'id': 2, 'age_groups': None, 'genders': None, 'states': None,
+             'interests': '["music"]', 'situations': None},
+        ]
+
+    def test_add_and_remove_in_one_update(self, admin_client, ministry_db):
+        ministry_db.fetchall.return_value = self.rows()
+
+        with schema('updated_at'), patch('app.blueprints.ministry_admin.psycopg2.extras.execute_values') as mock_values:
+            response = admin_client.post('/api/ministries/bulk-update', json={
+                'ministry_ids': [1, 2, 3],
+                'updates': {
+                    'add': {'age_groups': ['journeying-adults']},
+                    'remove': {'age_groups': ['high-school'], 'interests': ['music']}
+                }
+            })
+
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['updated'] == 2
+        assert data['errors'] == ['Ministry 3 not found']
+
+        select_sql, select_params = ministry_db.execute.call_args.args
+        assert 'WHERE id = ANY(%s)' in select_sql
+        assert select_params == ([1, 2, 3],)
+
+        assert mock_values.call_count == 1
+        sql, rows = mock_values.call_args.args[1:3]
+        assert 'FROM (VALUES %s) AS v(id, age_groups, interests)' in sql
+        assert 'updated_at = CURRENT_TIMESTAMP' in sql
+        assert rows == [(1, '["journeying-adults"]', '["service"]'), (2, '["journeying-adults"]', '[]')]
+        assert mock_values.call_args.kwargs['template'] == '(%s::integer, %s::text, %s::text)'
+
+    def test_set_active(self, admin_client, ministry_db):
+        ministry_db.fetchall.return_value = self.rows()
+
+        with schema(), patch('app.blueprints.ministry_admin.psycopg2.extras.execute_values') as mock_values:
+            response = admin_client.post('/api/ministries/bulk-update', json={
+                'ministry_ids': [1, 2], 'updates': {'set': {'active': False}}
+            })
+
+        assert response.get_json()['updated'] == 2
+        sql, rows = mock_values.call_args.args[1:3]
+        assert 'updated_at' not in sql
+        assert rows == [(1, False), (2, False)]
+
+    def test_unknown_field_rejected(self, admin_client, ministry_db):
+        response = admin_client.post('/api/ministries/bulk-update', json={
+            'ministry_ids': [1], 'updates': {'set': {'id = 0; --': 1}}
+        })
+        assert response.status_code == 400
+        ministry_db.execute.assert_not_called()
+
+class TestMinistryImport:
+    """Test the staging-table COPY import"""
+
+    CSV = (
+        '﻿ministry_key,name,description,age_groups,interests,active\n'
+        'choir,Choir,"Sing, with us",journeying-adults|married-couples,music,true\n'
+        ',Nameless,,,,true\n'
+        'youth,Youth Group,,high-school,,false\n'
+    )
+
+    def copy_into(self, mock_cursor, copied):
+        # COPY pulls the upload through in small reads
+        def copy_expert(sql, stream):
+            while True:
+                chunk = stream.read(16)
+                if not chunk:
+                    break
+                copied.append(chunk)
+        mock_cursor.copy_expert.side_effect = copy_expert
+
+    def test_csv_upload_streamed_and_merged(self, admin_client, mock_db_connection):
+        import csv
+        import io
+
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = [(True,), (False,)]
+        copied = []
+        self.copy_into(mock_cursor, copied)
+
+        with schema('updated_at'):
+            response = admin_client.post('/api/ministries/import-csv', data={
+                'file': (io.BytesIO(self.CSV.encode('utf-8')), 'ministries.csv')
+            }, content_type='multipart/form-data')
+
+        data = response.get_json()
+        assert response.status_code == 200
+        assert (data['imported'], data['updated']) == (1, 1)
+        assert data['errors'] == ['Row 3: ministry_key is required']
+
+        staged = list(csv.reader(io.StringIO(''.join(copied))))
+        assert [row[1] for row in staged] == ['choir', 'youth']
+        assert staged[0][3] == 'Sing, with us'
+        assert staged[0][5] == '["journeying-adults", "married-couples"]'
+        assert staged[1][-1] == 'False'
+
+        statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert 'CREATE TEMP TABLE ministry_import' in statements[0]
+        assert 'DISTINCT ON (ministry_key)' in statements[1]
+        assert 'updated_at = CURRENT_TIMESTAMP' in statements[1]
+        assert len(statements) == 2
+
+    def test_json_bulk_import(self, admin_client, mock_db_connection):
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = [(True,)]
+        copied = []
+        self.copy_into(mock_cursor, copied)
+
+        with schema():
+            response = admin_client.post('/api/ministries/bulk-import', json={'ministries': [
+                {'ministry_key': 'choir', 'name': 'Choir', 'interest': ['music']},
+                {'name': 'x' * 300, 'ministry_key': 'long'},
+                'not a ministry'
+            ]})
+
+        data = response.get_json()
+        assert data['imported'] == 1
+        assert data['errors'] == ['x' * 300 + ': name is longer than 255 characters',
+                                  'Unknown: Each ministry must be an object']
+        assert '"[""music""]"' in ''.join(copied)
+
+class TestSchemaCache:
+    """Test column checks answered from the schema cache"""
+
+    def test_loaded_once_then_answered_without_queries(self, mock_db_connection):
+        from app import schema
+
+        mock_cursor = mock_db_connection.return_value.__enter__.return_value[1]
+        mock_cursor.fetchall.return_value = [('ministries', 'id'), ('ministries', 'updated_at'),
+                                             ('ministry_submissions', 'id')]
+
+        with patch('app.schema._columns', None):
+            assert schema.has_column('ministries', 'updated_at')
+            assert not schema.has_column('ministry_submissions', 'updated_at')
+            assert not schema.has_column('missing_table', 'id')
+
+        assert mock_db_connection.call_count == 1
+        assert 'information_schema.columns' in mock_cursor.execute.call_args.args[0]
+
+    def test_toggle_active_skips_catalog_query(self, admin_client, ministry_db):
+        ministry_db.fetchone.return_value = ('Choir', False)
+
+        with schema():
+            response = admin_client.post('/api/ministries/7/toggle-active')
+
+        assert response.status_code == 200
+        statements = [call.args[0] for call in ministry_db.execute.call_args_list]
+        assert len(statements) == 1
+        assert 'updated_at' not in statements[0]
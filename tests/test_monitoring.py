@@ -0,0 +1,134 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+from unittest.mock import patch
+
+from app.monitoring import ApplicationMonitor, LatencyHistogram
+
+class TestLatencyHistogram:
+    """Test per-minute latency histograms and their rolling windows"""
+
+    def test_percentiles_within_bucket_error(self):
+        histogram = LatencyHistogram()
+        now = 6000.0
+        for ms in range(1, 101):
+            histogram.record(ms / 1000, now)
+
+        summary = histogram.percentiles(1, now)
+
+        assert summary['count'] == 100
+        for percentile, expected in (('p50', 50), ('p95', 95), ('p99', 99)):
+            assert expected <= summary[percentile] <= expected * 1.1
+
+    def test_windows_drop_old_minutes(self):
+        histogram = LatencyHistogram()
+        now = 60 * 1000.0
+        histogram.record(2.0, now - 30 * 60)
+        histogram.record(0.01, now)
+
+        assert histogram.percentiles(5, now)['count'] == 1
+        assert histogram.percentiles(60, now)['count'] == 2
+        assert histogram.percentiles(60, now)['p99'] >= 2000
+
+        # An hour later the slot is reused rather than added to
+        histogram.record(0.01, now + 3600)
+        assert histogram.percentiles(60, now + 3600)['count'] == 1
+
+    def test_empty_window(self):
+        assert LatencyHistogram().percentiles(1) == {'count': 0, 'p50': None, 'p95': None, 'p99': None}
+
+class TestApplicationMonitor:
+    """Test request recording and the metrics report"""
+
+    def test_latency_reported_per_route(self):
+        with patch.object(ApplicationMonitor, '_start_background_monitoring'):
+            monitor = ApplicationMonitor()
+        for _ in range(20):
+            monitor.record_request('/api/submit', 'POST', 200, 0.02)
+        monitor.record_request('/admin/api/submissions', 'GET', 200, 0.8)
+
+        with patch.object(monitor, '_get_rate_limit_stats', return_value={}):
+            application = monitor.get_metrics()['application']
+
+        latency = application['latency_ms']
+        assert set(latency) == {'POST:/api/submit', 'GET:/admin/api/submissions'}
+        assert set(latency['POST:/api/submit']) == {'1m', '5m', '60m'}
+        assert latency['POST:/api/submit']['5m']['count'] == 20
+        assert latency['GET:/admin/api/submissions']['1m']['p50'] >= 800
+        assert application['total_requests'] == 21
+        assert application['avg_response_time'] == round((20 * 0.02 + 0.8) / 21, 3)
+
+class TestRequestMonitoring:
+    """Test the request timing hooks registered by create_app"""
+
+    def test_records_url_rule_status_and_size(self, client):
+        with patch('app.monitoring.app_monitor.record_request') as mock_record:
+            response = client.post('/api/ministries/7/toggle-active')
+            client.get('/no/such/page')
+
+        endpoint, method, status, duration, size = mock_record.call_args_list[0].args
+        assert endpoint == '/api/ministries/<int:ministry_id>/toggle-active'
+        assert (method, status, size) == ('POST', response.status_code, response.content_length)
+        assert duration >= 0
+        assert mock_record.call_args_list[1].args[:3] == ('unmatched', 'GET', 404)
+        assert mock_record.call_count == 2
+
+class TestSystemSampler:
+    """Test the once-per-host, non-blocking system sampler"""
+
+    def test_cpu_from_counter_deltas(self, tmp_path):
+        from collections import namedtuple
+        from app.system_stats import SystemSampler
+
+        times = namedtuple('scputimes', 'user system idle iowait')
+        sampler = SystemSampler(str(tmp_path / 'system.json'), interval=60)
+        with patch('psutil.cpu_times', side_effect=[times(100, 50, 800, 50), times(120, 60, 860, 60)]), \
+                patch('psutil.cpu_percent', side_effect=AssertionError('must not block')):
+            assert sampler.sample()['cpu_percent'] is None
+            assert sampler.sample()['cpu_percent'] == 30.0
+
+    def test_one_sampler_per_host(self, tmp_path):
+        import time
+        from app.system_stats import SystemSampler
+
+        path = str(tmp_path / 'system.json')
+        leader, follower = SystemSampler(path, interval=60), SystemSampler(path, interval=60)
+        assert leader._try_lead()
+        assert not follower._try_lead()
+
+        leader._publish({'cpu_percent': 12.5, 'memory_percent': 40.0, 'disk_percent': 10.0, 'sampled_at': time.time()})
+        with patch.object(follower, 'start'):
+            assert follower.get_snapshot()['cpu_percent'] == 12.5
+
+    def test_missing_or_stale_snapshot(self, tmp_path):
+        import json
+        import time
+        from app.system_stats import SystemSampler
+
+        path = tmp_path / 'system.json'
+        sampler = SystemSampler(str(path), interval=60)
+        with patch.object(sampler, 'start'):
+            # No file yet: the next call reads again rather than waiting an interval
+            assert sampler.get_snapshot() is None
+            path.write_text(json.dumps({'memory_percent': 40.0, 'sampled_at': time.time()}))
+            assert sampler.get_snapshot()['memory_percent'] == 40.0
+
+            # Left behind by a previous run or a sampler that stopped writing
+            path.write_text(json.dumps({'memory_percent': 40.0, 'sampled_at': time.time() - 4 * 60}))
+            sampler._snapshot = None
+            assert sampler.get_snapshot() is None
+
+    def test_metrics_read_snapshot_without_sampling(self):
+        snapshot = {'cpu_percent': None, 'memory_percent': 41.0, 'disk_percent': 12.0,
+                    'load_average': [0.5, 0.4, 0.3], 'sampled_at': 1760000000.0}
+        with patch.object(ApplicationMonitor, '_start_background_monitoring'):
+            monitor = ApplicationMonitor()
+
+        with patch('app.monitoring.get_system_snapshot', return_value=snapshot), \
+                patch('psutil.cpu_percent', side_effect=AssertionError('must not block')), \
+                patch.object(monitor, '_get_rate_limit_stats', return_value={}):
+            system = monitor.get_metrics()['system']
+
+        assert system['cpu_percent'] == 'N/A'
+        assert system['memory_percent'] == 41.0
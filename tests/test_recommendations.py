@@ -0,0 +1,157 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import itertools
+import pytest
+from unittest.mock import patch
+
+import app.catalog as catalog
+from app.ministries import MINISTRY_DATA
+from app.cache import recommendation_cache, get_cache_stats
+from app.recommendations import compile_catalog, recommend_ministry_keys, canonical_answer_key, _memoized_keys
+
+CHILDREN_AGES = ['infant', 'elementary', 'junior-high', 'high-school']
+
+def reference_find_ministries(ministries, age, gender, states, situation, interests):
+    """Straight Python port of the original client-side findMinistries() scan"""
+    has_kids_interest = 'kids' in interests
+    is_parent = 'parent' in states
+    matches = []
+
+    for key, ministry in ministries.items():
+        if key == 'welcome-committee' and 'new-to-stedward' not in situation:
+            continue
+
+        effective_ages = [age] + (CHILDREN_AGES if has_kids_interest or is_parent else [])
+        ages = ministry.get('age', [])
+        is_match = not ages or any(a in effective_ages for a in ages)
+
+        genders = ministry.get('gender', [])
+        if genders and gender != 'skip' and gender not in genders:
+            is_match = False
+
+        ministry_states = ministry.get('state', [])
+        if ministry_states and states and 'none-of-above' not in states:
+            if not any(s in states for s in ministry_states):
+                is_match = False
+
+        ministry_situations = ministry.get('situation', [])
+        if ministry_situations and not any(s in situation for s in ministry_situations):
+            is_match = False
+
+        ministry_interests = ministry.get('interest', [])
+        if interests and 'all' not in interests and ministry_interests:
+            has_interest = 'all' in ministry_interests or any(i in interests for i in ministry_interests)
+            if not has_interest and has_kids_interest:
+                has_interest = any(a in CHILDREN_AGES for a in ages)
+            if not has_interest:
+                is_match = False
+
+        if is_match:
+            matches.append(key)
+
+    if 'mass' in matches:
+        matches = ['mass'] + [k for k in matches if k != 'mass']
+
+    if not matches and (is_parent or has_kids_interest):
+        for key in ['st-edward-school', 'prep-kids', 'moms-group', 'meal-train-provide', 'totus-tuus-kids']:
+            if key in ministries and key not in matches:
+                matches.append(key)
+
+    if age == 'elementary' and len(matches) < 2:
+        for key in ['st-edward-school', 'prep-kids', 'mass']:
+            if key in ministries and key not in matches:
+                matches.append(key)
+        if ('fellowship' in interests or 'all' in interests) and 'cub-scouts' not in matches:
+            matches.append('cub-scouts')
+        if 'mass' in matches:
+            matches = ['mass'] + [k for k in matches if k != 'mass']
+
+    if not interests:
+        return []
+    return matches
+
+@pytest.fixture
+def compiled():
+    return compile_catalog(catalog._make_snapshot(MINISTRY_DATA, version=0))
+
+class TestRecommendationEngine:
+    """Test the bitset matching engine against the original client rules"""
+
+    def test_matches_reference_scan(self, compiled):
+        """Every answer combination gives the same ministries, in the same order"""
+        ages = ['infant', 'elementary', 'high-school', 'college-young-adult', 'married-parents', 'journeying-adults']
+        genders = ['male', 'female', 'skip']
+        state_options = [[], ['single'], ['married', 'parent'], ['none-of-above']]
+        situation_options = [[], ['new-to-stedward'], ['returning-to-church', 'new-to-nashville']]
+        interest_options = [[], ['all'], ['kids'], ['music', 'service'], ['fellowship'], ['prayer', 'kids']]
+
+        for age, gender, states, situation, interests in itertools.product(
+                ages, genders, state_options, situation_options, interest_options):
+            expected = reference_find_ministries(MINISTRY_DATA, age, gender, states, situation, interests)
+            actual = recommend_ministry_keys(compiled, age, gender, states, situation, interests)
+            assert actual == expected, (age, gender, states, situation, interests)
+
+    def test_mass_first(self, compiled):
+        keys = recommend_ministry_keys(compiled, 'journeying-adults', 'skip', [], [], ['all'])
+        assert keys[0] == 'mass'
+
+    def test_welcome_committee_gating(self, compiled):
+        without = recommend_ministry_keys(compiled, 'married-parents', 'skip', [], [], ['all'])
+        with_new = recommend_ministry_keys(compiled, 'married-parents', 'skip', [], ['new-to-stedward'], ['all'])
+        assert 'welcome-committee' not in without
+        assert 'welcome-committee' in with_new
+
+class TestRecommendationMemo:
+    """Test memoization of recommendation results"""
+
+    def test_canonical_key_ignores_order(self):
+        first = {'age_group': 'married-parents', 'gender': 'skip', 'states': ['parent', 'married'], 'interests': ['music', 'kids']}
+        second = {'age_group': 'married-parents', 'gender': 'skip', 'states': ['married', 'parent'], 'interests': ['kids', 'music']}
+        assert canonical_answer_key(first) == canonical_answer_key(second)
+
+    def test_hit_after_miss_and_invalidate_on_new_catalog(self, compiled):
+        recommendation_cache.clear()
+        answers = {'age_group': 'journeying-adults', 'gender': 'skip', 'interests': ['music']}
+        before = recommendation_cache.get_stats()
+
+        first = _memoized_keys(compiled, answers)
+        second = _memoized_keys(compiled, answers)
+        assert first == second
+        assert 'choir-adults' in first
+        stats = recommendation_cache.get_stats()
+        assert stats['misses'] == before['misses'] + 1
+        assert stats['hits'] == before['hits'] + 1
+        assert get_cache_stats()['recommendations']['size'] == 1
+
+        edited = dict(MINISTRY_DATA)
+        edited.pop('choir-adults')
+        recompiled = compile_catalog(catalog._make_snapshot(edited, version=1))
+        assert 'choir-adults' not in _memoized_keys(recompiled, answers)
+        assert recommendation_cache.get_stats()['invalidations'] == before['invalidations'] + 1
+
+class TestRecommendEndpoint:
+    """Test the /api/recommend endpoint"""
+
+    def test_recommend_uses_catalog(self, client, monkeypatch):
+        """Answers are matched server-side, falling back to bundled data"""
+        monkeypatch.setattr(catalog, '_snapshot', None)
+        with patch('app.database.get_db_connection') as mock_db:
+            mock_db.side_effect = Exception("Database connection failed")
+
+            response = client.post('/api/recommend', json={
+                'answers': {'age': 'married-parents', 'gender': 'skip'},
+                'states': ['parent'],
+                'interests': ['kids'],
+                'situation': []
+            })
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['success'] is True
+        assert data['ministries'][0]['ministry_key'] == 'mass'
+
+    def test_recommend_invalid_data(self, client, sample_invalid_submission_data):
+        response = client.post('/api/recommend', json=sample_invalid_submission_data)
+        assert response.status_code == 400
@@ -0,0 +1,117 @@
+# © 2024–2026 Harnisch LLC. All Rights Reserved.
+# Licensed exclusively for use by St. Edward Church & School (Nashville, TN).
+# Unauthorized use, distribution, or modification is prohibited.
+
+import json
+import os
+import pytest
+from unittest.mock import patch
+
+from app.submission_queue import SubmissionQueue, build_submission_row, new_submission_ref
+
+def make_row(ref=None):
+    return build_submission_row(
+        {'age_group': 'journeying-adults', 'gender': 'female', 'interests': ['music']},
+        ['Adult Choir'], 'abc123', None, 'session-1', ref or new_submission_ref()
+    )
+
+@pytest.fixture
+def queue(tmp_path):
+    return SubmissionQueue(batch_size=2, flush_interval=60, max_size=3,
+                           spill_path=str(tmp_path / 'spill.jsonl'))
+
+class TestSubmissionQueue:
+    """Test the write-behind submission queue"""
+
+    def test_client_ref_kept_when_valid(self):
+        ref = '6f1c2a4e-8b0d-4f5a-9c3e-2d7b1a0e9f84'
+        assert new_submission_ref(ref) == ref
+        assert new_submission_ref('not-a-uuid') != 'not-a-uuid'
+
+    def test_flush_writes_in_batches(self, queue):
+        with patch('app.submission_queue.insert_submissions', side_effect=len) as mock_insert, \
+                patch.object(queue, '_ensure_started'):
+            for _ in range(3):
+                assert queue.enqueue(make_row())
+            assert queue.flush() == 3
+
+        assert [len(call.args[0]) for call in mock_insert.call_args_list] == [2, 1]
+        assert queue.get_stats()['pending'] == 0
+
+    def test_bounded_queue_rejects_when_full(self, queue):
+        with patch.object(queue, '_ensure_started'):
+            for _ in range(3):
+                assert queue.enqueue(make_row())
+            assert not queue.enqueue(make_row())
+        assert queue.get_stats()['rejected'] == 1
+
+    def test_database_down_spills_then_replays(self, queue):
+        with patch.object(queue, '_ensure_started'):
+            queue.enqueue(make_row('6f1c2a4e-8b0d-4f5a-9c3e-2d7b1a0e9f84'))
+            queue.enqueue(make_row())
+            queue.enqueue(make_row())
+
+        with patch('app.submission_queue.insert_submissions', side_effect=Exception("Database connection failed")):
+            assert queue.flush() == 0
+
+        assert queue.get_stats()['pending'] == 0
+        with open(queue.spill_path) as spill_file:
+            spilled = [json.loads(line) for line in spill_file]
+        assert len(spilled) == 3
+        assert spilled[0]['submission_ref'] == '6f1c2a4e-8b0d-4f5a-9c3e-2d7b1a0e9f84'
+
+        with patch('app.submission_queue.insert_submissions', side_effect=len) as mock_insert:
+            assert queue.replay_spill() == 3
+        assert mock_insert.call_count == 2
+        assert not os.path.exists(queue.spill_path)
+
+    def test_replay_leaves_claims_of_live_workers(self, queue):
+        live_claim = f'{queue.spill_path}.replay-{os.getpid()}-0a1b2c3d'
+        # Well above any pid_max, so never a running process
+        stale_claim = f'{queue.spill_path}.replay-99999999-4e5f6a7b'
+        for path in (live_claim, stale_claim):
+            with open(path, 'w') as spill_file:
+                spill_file.write(json.dumps(make_row()) + '\n')
+
+        with patch('app.submission_queue.insert_submissions', side_effect=len) as mock_insert:
+            assert queue.replay_spill() == 1
+        assert mock_insert.call_count == 1
+        assert os.path.exists(live_claim)
+        assert not os.path.exists(stale_claim)
+
+    def test_stop_flushes_pending_rows(self, queue):
+        with patch('app.submission_queue.insert_submissions', side_effect=len) as mock_insert:
+            queue.enqueue(make_row())
+            queue.stop()
+        assert mock_insert.call_count == 1
+        assert queue.get_stats()['written'] == 1
+
+class TestSubmitEndpoint:
+    """Test /api/submit with the write-behind queue"""
+
+    def test_submit_returns_before_database_write(self, client):
+        data = {
+            'answers': {'age': 'journeying-adults', 'gender': 'female'},
+            'states': ['single'],
+            'interests': ['music'],
+            'situation': [],
+            'submission_ref': '6f1c2a4e-8b0d-4f5a-9c3e-2d7b1a0e9f84'
+        }
+        with patch('app.blueprints.api.submission_queue.enqueue', return_value=True) as mock_enqueue, \
+                patch('app.blueprints.api.insert_submissions') as mock_insert:
+            response = client.post('/api/submit', json=data)
+
+        assert response.status_code == 200
+        assert response.get_json()['submission_id'] == data['submission_ref']
+        row = mock_enqueue.call_args.args[0]
+        assert row['interest'] == ['music']
+        mock_insert.assert_not_called()
+
+    def test_full_queue_writes_synchronously(self, client):
+        data = {'answers': {'age': 'journeying-adults', 'gender': 'male'}, 'interests': ['music']}
+        with patch('app.blueprints.api.submission_queue.enqueue', return_value=False), \
+                patch('app.blueprints.api.insert_submissions', return_value=1) as mock_insert:
+            response = client.post('/api/submit', json=data)
+
+        assert response.status_code == 200
+        assert mock_insert.call_count == 1